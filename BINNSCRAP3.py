@@ -3,13 +3,27 @@ from playwright.sync_api import sync_playwright, TimeoutError as PWTimeout
 from dotenv import load_dotenv
 import argparse
 import os, time, pathlib, re, sys
+import json, secrets, socket, functools, itertools, tempfile, threading, glob, http.server
+from collections import OrderedDict, deque
+from contextlib import contextmanager
 
 # -------- CONFIG --------
 PROFILE_DIR = "binance_profile"
 LOGIN_URL = "https://accounts.binance.com/en/login"
 TRADE_URL_TPL = "https://www.binance.com/en/trade/{symbol}?type=spot"  # e.g., BTC_USDT
-PASSKEY_WAIT_SECONDS = 20
+PASSKEY_WAIT_SECONDS = 50  # deadline for approving the passkey; login continues as soon as the redirect lands
+ORDER_API_RE = re.compile(r"/bapi/.*/order/place")  # the order form's POST; waited on after clicking Buy/Sell
+ORDER_RESPONSE_TIMEOUT_MS = 10000
+CONFIRM_WAIT_MS = 1500  # how long a confirmation dialog may take to appear after the Buy/Sell click
 EXECUTE_ORDER = True       # set to False to dry-run (no final Buy/Sell click)
+SESSION_HOST = "127.0.0.1"  # `serve` only ever listens on loopback
+SESSION_PORT = 8765
+SESSION_READ_TIMEOUT = 5  # seconds a connected client may stay silent before it is dropped
+SESSION_TOKEN_FILE = ".session_token"  # written by `serve`, read by clients
+SELECTOR_CACHE_FILE = "selector_cache.json"  # which fallback selector matched each UI element last time
+SNAP_DIR = "debug"  # where snap() saves screenshots + HTML; None disables it (offline bench)
+TRACE_KEEP_SPANS = 10000  # finished spans kept in memory while tracing; older ones are dropped
+WAIT_LOG_MAX = 1000  # wait records kept between two orders of the `serve` daemon
 USER_AGENT_DESKTOP = (
     "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
     "AppleWebKit/537.36 (KHTML, like Gecko) "
@@ -19,20 +33,169 @@ USER_AGENT_DESKTOP = (
 # -------- ENV --------
 load_dotenv()
 EMAIL = os.getenv("BINANCE_EMAIL")
-assert EMAIL, "Add BINANCE_EMAIL to your .env (passkey-only login)."
+
+# -------- TRACING --------
+class Tracer:
+    """
+    Nested timing spans, off until enable() or open() is called; until then a span only
+    hands back its attribute dict and nothing is kept. Enabled, the last `max_spans`
+    finished spans are kept in `spans`, and after open() each one is also appended to a
+    JSONL file as {"id", "parent", "name", "ts", "ms", ...}.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.spans = deque(maxlen=TRACE_KEEP_SPANS)
+        self._file = None
+        self._stack = []
+        self._ids = itertools.count(1)
+
+    def enable(self, max_spans=TRACE_KEEP_SPANS):
+        """Start keeping spans; max_spans=None keeps all of them (finite runs like `bench`)."""
+        self.enabled = True
+        self.spans = deque(self.spans, maxlen=max_spans)
+
+    def open(self, path):
+        self.enable()
+        self._file = open(path, "a", encoding="utf-8", buffering=1)
+
+    @contextmanager
+    def span(self, name, **attrs):
+        if not self.enabled:
+            yield attrs
+            return
+        rec = {"id": next(self._ids), "parent": self._stack[-1] if self._stack else None,
+               "name": name, "ts": time.time(), **attrs}
+        self._stack.append(rec["id"])
+        t0 = time.perf_counter()
+        try:
+            yield rec
+        except BaseException as e:
+            rec["error"] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            rec["ms"] = round((time.perf_counter() - t0) * 1000, 2)
+            self._stack.pop()
+            self.spans.append(rec)
+            if self._file:
+                self._file.write(json.dumps(rec, default=str) + "\n")
+
+
+TRACER = Tracer()
+
+def traced(name):
+    """Run the decorated function inside a TRACER span called `name`."""
+    def deco(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with TRACER.span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return deco
 
 # -------- UTILS --------
 def snap(page, name):
-    pathlib.Path("debug").mkdir(exist_ok=True)
+    if SNAP_DIR is None:
+        return
+    pathlib.Path(SNAP_DIR).mkdir(exist_ok=True)
     try:
-        page.screenshot(path=f"debug/{name}.png", full_page=True)
-        with open(f"debug/{name}.html", "w", encoding="utf-8") as f:
+        page.screenshot(path=f"{SNAP_DIR}/{name}.png", full_page=True)
+        with open(f"{SNAP_DIR}/{name}.html", "w", encoding="utf-8") as f:
             f.write(page.content())
     except Exception:
         pass
 
-def click_if_visible(page_or_frame, selectors, timeout_ms=3000):
-    """Try clicking the first visible element among a list of selectors in the given page or frame."""
+class SelectorResolver:
+    """
+    Remembers which of a fallback list of selectors matched each named UI element
+    ("buy_button", "cookie_accept", ...) and persists that in SELECTOR_CACHE_FILE.
+    A lookup tries the remembered winner first; otherwise it asks for all candidates in
+    one combined selector and only then checks which one matched, so a miss costs one
+    query rather than one per candidate. Lookup counts and timings are aggregated per
+    element and lookup path, so a long-lived session keeps a fixed-size record.
+    """
+
+    def __init__(self, path=SELECTOR_CACHE_FILE):
+        self.path = pathlib.Path(path)
+        try:
+            self.known = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            self.known = {}
+        self.stats = {}  # {name: {path: {"count", "total_ms"}}}
+
+    @staticmethod
+    def _ready(loc, visible):
+        try:
+            return loc.count() > 0 and (not visible or loc.is_visible())
+        except Exception:
+            return False
+
+    def resolve(self, page_or_frame, name, selectors, visible=True, wait_ms=0, poll=False):
+        """
+        Locator of the first matching selector for `name`, or None. `visible=False` accepts
+        attached-but-hidden elements; `wait_ms` waits that long for any candidate to show up.
+        `poll=True` marks one round of a repeated probe: finding nothing is then not recorded.
+        """
+        t0 = time.perf_counter()
+        entry = self.known.setdefault(name, {"selector": None, "hits": 0, "misses": 0})
+        found, path = None, "none"
+        if entry["selector"] in selectors and self._ready(page_or_frame.locator(entry["selector"]).first, visible):
+            found, path = entry["selector"], "hit"
+        else:
+            combined = page_or_frame.locator(", ".join(selectors) + (" >> visible=true" if visible else "")).first
+            try:
+                if wait_ms:
+                    combined.wait_for(state="visible" if visible else "attached", timeout=wait_ms)
+                any_match = combined.count() > 0
+            except Exception:
+                any_match = False
+            if any_match:
+                found = next((sel for sel in selectors if self._ready(page_or_frame.locator(sel).first, visible)), None)
+                path = "probe" if found else "none"
+        if poll and not found:
+            return None
+        entry["hits" if path == "hit" else "misses"] += 1
+        if found and found != entry["selector"]:
+            entry["selector"] = found
+            self.save()
+        agg = self.stats.setdefault(name, {}).setdefault(path, {"count": 0, "total_ms": 0.0})
+        agg["count"] += 1
+        agg["total_ms"] += round((time.perf_counter() - t0) * 1000, 2)
+        return page_or_frame.locator(found).first if found else None
+
+    def save(self):
+        try:
+            self.path.write_text(json.dumps(self.known, indent=1), encoding="utf-8")
+        except OSError:
+            pass
+
+    def summary(self):
+        """Per element and lookup path ("hit" = remembered winner, "probe" = combined query, "none"): count and ms."""
+        return {name: {path: dict(agg) for path, agg in paths.items()} for name, paths in self.stats.items()}
+
+    def print_report(self):
+        for name, paths in self.summary().items():
+            parts = ", ".join(f"{p} {a['count']}x avg {a['total_ms'] / a['count']:.1f}ms" for p, a in paths.items())
+            print(f"🔎 {name}: {parts}")
+
+
+RESOLVER = SelectorResolver()
+
+def click_if_visible(page_or_frame, selectors, timeout_ms=3000, name=None, poll=False):
+    """
+    Try clicking the first visible element among a list of selectors in the given page or frame.
+    With a `name` the element is looked up through RESOLVER (`poll` as in resolve()). Neither
+    path waits for the element to appear (Playwright's is_visible() ignores its timeout).
+    """
+    if name:
+        loc = RESOLVER.resolve(page_or_frame, name, selectors, poll=poll)
+        try:
+            if loc is not None:
+                loc.click()
+                return True
+        except Exception:
+            pass
+        return False
     for sel in selectors:
         loc = page_or_frame.locator(sel).first
         try:
@@ -43,29 +206,93 @@ def click_if_visible(page_or_frame, selectors, timeout_ms=3000):
             pass
     return False
 
-def find_first_visible(page, selectors):
+def find_first_visible(page, selectors, name=None):
+    if name:
+        return RESOLVER.resolve(page, name, selectors)
     for sel in selectors:
         loc = page.locator(sel).first
         if loc.count() and loc.is_visible():
             return loc
     return None
 
+WAIT_LOG = deque(maxlen=WAIT_LOG_MAX)  # one {"step", "ms", "ok"} per wait_step, in order; `serve` clears it per order
+
+@contextmanager
+def wait_step(step):
+    """
+    Time one condition wait. A PWTimeout inside the block is swallowed and recorded as
+    ok=False, so callers read rec["ok"] instead of catching it.
+    """
+    rec = {"step": step, "ok": True}
+    t0 = time.perf_counter()
+    with TRACER.span(step, kind="wait") as span:
+        try:
+            yield rec
+        except PWTimeout:
+            rec["ok"] = False
+        finally:
+            rec["ms"] = round((time.perf_counter() - t0) * 1000, 1)
+            span["ok"] = rec["ok"]
+            WAIT_LOG.append(rec)
+
+def print_wait_report(waits):
+    for w in waits:
+        print(f"⏱️ {w['step']}: {w['ms']:.0f}ms{'' if w['ok'] else ' (deadline hit)'}")
+
+# enabled = no disabled property and not marked aria-disabled/aria-busy (Binance's order buttons use both)
+_ENABLED_JS = """(el) => !el.disabled && el.getAttribute('aria-disabled') !== 'true'
+                         && el.getAttribute('aria-busy') !== 'true'"""
+
+def wait_enabled(page, loc, step, timeout_ms=6000):
+    """Wait until `loc` is clickable, returning as soon as it is; False if the deadline passed."""
+    with wait_step(step) as w:
+        page.wait_for_function(_ENABLED_JS, arg=loc.element_handle(timeout=timeout_ms), timeout=timeout_ms)
+    return w["ok"]
+
+CONFIRM_SELECTORS = [
+    'button:has-text("Confirm")',
+    'button:has-text("Place Order")',
+    'button:has-text("I understand")',
+    'button:has-text("Compris")',
+]
+
+def _is_order_response(response):
+    return ORDER_API_RE.search(response.url) is not None and response.request.method == "POST"
+
+def submit_order(page, button, step, timeout_ms=ORDER_RESPONSE_TIMEOUT_MS, confirm_ms=CONFIRM_WAIT_MS):
+    """
+    Click `button` once, click a confirmation dialog at most once if one appears within
+    `confirm_ms`, then wait for the order API response. Returns its HTTP status, or None
+    if none arrived by the deadline. Nothing is ever clicked twice, so a dialog that stays
+    up or re-renders cannot send a second order.
+    """
+    status = None
+    with wait_step(step):
+        # registered before the click, so a response that beats the dialog wait is not missed
+        with page.expect_response(_is_order_response, timeout=timeout_ms) as response:
+            button.click()
+            with wait_step("order_confirm_dialog"):
+                confirm = RESOLVER.resolve(page, "order_confirm", CONFIRM_SELECTORS, wait_ms=confirm_ms)
+                if confirm is not None:
+                    confirm.click()
+        status = response.value.status
+    return status
+
+@traced("goto")
 def goto_with_retry(page, url, first_wait="domcontentloaded"):
     try:
         page.goto(url, wait_until=first_wait)
         return
     except Exception as e:
         if "interrupted by another navigation" in str(e):
-            try:
+            with wait_step("navigation_settle"):
                 page.wait_for_load_state("load", timeout=15000)
                 page.wait_for_url(re.compile(r"^https://www\.binance\.com/.*"), timeout=15000)
-            except Exception:
-                pass
-            time.sleep(0.8)
             page.goto(url, wait_until="networkidle")
         else:
             raise
 
+@traced("cookies")
 def accept_cookies_everywhere(page, timeout_ms=3000, max_wait_s=6):
     """
     Attempts to accept cookie/consent banners on the current page and within iframes.
@@ -99,21 +326,26 @@ def accept_cookies_everywhere(page, timeout_ms=3000, max_wait_s=6):
     ]
     deadline = time.time() + max_wait_s
     accepted = False
-    while time.time() < deadline and not accepted:
-        if click_if_visible(page, selectors, timeout_ms=timeout_ms):
-            accepted = True
-            break
-        for frame in page.frames:
-            try:
-                if click_if_visible(frame, selectors, timeout_ms=timeout_ms):
-                    accepted = True
-                    break
-            except Exception:
-                pass
-        if not accepted:
-            time.sleep(0.25)
+    banner = page.locator(", ".join(selectors) + " >> visible=true").first
+    with wait_step("cookie_banner"):
+        while time.time() < deadline and not accepted:
+            # page.frames starts with the main frame, so this covers the page itself too
+            for frame in page.frames:
+                try:
+                    if click_if_visible(frame, selectors, timeout_ms=timeout_ms, name="cookie_accept", poll=True):
+                        accepted = True
+                        break
+                except Exception:
+                    pass
+            if not accepted:
+                # wakes up as soon as a banner renders on the page; frames are rechecked every 250ms
+                try:
+                    banner.wait_for(state="visible", timeout=250)
+                except Exception:
+                    pass
     return accepted
 
+@traced("trade_page")
 def ensure_trade_page(page, symbol):
     url = TRADE_URL_TPL.format(symbol=symbol)
     goto_with_retry(page, url, first_wait="domcontentloaded")
@@ -124,66 +356,81 @@ def ensure_trade_page(page, symbol):
     except Exception:
         pass
 
+MARKET_ACTIVE = ('span.trade-common-link.active:has-text("Market"), '
+                 'span.trade-common-link.active:has-text("Marché")')
+
+@traced("market_mode")
 def ensure_market_mode(page):
     # Ensure "Market" order type is active (fallbacks for locales)
+    if page.locator(MARKET_ACTIVE).count():
+        return
     clicked_type = click_if_visible(page, [
         'span.trade-common-link:has-text("Market")',
         'button:has-text("Market")',
         'span.trade-common-link:has-text("Marché")',
         'button:has-text("Marché")',
-    ], timeout_ms=2500)
+    ], timeout_ms=2500, name="market_type")
     if clicked_type:
-        time.sleep(0.3)
+        with wait_step("market_mode_active"):
+            page.locator(MARKET_ACTIVE).first.wait_for(state="visible", timeout=3000)
 
+@traced("buy_tab")
 def ensure_buy_tab(page):
     click_if_visible(page, [
         '[data-testid="BuyTab"]',
         'div[role="tab"]:has-text("Buy")',
         'div[role="tab"]:has-text("Acheter")',
-    ], timeout_ms=2500)
+    ], timeout_ms=2500, name="buy_tab")
 
+@traced("sell_tab")
 def ensure_sell_tab(page):
     click_if_visible(page, [
         '[data-testid="SellTab"]',
         'div[role="tab"]:has-text("Sell")',
         'div[role="tab"]:has-text("Vendre")',
-    ], timeout_ms=2500)
+    ], timeout_ms=2500, name="sell_tab")
 
 # -------- ORDER ACTIONS --------
-def market_buy(page, amount_usdt):
+@traced("market_buy")
+def market_buy(page, amount_usdt, execute=None, ready=False):
     """
     Market BUY using a total (quote) amount in USDT.
+    Returns {"side", "amount", "executed", "button_enabled"}; `execute` defaults to EXECUTE_ORDER.
+    `ready` skips selecting the Buy tab (a TradeTabPool page already has it). Market mode
+    is checked either way: an idle pooled tab may have fallen back to Limit, and the check
+    is a single visibility query when Market is still active.
     """
-    ensure_buy_tab(page)
+    execute = EXECUTE_ORDER if execute is None else execute
+    if not ready:
+        ensure_buy_tab(page)
     ensure_market_mode(page)
 
     # Locate the "Total (USDT)" input on BUY side
-    total_input = None
-    try_order_total_selectors = [
+    total_input = RESOLVER.resolve(page, "buy_total_input", [
         'input#FormRow-BUY-total',
         # Extra fallbacks if Binance changes IDs:
         'input[name="total"]',
         '[data-testid="orderFormTotal"] input',
         '[data-testid="orderFormInput"] input[name="total"]',
         'input[placeholder*="Total"]',
-    ]
-    for sel in try_order_total_selectors:
-        loc = page.locator(sel).first
-        if loc.count():
-            total_input = loc
-            break
+    ], visible=False)
     if not total_input:
         snap(page, "buy_total_input_not_found")
         raise PWTimeout("Buy total input not found.")
 
-    total_input.wait_for(state="visible", timeout=10000)
-    total_input.scroll_into_view_if_needed()
-    total_input.click()
-    try:
-        total_input.fill("")
-    except Exception:
-        pass
-    total_input.type(str(amount_usdt), delay=20)
+    with wait_step("buy_total_visible") as w:
+        total_input.wait_for(state="visible", timeout=10000)
+    if not w["ok"]:
+        snap(page, "buy_total_input_hidden")
+        raise PWTimeout("Buy total input never became visible.")
+    with TRACER.span("type_amount"):
+        total_input.scroll_into_view_if_needed()
+        total_input.click()
+        try:
+            total_input.fill("")
+        except Exception:
+            pass
+        total_input.type(str(amount_usdt), delay=20)
 
     # Find and click the BUY button
     buy_btn = find_first_visible(page, [
@@ -191,38 +438,35 @@ def market_buy(page, amount_usdt):
         '[data-testid="button-spot-buy"]',
         'button:has-text("Buy")',
         'button:has-text("Acheter")',
-    ])
+    ], name="buy_button")
     if not buy_btn:
         snap(page, "buy_button_not_found")
         raise PWTimeout("Buy button not found.")
 
-    # Wait a bit for validations to enable
-    for _ in range(30):
-        try:
-            if buy_btn.is_enabled():
-                break
-        except Exception:
-            pass
-        time.sleep(0.2)
-
-    if EXECUTE_ORDER and buy_btn.is_enabled():
-        buy_btn.click()
-        click_if_visible(page, [
-            'button:has-text("Confirm")',
-            'button:has-text("Place Order")',
-            'button:has-text("I understand")',
-            'button:has-text("Compris")',
-        ], timeout_ms=2500)
-        print(f"✅ Sent MARKET Buy for {amount_usdt} USDT.")
+    # Validations enable the button once the total is accepted
+    enabled = wait_enabled(page, buy_btn, "buy_button_enabled")
+    status = None
+    if execute and enabled:
+        status = submit_order(page, buy_btn, "buy_order_response")
+        print(f"✅ Sent MARKET Buy for {amount_usdt} USDT (order API status {status}).")
     else:
         print("🛈 Dry-run or disabled BUY button — not clicking.")
         snap(page, "buy_dry_or_disabled")
+    return {"side": "buy", "amount": amount_usdt, "executed": execute and enabled, "button_enabled": enabled,
+            "order_status": status}
 
-def sell_all(page):
+@traced("sell_all")
+def sell_all(page, execute=None, ready=False):
     """
     Market SELL: set the percentage slider to 100% and click Sell.
+    Returns {"side", "amount", "executed", "button_enabled"}; `execute` defaults to EXECUTE_ORDER.
+    `ready` skips selecting the Sell tab (a TradeTabPool page already has it). Market mode
+    is checked either way: an idle pooled tab may have fallen back to Limit, and the check
+    is a single visibility query when Market is still active.
     """
-    ensure_sell_tab(page)
+    execute = EXECUTE_ORDER if execute is None else execute
+    if not ready:
+        ensure_sell_tab(page)
     ensure_market_mode(page)
 
     # 1) Locate the SELL slider inside the SELL form
@@ -235,7 +479,8 @@ def sell_all(page):
     slider.scroll_into_view_if_needed()
 
     # 2) Set slider to 100 with native setter + fire events (React-friendly)
-    slider.evaluate("""
+    with TRACER.span("slider_100"):
+        slider.evaluate("""
         (el) => {
             // Use the native setter so frameworks detect it
             const proto = Object.getOwnPropertyDescriptor(HTMLInputElement.prototype, 'value');
@@ -246,10 +491,7 @@ def sell_all(page):
             el.dispatchEvent(new Event('input', { bubbles: true }));
             el.dispatchEvent(new Event('change', { bubbles: true }));
         }
-    """)
-
-    # (Optional) small pause to let UI update validations
-    page.wait_for_timeout(200)
+        """)
 
     # 3) Click the SELL button
     sell_btn = find_first_visible(page, [
@@ -257,52 +499,47 @@ def sell_all(page):
         '[data-testid="button-spot-sell"]',
         'button:has-text("Sell")',
         'button:has-text("Vendre")',
-    ])
+    ], name="sell_button")
     if not sell_btn:
         snap(page, "sell_button_not_found")
         raise PWTimeout("Sell button not found.")
 
-    for _ in range(30):
-        try:
-            if sell_btn.is_enabled():
-                break
-        except Exception:
-            pass
-        time.sleep(0.2)
-
-    if EXECUTE_ORDER and sell_btn.is_enabled():
-        sell_btn.click()
-        click_if_visible(page, [
-            'button:has-text("Confirm")',
-            'button:has-text("Place Order")',
-            'button:has-text("I understand")',
-            'button:has-text("Compris")',
-        ], timeout_ms=2500)
-        print("✅ Sent MARKET Sell (100%).")
+    # The slider's input/change events make the form recalculate and enable the button
+    enabled = wait_enabled(page, sell_btn, "sell_button_enabled")
+    status = None
+    if execute and enabled:
+        status = submit_order(page, sell_btn, "sell_order_response")
+        print(f"✅ Sent MARKET Sell (100%) (order API status {status}).")
     else:
         print("🛈 Dry-run or disabled SELL button — not clicking.")
         snap(page, "sell_dry_or_disabled")
+    return {"side": "sell", "amount": "100%", "executed": execute and enabled, "button_enabled": enabled,
+            "order_status": status}
 
 
 
 # -------- LOGIN & CONTEXT --------
+@traced("login")
 def login_with_passkey_and_open(symbol):
     """
     Launch Chrome with a persistent profile, log in (email + passkey), and open the trade page for `symbol`.
     Returns the (context, page).
     """
+    assert EMAIL, "Add BINANCE_EMAIL to your .env (passkey-only login)."
     p = sync_playwright().start()
-    ctx = p.chromium.launch_persistent_context(
-        user_data_dir=PROFILE_DIR,
-        headless=False,
-        args=["--start-maximized", "--disable-blink-features=AutomationControlled"],
-        user_agent=USER_AGENT_DESKTOP,
-        channel="chrome",  # <- Force installed Chrome
-    )
-    page = ctx.new_page()
+    with TRACER.span("browser_launch"):
+        ctx = p.chromium.launch_persistent_context(
+            user_data_dir=PROFILE_DIR,
+            headless=False,
+            args=["--start-maximized", "--disable-blink-features=AutomationControlled"],
+            user_agent=USER_AGENT_DESKTOP,
+            channel="chrome",  # <- Force installed Chrome
+        )
+        page = ctx.new_page()
 
     # Login
-    page.goto(LOGIN_URL, wait_until="networkidle")
+    with TRACER.span("login_page"):
+        page.goto(LOGIN_URL, wait_until="networkidle")
     try:
         accept_cookies_everywhere(page, timeout_ms=2500, max_wait_s=6)
     except Exception:
@@ -313,7 +550,7 @@ def login_with_passkey_and_open(symbol):
             '[data-e2e="input-username"]',
             'input[name="username"]',
             'input[autocomplete="username"]',
-        ])
+        ], name="login_username")
         if not username:
             snap(page, "no_username_field")
             raise PWTimeout("Email/username field not found.")
@@ -325,20 +562,18 @@ def login_with_passkey_and_open(symbol):
             '[data-e2e="btn-accounts-form-submit"]',
             'button:has-text("Suivant")',
             'button:has-text("Next")',
-        ])
+        ], name="login_next")
         if not next_btn:
             snap(page, "no_next_btn")
             raise PWTimeout("Next button not found.")
         next_btn.click()
 
-        print(f"🟡 Waiting {PASSKEY_WAIT_SECONDS}s for you to approve the passkey…")
-        time.sleep(PASSKEY_WAIT_SECONDS)
-
-        # Ensure post-login redirect completes
-        try:
-            page.wait_for_url(re.compile(r"^https://www\.binance\.com/.*"), timeout=30000)
-        except Exception:
-            pass
+        print(f"🟡 Waiting up to {PASSKEY_WAIT_SECONDS}s for you to approve the passkey…")
+        # The post-login redirect to www.binance.com is the signal that it was approved
+        with wait_step("passkey_approval") as w:
+            page.wait_for_url(re.compile(r"^https://www\.binance\.com/.*"), timeout=PASSKEY_WAIT_SECONDS * 1000)
+        if not w["ok"]:
+            print("⚠️ No post-login redirect before the deadline; continuing anyway.")
         page.wait_for_load_state("domcontentloaded")
     except PWTimeout as e:
         print(f"⛔ Login timeout: {e}")
@@ -348,7 +583,316 @@ def login_with_passkey_and_open(symbol):
     ensure_trade_page(page, symbol)
     return p, ctx, page
 
+# -------- TRADE TAB POOL --------
+class TradeTabPool:
+    """
+    Pre-opened trade pages, one per symbol, each already on Market mode with the Buy or
+    Sell tab selected, so an order can start typing straight away. At most `max_tabs` are
+    kept; opening another closes the least recently used one. health_check() re-warms
+    tabs that were closed, navigated away, or lost Market mode; get() runs it for a tab
+    whose last check is older than `health_seconds`.
+    """
+
+    def __init__(self, ctx, max_tabs=4, health_seconds=60):
+        if max_tabs < 1:
+            raise ValueError(f"max_tabs must be at least 1, got {max_tabs}.")
+        self.ctx = ctx
+        self.max_tabs = max_tabs
+        self.health_seconds = health_seconds
+        self.tabs = OrderedDict()  # symbol -> {"page", "side", "used", "checked"}; oldest use first
+
+    @staticmethod
+    def _select_side(page, side):
+        (ensure_buy_tab if side == "buy" else ensure_sell_tab)(page)
+
+    @traced("pool_warm")
+    def warm(self, symbol, side="buy", page=None):
+        """Open (or adopt `page` as) the ready tab for `symbol`, evicting the LRU tab if full."""
+        if symbol not in self.tabs:
+            while len(self.tabs) >= self.max_tabs:
+                old_symbol, old = self.tabs.popitem(last=False)
+                print(f"♻️ Closing idle {old_symbol} tab.")
+                try:
+                    old["page"].close()
+                except Exception:
+                    pass
+        tab = self.tabs.get(symbol)
+        if page is None:
+            page = tab["page"] if tab is not None and not tab["page"].is_closed() else self.ctx.new_page()
+        if f"/trade/{symbol}" not in page.url:
+            ensure_trade_page(page, symbol)
+        ensure_market_mode(page)
+        self._select_side(page, side)
+        now = time.time()
+        # a re-warmed tab keeps its place in the LRU order; new tabs go to the most recent end
+        self.tabs[symbol] = {"page": page, "side": side, "used": tab["used"] if tab else now, "checked": now}
+        return page
+
+    def _healthy(self, symbol, tab):
+        page = tab["page"]
+        try:
+            return (not page.is_closed() and f"/trade/{symbol}" in page.url
+                    and page.locator(MARKET_ACTIVE).count() > 0)
+        except Exception:
+            return False
+
+    @traced("pool_health")
+    def health_check(self, force=False):
+        """Re-warm every tab that fails the check; returns the symbols that were repaired."""
+        repaired = []
+        for symbol, tab in list(self.tabs.items()):
+            if not force and time.time() - tab["checked"] < self.health_seconds:
+                continue
+            if self._healthy(symbol, tab):
+                tab["checked"] = time.time()
+                continue
+            print(f"🩺 {symbol} tab unhealthy, re-warming.")
+            try:
+                self.warm(symbol, tab["side"])
+            except Exception as e:
+                print(f"⚠️ Could not re-warm {symbol}: {e}")
+                self.tabs.pop(symbol, None)
+                continue
+            repaired.append(symbol)
+        return repaired
+
+    def get(self, symbol, side):
+        """Ready page for an order on `symbol`: pooled (checked if stale) or freshly warmed."""
+        tab = self.tabs.get(symbol)
+        if tab is not None and time.time() - tab["checked"] >= self.health_seconds:
+            if self._healthy(symbol, tab):
+                tab["checked"] = time.time()
+            else:
+                tab = None
+        if tab is None:
+            self.warm(symbol, side)
+            tab = self.tabs[symbol]
+        elif tab["side"] != side:
+            self._select_side(tab["page"], side)
+            tab["side"] = side
+        tab["used"] = time.time()
+        self.tabs.move_to_end(symbol)
+        return tab["page"]
+
+    def status(self):
+        return {symbol: {"side": t["side"], "idle_s": round(time.time() - t["used"], 1)} for symbol, t in self.tabs.items()}
+
+
+# -------- SESSION DAEMON --------
+class TradingSession:
+    """
+    One logged-in browser kept open across orders. Playwright's sync API is bound to the
+    thread that started it, so orders are executed one at a time on that thread.
+    """
+
+    def __init__(self, symbol, pool_symbols=(), max_tabs=4, health_seconds=60):
+        self.p, self.ctx, self.page = login_with_passkey_and_open(symbol)
+        self.symbol = symbol
+        self.orders = 0
+        self.pool = None
+        if pool_symbols:
+            # the login tab becomes the first pooled tab; the rest are opened up to the pool bound
+            self.pool = TradeTabPool(self.ctx, max_tabs=max_tabs, health_seconds=health_seconds)
+            self.pool.warm(symbol, page=self.page)
+            others = [s for s in dict.fromkeys(pool_symbols) if s != symbol]
+            if len(others) + 1 > max_tabs:
+                print(f"⚠️ {len(others) + 1} symbols but --max-tabs {max_tabs}: not pre-opening "
+                      f"{', '.join(others[max_tabs - 1:])} (opened on first order, evicting the LRU tab).")
+            for other in others[:max_tabs - 1]:
+                self.pool.warm(other)
+
+    def execute(self, request):
+        """Run one {"cmd": "buy"|"sell", "symbol", "amount", "dry"} request and return a result dict."""
+        t0 = time.perf_counter()
+        WAIT_LOG.clear()  # drop the waits of health checks run since the last order
+        cmd = request.get("cmd")
+        symbol = request.get("symbol") or self.symbol
+        result = {"ok": False, "cmd": cmd, "symbol": symbol}
+        try:
+            if cmd not in ("buy", "sell"):
+                raise ValueError(f"Unknown command {cmd!r}.")
+            if self.pool is not None:
+                self.page = self.pool.get(symbol, cmd)
+                self.symbol = symbol
+            elif symbol != self.symbol:
+                ensure_trade_page(self.page, symbol)
+                self.symbol = symbol
+            execute = EXECUTE_ORDER and not request.get("dry", False)
+            ready = self.pool is not None
+            if cmd == "buy":
+                result.update(market_buy(self.page, float(request["amount"]), execute=execute, ready=ready))
+            else:
+                result.update(sell_all(self.page, execute=execute, ready=ready))
+            result["ok"] = True
+            self.orders += 1
+        except Exception as e:
+            snap(self.page, f"session_{cmd}_error")
+            result["error"] = f"{type(e).__name__}: {e}"
+        result["latency_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+        result["waits"] = list(WAIT_LOG)
+        WAIT_LOG.clear()
+        return result
+
+    def close(self):
+        RESOLVER.print_report()
+        RESOLVER.save()
+        try:
+            self.ctx.close()
+        finally:
+            self.p.stop()
+
+
+def _session_token(create=False):
+    path = pathlib.Path(SESSION_TOKEN_FILE)
+    if create:
+        # created owner-only from the start (O_EXCL after unlink, so an old file's mode is never reused)
+        path.unlink(missing_ok=True)
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(secrets.token_hex(16))
+    return path.read_text(encoding="utf-8").strip()
+
+def serve_session(session, host=SESSION_HOST, port=SESSION_PORT):
+    """
+    Accept JSON-line requests on a loopback socket until a {"cmd": "shutdown"} arrives.
+    Each request must carry the token from SESSION_TOKEN_FILE; each gets one JSON-line reply.
+    """
+    token = _session_token(create=True)
+    srv = socket.create_server((host, port))
+    if session.pool is not None:
+        srv.settimeout(session.pool.health_seconds)  # idle periods run the pool's health check
+    print(f"🟢 Session ready on {host}:{port} ({session.symbol}). Ctrl+C to stop.")
+    try:
+        while True:
+            try:
+                conn, _ = srv.accept()
+            except socket.timeout:
+                session.pool.health_check()
+                continue
+            # a silent client would otherwise block every other client and the pool health checks
+            conn.settimeout(SESSION_READ_TIMEOUT)
+            try:
+                with conn, conn.makefile("rw", encoding="utf-8") as stream:
+                    for line in stream:
+                        try:
+                            request = json.loads(line)
+                        except ValueError:
+                            request = {}
+                        if not secrets.compare_digest(str(request.get("token", "")), token):
+                            reply = {"ok": False, "error": "bad or missing token"}
+                        elif request.get("cmd") == "ping":
+                            reply = {"ok": True, "cmd": "ping", "symbol": session.symbol, "orders": session.orders,
+                                     "selectors": RESOLVER.summary(),
+                                     "tabs": session.pool.status() if session.pool is not None else None}
+                        elif request.get("cmd") == "shutdown":
+                            stream.write(json.dumps({"ok": True, "cmd": "shutdown"}) + "\n")
+                            stream.flush()
+                            return
+                        else:
+                            reply = session.execute(request)
+                            print(f"📨 {reply}")
+                        stream.write(json.dumps(reply) + "\n")
+                        stream.flush()
+            except OSError as e:  # client went away or stayed silent; keep serving
+                print(f"⚠️ Session client error: {e}")
+    except KeyboardInterrupt:
+        print("\n🛑 Session stopped.")
+    finally:
+        srv.close()
+        pathlib.Path(SESSION_TOKEN_FILE).unlink(missing_ok=True)
+
+def send_to_session(request, host=SESSION_HOST, port=SESSION_PORT, timeout=60):
+    """Send one request to a running `serve` process and return its reply."""
+    request = dict(request, token=_session_token())
+    with socket.create_connection((host, port), timeout=timeout) as conn, \
+            conn.makefile("rw", encoding="utf-8") as stream:
+        stream.write(json.dumps(request) + "\n")
+        stream.flush()
+        return json.loads(stream.readline())
+
+# -------- OFFLINE BENCHMARK --------
+class _QuietHandler(http.server.SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+def serve_fixtures(directory):
+    """Serve `directory` on an ephemeral loopback port from a daemon thread."""
+    httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(_QuietHandler, directory=directory))
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    return httpd
+
+def summarize_spans(spans):
+    """{name: {"count", "errors", "p50_ms", "p95_ms", "max_ms"}} over finished spans."""
+    by_name = {}
+    for rec in spans:
+        by_name.setdefault(rec["name"], []).append(rec)
+    out = {}
+    for name, recs in by_name.items():
+        ms = sorted(r["ms"] for r in recs)
+        out[name] = {
+            "count": len(ms),
+            "errors": sum(1 for r in recs if "error" in r or r.get("ok") is False),
+            "p50_ms": ms[len(ms) // 2],
+            "p95_ms": ms[min(len(ms) - 1, int(len(ms) * 0.95))],
+            "max_ms": ms[-1],
+        }
+    return out
+
+def run_order_benchmark(fixtures, repeat=3, amount=10.0, cookie_wait_s=1.0, headless=True):
+    """
+    Replay the buy and sell flows (dry-run, nothing is clicked) against saved trade pages,
+    e.g. the debug/ snapshots written by snap(). Pages are served from a local HTTP server
+    and every other request is blocked, so no Binance account or network is needed. The
+    selector cache starts empty, so the first iteration shows cold lookups.
+    """
+    global EXECUTE_ORDER, SNAP_DIR, RESOLVER, WAIT_LOG
+    EXECUTE_ORDER, SNAP_DIR = False, None
+    RESOLVER = SelectorResolver(pathlib.Path(tempfile.mkdtemp()) / "selectors.json")
+    TRACER.enable(max_spans=None)  # the summary and the waits cover every iteration
+    WAIT_LOG = deque()
+    root = os.path.commonpath([os.path.abspath(f) for f in fixtures]) if len(fixtures) > 1 \
+        else os.path.dirname(os.path.abspath(fixtures[0]))
+    httpd = serve_fixtures(root)
+    base = f"http://127.0.0.1:{httpd.server_port}/"
+    p = sync_playwright().start()
+    try:
+        with TRACER.span("browser_launch"):
+            browser = p.chromium.launch(headless=headless)
+            page = browser.new_page(user_agent=USER_AGENT_DESKTOP)
+        page.route("**/*", lambda route: route.continue_() if route.request.url.startswith(base) else route.abort())
+        for i in range(repeat):
+            for fixture in fixtures:
+                rel = os.path.relpath(os.path.abspath(fixture), root).replace(os.sep, "/")
+                with TRACER.span("iteration", fixture=rel, iteration=i):
+                    with TRACER.span("load_fixture"):
+                        page.goto(base + rel, wait_until="domcontentloaded")
+                    accept_cookies_everywhere(page, timeout_ms=0, max_wait_s=cookie_wait_s)
+                    for side, flow in (("buy", lambda: market_buy(page, amount)), ("sell", lambda: sell_all(page))):
+                        try:
+                            flow()
+                        except Exception as e:  # a fixture missing part of the form still yields timings
+                            print(f"⚠️ {rel} {side}: {type(e).__name__}: {e}")
+        browser.close()
+    finally:
+        p.stop()
+        httpd.shutdown()
+    return summarize_spans(TRACER.spans)
+
+def print_span_summary(summary, old=None):
+    print(f"{'span':24s} {'n':>4s} {'err':>4s} {'p50 ms':>9s} {'p95 ms':>9s} {'max ms':>9s}" + ("  p50 vs old" if old else ""))
+    for name, st in sorted(summary.items(), key=lambda kv: -kv[1]["p50_ms"] * kv[1]["count"]):
+        ratio = ""
+        if old and name in old and old[name]["p50_ms"]:
+            ratio = f"  {st['p50_ms'] / old[name]['p50_ms']:.2f}x"
+        print(f"{name:24s} {st['count']:4d} {st['errors']:4d} {st['p50_ms']:9.1f} {st['p95_ms']:9.1f} {st['max_ms']:9.1f}{ratio}")
+
 # -------- CLI --------
+def _positive_int(text):
+    value = int(text)
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return value
+
 def main():
     parser = argparse.ArgumentParser(description="Binance passkey login + market trade helpers.")
     sub = parser.add_subparsers(dest="cmd", required=True)
@@ -360,13 +904,72 @@ def main():
     p_sell = sub.add_parser("sell", help="Market SELL 100% of current asset.")
     p_sell.add_argument("--symbol", required=True, help="Trading pair to sell, e.g., BTC_USDT")
 
+    p_serve = sub.add_parser("serve", help="Log in once and take buy/sell orders over a local socket.")
+    p_serve.add_argument("--symbol", required=True, help="Trade page to open at login, e.g., BTC_USDT")
+    p_serve.add_argument("--symbols", default=None,
+                         help="Comma-separated pairs to keep pre-opened ready-to-trade tabs for, e.g., BTC_USDT,ETH_USDT")
+    p_serve.add_argument("--max-tabs", type=_positive_int, default=4, help="Pool bound; the least recently used tab is closed")
+    p_serve.add_argument("--health-seconds", type=float, default=60, help="Seconds between tab health checks")
+
+    sub.add_parser("stop", help="Shut down a running session.")
+
+    p_bench = sub.add_parser("bench", help="Time the order flows offline against saved HTML pages (dry-run).")
+    p_bench.add_argument("--fixtures", default="debug/*trade*.html,debug/no_total_input.html",
+                         help="Comma-separated globs of saved trade pages")
+    p_bench.add_argument("--repeat", type=int, default=3)
+    p_bench.add_argument("--amount", type=float, default=10.0, help="USDT amount typed into the buy form")
+    p_bench.add_argument("--cookie-wait", type=float, default=1.0, help="Seconds to look for a cookie banner")
+    p_bench.add_argument("--headed", action="store_true", help="Show the browser")
+    p_bench.add_argument("--out", default="bench_orders.json", help="Per-span summary (JSON)")
+    p_bench.add_argument("--compare", default=None, help="Previous --out file to compare p50s against")
+
     parser.add_argument("--dry", action="store_true", help="Dry-run (do not click final Buy/Sell)")
+    parser.add_argument("--session", action="store_true",
+                        help="Send buy/sell to the running `serve` process instead of launching Chrome")
+    parser.add_argument("--port", type=int, default=SESSION_PORT, help="Session port (loopback only)")
+    parser.add_argument("--trace", default=None, help="Append a JSONL span per phase (launch, login, tabs, typing, …)")
 
     args = parser.parse_args()
+    if args.trace:
+        TRACER.open(args.trace)
 
     global EXECUTE_ORDER
     EXECUTE_ORDER = not args.dry
 
+    if args.cmd == "bench":
+        fixtures = sorted({f for pattern in args.fixtures.split(",") for f in glob.glob(pattern.strip())})
+        if not fixtures:
+            sys.exit(f"No fixtures match {args.fixtures!r}.")
+        summary = run_order_benchmark(fixtures, repeat=args.repeat, amount=args.amount,
+                                      cookie_wait_s=args.cookie_wait, headless=not args.headed)
+        old = None
+        if args.compare:
+            with open(args.compare, encoding="utf-8") as f:
+                old = json.load(f)["spans"]
+        print_span_summary(summary, old)
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"fixtures": fixtures, "repeat": args.repeat, "waits": list(WAIT_LOG), "spans": summary}, f, indent=1)
+        print(f"📊 {len(TRACER.spans)} spans over {len(fixtures)} fixtures x {args.repeat} → {args.out}")
+        return
+    if args.cmd == "serve":
+        pool_symbols = [s.strip() for s in args.symbols.split(",") if s.strip()] if args.symbols else ()
+        session = TradingSession(args.symbol, pool_symbols, max_tabs=args.max_tabs,
+                                 health_seconds=args.health_seconds)
+        try:
+            serve_session(session, port=args.port)
+        finally:
+            session.close()
+        return
+    if args.cmd == "stop" or args.session:
+        if args.cmd == "stop":
+            request = {"cmd": "shutdown"}
+        else:
+            request = {"cmd": args.cmd, "symbol": args.symbol, "dry": args.dry}
+            if args.cmd == "buy":
+                request["amount"] = args.amount
+        print(json.dumps(send_to_session(request, port=args.port)))
+        return
+
     p, ctx, page = login_with_passkey_and_open(args.symbol)
 
     try:
@@ -377,6 +980,9 @@ def main():
         else:
             print("Unknown command.")
     finally:
+        print_wait_report(WAIT_LOG)
+        RESOLVER.print_report()
+        RESOLVER.save()
         try:
             input("Press Enter to close…")
         except KeyboardInterrupt:
@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for moving_average_crossovers.py
+
+Generates seeded synthetic OHLCV series (geometric random walk plus a slow cycle that
+controls how often the SMAs cross), times each backtest stage and records its peak
+memory, and writes everything to a JSON file so runs from different versions can be
+compared. Runs fully offline: no yfinance calls.
+
+Usage examples
+--------------
+# Default sizes (1e3 .. 1e6 bars), results to bench_results.json
+python bench_backtester.py
+
+# Bigger sizes, only the fast stages, more frequent crossovers
+python bench_backtester.py --sizes 1e6,1e7 --stages indicators,run_numpy,summarize --cycle-bars 200
+
+# Interpreter startup only: module import and a tiny CSV backtest through the CLI
+python bench_backtester.py --stages startup
+
+# Compare against a previous run (ratios > 1 mean the new run is slower)
+python bench_backtester.py --out new.json --compare old.json
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+import moving_average_crossovers as mac
+
+
+STAGES = ("startup", "csv_load", "indicators", "run_numpy", "run_pandas", "summarize")
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# child process: time the import, report peak RSS (POSIX only) and which heavy modules got loaded
+_IMPORT_PROBE = """
+import json, sys, time
+t0 = time.perf_counter()
+import moving_average_crossovers
+t1 = time.perf_counter()
+try:
+    import resource
+    maxrss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+except ImportError:  # Windows
+    maxrss_kb = None
+print(json.dumps({"import_s": t1 - t0, "maxrss_kb": maxrss_kb,
+                  "heavy": sorted(m for m in ("yfinance", "matplotlib") if m in sys.modules)}))
+"""
+
+
+# ---------- Synthetic data ----------
+
+def synthetic_ohlcv(
+    n: int,
+    seed: int = 0,
+    vol: float = 0.001,
+    cycle_bars: int = 500,
+    cycle_amp: float = 0.02,
+    start: str = "2020-01-01",
+    freq: str = "1min",
+) -> pd.DataFrame:
+    """
+    Seeded geometric random walk with a sinusoidal drift of period `cycle_bars`.
+    A larger `cycle_amp` relative to `vol` makes crossovers follow the cycle, so
+    SMA pairs shorter than the cycle cross roughly twice per period.
+    """
+    rng = np.random.default_rng(seed)
+    t = np.arange(n)
+    log_close = np.log(100.0) + np.cumsum(rng.normal(0.0, vol, n)) + cycle_amp * np.sin(2 * np.pi * t / cycle_bars)
+    close = np.exp(log_close)
+    open_ = np.empty(n)
+    open_[0] = close[0]
+    open_[1:] = close[:-1]
+    wick = np.abs(rng.normal(0.0, vol / 2, n))
+    high = np.maximum(open_, close) * (1 + wick)
+    low = np.minimum(open_, close) * (1 - wick)
+    volume = rng.lognormal(10.0, 1.0, n)
+    index = pd.date_range(start, periods=n, freq=freq, name="timestamp")
+    return pd.DataFrame({"open": open_, "high": high, "low": low, "close": close, "volume": volume}, index=index)
+
+
+# ---------- Measurement ----------
+
+def _measure(fn: Callable, repeat: int, memory: bool) -> dict:
+    """Best-of-`repeat` wall time, plus peak traced allocation from one extra traced call."""
+    best = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    peak_mb = None
+    if memory:
+        gc.collect()
+        tracemalloc.start()
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        peak_mb = peak / 2**20
+    return {"seconds": best, "peak_mb": peak_mb}
+
+
+def _child_maxrss_mb(cmd: List[str]) -> Tuple[float, Optional[float]]:
+    """Wall time and peak RSS (MB, None where os.wait4 is missing, e.g. Windows) of one child process."""
+    t0 = time.perf_counter()
+    if not hasattr(os, "wait4"):
+        subprocess.run(cmd, cwd=HERE, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        return time.perf_counter() - t0, None
+    pid = subprocess.Popen(cmd, cwd=HERE, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL).pid
+    _, status, usage = os.wait4(pid, 0)
+    wall = time.perf_counter() - t0
+    if status != 0:
+        raise RuntimeError(f"{' '.join(cmd)} exited with status {status}")
+    return wall, usage.ru_maxrss / 1024
+
+
+def run_startup_benchmarks(repeat: int = 3) -> List[dict]:
+    """
+    Fresh-interpreter costs: importing moving_average_crossovers, and a complete
+    `backtest --csv` CLI run on 1,000 bars (no plot, no result cache).
+    """
+    results = []
+    probes = []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, "-c", _IMPORT_PROBE], cwd=HERE, capture_output=True, text=True, check=True)
+        probes.append(json.loads(out.stdout))
+    best = min(probes, key=lambda p: p["import_s"])
+    rss_kb = [p["maxrss_kb"] for p in probes if p["maxrss_kb"] is not None]
+    results.append({"stage": "startup_import", "bars": 0, "seconds": best["import_s"],
+                    "peak_mb": max(rss_kb) / 1024 if rss_kb else None, "heavy_modules": best["heavy"]})
+
+    fd, csv_path = tempfile.mkstemp(suffix=".csv")
+    os.close(fd)
+    try:
+        synthetic_ohlcv(1000).to_csv(csv_path)
+        cmd = [sys.executable, "moving_average_crossovers.py", "backtest", "--csv", csv_path, "--engine", "numpy",
+               "--no-result-cache"]
+        runs = [_child_maxrss_mb(cmd) for _ in range(repeat)]
+    finally:
+        os.remove(csv_path)
+    rss_mb = [r[1] for r in runs if r[1] is not None]
+    results.append({"stage": "startup_cli_csv", "bars": 1000, "seconds": min(r[0] for r in runs),
+                    "peak_mb": max(rss_mb) if rss_mb else None})
+
+    for row in results:
+        row["bars_per_sec"] = row["bars"] / row["seconds"]
+        extra = f"  loaded {row['heavy_modules']}" if "heavy_modules" in row else ""
+        peak = f"{row['peak_mb']:.1f} MB" if row["peak_mb"] is not None else "n/a"
+        print(f"  {row['stage']:16s} {row['seconds'] * 1e3:10.2f} ms  peak RSS {peak}{extra}")
+    return results
+
+
+def run_benchmarks(
+    sizes: List[int],
+    stages: List[str],
+    fast: int = 50,
+    slow: int = 200,
+    seed: int = 0,
+    vol: float = 0.001,
+    cycle_bars: int = 500,
+    repeat: int = 3,
+    memory: bool = True,
+    max_pandas_bars: int = 100_000,
+    max_csv_bars: int = 10_000_000,
+) -> List[dict]:
+    results = []
+    if "startup" in stages:
+        print("[bench] interpreter startup")
+        results += run_startup_benchmarks(repeat)
+        stages = [s for s in stages if s != "startup"]
+    for n in sizes if stages else []:
+        df = synthetic_ohlcv(n, seed=seed, vol=vol, cycle_bars=cycle_bars)
+        print(f"[bench] {n:,} bars generated (fast={fast}, slow={slow})")
+        # trade count of the latest engine run; only the count is kept, not the run's frames
+        trades = {}
+
+        def run_engine(engine):
+            bt = mac.CrossoverBacktester(fast=fast, slow=slow, engine=engine)
+            bt.run(df)
+            trades["n"] = len(bt.trades)
+
+        first = len(results)
+        for stage in stages:
+            if stage == "run_pandas" and n > max_pandas_bars:
+                continue
+            if stage == "csv_load" and n > max_csv_bars:
+                continue
+            csv_path = None
+            if stage == "csv_load":
+                fd, csv_path = tempfile.mkstemp(suffix=".csv")
+                os.close(fd)
+                df.to_csv(csv_path)
+                fn = lambda: mac.load_ohlcv_from_csv(csv_path)
+            elif stage == "indicators":
+                fn = lambda: mac.compute_indicators(df, fast, slow)
+            elif stage in ("run_numpy", "run_pandas"):
+                engine = stage.split("_")[1]
+                fn = lambda: run_engine(engine)
+            elif stage == "summarize":
+                bt = mac.CrossoverBacktester(fast=fast, slow=slow, engine="numpy")
+                df_eq, _ = bt.run(df)
+                trades["n"] = len(bt.trades)
+                fn = lambda: bt.summarize(df_eq, "1m")
+            else:
+                raise ValueError(f"Unknown stage {stage!r}. Choose from: {STAGES}")
+            try:
+                # the row-by-row engine is slow enough already; don't trace it
+                m = _measure(fn, repeat=1 if stage == "run_pandas" else repeat,
+                             memory=memory and stage != "run_pandas")
+            finally:
+                if csv_path:
+                    os.remove(csv_path)
+            row = {"stage": stage, "bars": n, **m, "bars_per_sec": n / m["seconds"]}
+            peak = f"{m['peak_mb']:.1f} MB" if m["peak_mb"] is not None else "-"
+            print(f"  {stage:12s} {m['seconds'] * 1e3:10.2f} ms  {row['bars_per_sec']:14,.0f} bars/s  peak {peak}")
+            results.append(row)
+            fn = bt = df_eq = None  # free this stage's frames before the next one is measured
+        for row in results[first:]:
+            row["trades"] = trades.get("n")
+        del df
+    return results
+
+
+def _environment() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "timestamp": pd.Timestamp.now().isoformat(),
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def compare(new: List[dict], old_path: str) -> pd.DataFrame:
+    """Time ratio new/old per (stage, bars) present in both files."""
+    with open(old_path, encoding="utf-8") as f:
+        old = pd.DataFrame(json.load(f)["results"])
+    merged = pd.DataFrame(new).merge(old, on=["stage", "bars"], suffixes=("", "_old"))
+    merged["time_ratio"] = merged["seconds"] / merged["seconds_old"]
+    return merged[["stage", "bars", "seconds_old", "seconds", "time_ratio"]]
+
+
+# ---------- CLI ----------
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark suite for the SMA crossover backtester")
+    parser.add_argument("--sizes", type=str, default="1e3,1e4,1e5,1e6", help="comma-separated bar counts")
+    parser.add_argument("--stages", type=str, default=",".join(STAGES), help=f"subset of {','.join(STAGES)}")
+    parser.add_argument("--fast", type=int, default=50)
+    parser.add_argument("--slow", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--vol", type=float, default=0.001, help="per-bar log-return volatility")
+    parser.add_argument("--cycle-bars", type=int, default=500, help="drift cycle length; shorter = more crossovers")
+    parser.add_argument("--repeat", type=int, default=3, help="timed repetitions per stage (best is kept)")
+    parser.add_argument("--no-memory", action="store_true", help="skip the traced peak-memory pass")
+    parser.add_argument("--max-pandas-bars", type=int, default=100_000, help="largest size for the row-loop engine")
+    parser.add_argument("--max-csv-bars", type=int, default=10_000_000, help="largest size for the CSV stage")
+    parser.add_argument("--out", type=str, default="bench_results.json")
+    parser.add_argument("--compare", type=str, default=None, help="previous results file to compare against")
+    args = parser.parse_args()
+
+    sizes = [int(float(x)) for x in args.sizes.split(",") if x.strip()]
+    stages = [s.strip() for s in args.stages.split(",") if s.strip()]
+    results = run_benchmarks(
+        sizes, stages, fast=args.fast, slow=args.slow, seed=args.seed, vol=args.vol,
+        cycle_bars=args.cycle_bars, repeat=args.repeat, memory=not args.no_memory,
+        max_pandas_bars=args.max_pandas_bars, max_csv_bars=args.max_csv_bars
+    )
+    report = {
+        "environment": _environment(),
+        "config": {k: v for k, v in vars(args).items() if k not in ("out", "compare")},
+        "results": results,
+    }
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=1)
+    print(f"\n[bench] {len(results)} measurements written to {args.out}")
+
+    if args.compare:
+        print("\n--- Compared with", args.compare, "---")
+        print(compare(results, args.compare).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
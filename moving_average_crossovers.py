@@ -3,13 +3,15 @@
 Trend-Following Bot: Moving Average Crossover (Golden/Death Cross)
 
 Features
-- SMA crossover signals (configurable window lengths)
+- SMA crossover signals (configurable window lengths); EMA/WMA lines and a volume filter via a cached indicator pipeline
 - Long-only by default; optional shorting
 - Fixed-fraction position sizing
 - Fixed % stop-loss and take-profit
-- Backtest on CSV or yfinance
-- Simple paper-trading loop using yfinance 1m/5m candles (simulated fills)
-- Metrics + trade log + optional equity curve plot
+- Backtest on CSV or yfinance (yfinance bars cached locally in a memory-mapped store)
+- Parallel parameter sweeps over a shared-memory close array
+- Multi-asset portfolio backtest over a bars x symbols close matrix
+- Simple paper-trading loop using yfinance 1m/5m candles (simulated fills), or an accelerated offline replay
+- Metrics (incl. profit factor, holding time, exposure) + columnar trade log (CSV/Parquet export) + optional equity curve plot
 
 Usage examples
 --------------
@@ -19,21 +21,80 @@ python mac_bot.py backtest --ticker BTC-USD --interval 1d --start 2019-01-01 --e
 # Backtest from a CSV (needs columns: timestamp,open,high,low,close,volume)
 python mac_bot.py backtest --csv data.csv
 
+# Convert a large CSV once into a memory-mappable bars directory, then backtest from it instantly
+python mac_bot.py ingest --csv data.csv --out data.bars
+python mac_bot.py backtest --bars data.bars --interval 1m
+
+# Out-of-core backtest in fixed-size blocks (constant memory, metrics only)
+python mac_bot.py backtest --bars data.bars --interval 1m --chunk-bars 1000000
+
+# Repeat backtests are answered from ./backtest_cache (keyed by bars content + parameters); --no-result-cache recomputes
+python mac_bot.py backtest --csv data.csv --fast 20 --slow 100
+
+# Same backtest on the vectorized NumPy engine (identical results, much faster on long histories)
+python mac_bot.py backtest --csv data.csv --engine numpy
+
+# Walk-forward: optimize on rolling in-sample windows, trade the next out-of-sample window
+python mac_bot.py walkforward --ticker BTC-USD --interval 1d --is-bars 750 --oos-bars 250
+
+# Monte Carlo: 100k resampled trade sequences (or --method block for block-bootstrapped bar returns)
+python mac_bot.py montecarlo --ticker BTC-USD --interval 1d --paths 100000
+
+# Portfolio: the crossover across many symbols in one pass (equity split across open positions)
+python mac_bot.py portfolio --tickers BTC-USD,ETH-USD,SOL-USD --interval 1d
+
+# Refresh a whole universe into the local store (concurrent, rate-limited, retried)
+python mac_bot.py fetch --tickers BTC-USD,ETH-USD,SOL-USD,AAPL,MSFT --interval 1d --start 2019-01-01 --rate 2
+
+# Inspect / trim the local OHLCV store (repeat --ticker runs are served from it, --offline never downloads)
+python mac_bot.py cache list
+python mac_bot.py cache evict --max-mb 500
+
+# Rank a parameter grid on all cores (ranges are start:stop:step or a,b,c lists)
+python mac_bot.py sweep --ticker BTC-USD --interval 1d --fast 5:100:5 --slow 20:300:10 --stop-loss 0.02:0.1:0.02
+
 # Paper-trade (simulated) BTC-USD on 5m candles
 python mac_bot.py paper --ticker BTC-USD --interval 5m
 
+# Paper-trade many symbols/intervals in one process (fetches shared per ticker, wake-ups at bar close)
+python mac_bot.py supervise --symbols BTC-USD:5m,ETH-USD:5m,BTC-USD:1m:20:100 --status-json paper_status.json
+
+# Load-test the paper loop offline: replay stored 1m bars 600x faster than real time (or --speed inf)
+python mac_bot.py paper --ticker BTC-USD --interval 1m --replay-csv btc_1m.csv --speed 600 --poll-seconds 5
+
+# Where does the time go? Per-stage wall/CPU/peak memory/bars/s to profile.json, cProfile of the slowest stage
+python mac_bot.py backtest --csv data.csv --engine numpy --profile --profile-dump hottest.prof
+python mac_bot.py paper --ticker BTC-USD --interval 1m --replay-csv btc_1m.csv --speed inf --quiet --profile paper_profile.json
+
 Disclaimer: This code is for educational purposes only. Trading involves substantial risk.
 """
 
 import argparse
+import asyncio
+import hashlib
+import itertools
+import json
+import os
+import pathlib
+import random
+import re
+import shutil
+import tempfile
+import threading
 import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
 from dataclasses import dataclass
-from typing import Optional, List, Tuple
+from multiprocessing import Pool, shared_memory
+from typing import Callable, Dict, Iterable, Iterator, Optional, List, Tuple, Union
 
 import numpy as np
 import pandas as pd
-import yfinance as yf
-import matplotlib.pyplot as plt
+
+# yfinance and matplotlib are imported inside the functions that use them: together they
+# take longer to import than everything else, and CSV/bars backtests and sweep workers
+# never need them.
 
 
 # ---------- Utilities ----------
@@ -43,9 +104,20 @@ def load_ohlcv_from_yf(ticker: str, interval: str, start: Optional[str] = None,
     Load OHLCV using yfinance.
     interval examples: '1m','2m','5m','15m','1h','1d','1wk','1mo'
     """
+    import yfinance as yf
+
     df = yf.download(ticker, interval=interval, start=start, end=end, auto_adjust=False, progress=False)
     if df.empty:
         raise ValueError("No data returned from yfinance. Check ticker/interval/time range.")
+    return _tidy_yf(df)
+
+
+def _tidy_yf(df: pd.DataFrame) -> pd.DataFrame:
+    """Lower-case, numeric OHLCV columns from a single-ticker yf.download frame."""
+    if isinstance(df.columns, pd.MultiIndex):
+        # newer yfinance returns (field, ticker) column pairs even for one ticker
+        df = df.droplevel(-1, axis=1)
+        df.columns.name = None
     df = df.rename(columns=str.lower)
     df.index.name = "timestamp"
     # Ensure numeric
@@ -55,6 +127,41 @@ def load_ohlcv_from_yf(ticker: str, interval: str, start: Optional[str] = None,
     return df[["open", "high", "low", "close", "volume"]]
 
 
+INTERVAL_DELTAS = {
+    "1m": pd.Timedelta(minutes=1),
+    "2m": pd.Timedelta(minutes=2),
+    "5m": pd.Timedelta(minutes=5),
+    "15m": pd.Timedelta(minutes=15),
+    "30m": pd.Timedelta(minutes=30),
+    "1h": pd.Timedelta(hours=1),
+    "1d": pd.Timedelta(days=1),
+    "1wk": pd.Timedelta(weeks=1),
+}
+
+
+def fetch_closed_bars(ticker: str, interval: str, start=None, period: Optional[str] = None) -> pd.DataFrame:
+    """
+    Poll yfinance for recent candles and keep only bars that have closed.
+    Pass `start` (the last bar already seen) to fetch just the delta, or `period` for a seed window.
+    Returns an empty frame when nothing new is available.
+    """
+    import yfinance as yf
+
+    kwargs = {"start": start} if start is not None else {"period": period or "60d"}
+    df = yf.download(ticker, interval=interval, auto_adjust=False, progress=False, **kwargs)
+    if df.empty:
+        return df
+    df = _tidy_yf(df)
+    # the last row is usually the still-forming candle; drop anything whose close is in the future
+    delta = INTERVAL_DELTAS.get(interval)
+    if delta is not None and len(df):
+        now = pd.Timestamp.now(tz=df.index.tz)
+        df = df[df.index + delta <= now]
+    if start is not None:
+        df = df[df.index > pd.Timestamp(start)]
+    return df
+
+
 def load_ohlcv_from_csv(csv_path: str, ts_col: str = "timestamp") -> pd.DataFrame:
     df = pd.read_csv(csv_path)
     # Try parse timestamp
@@ -69,20 +176,265 @@ def load_ohlcv_from_csv(csv_path: str, ts_col: str = "timestamp") -> pd.DataFram
     return df[cols].dropna()
 
 
-def compute_indicators(df: pd.DataFrame, fast: int, slow: int) -> pd.DataFrame:
-    out = df.copy()
-    out[f"sma_{fast}"] = out["close"].rolling(fast).mean()
-    out[f"sma_{slow}"] = out["close"].rolling(slow).mean()
-    out["signal"] = 0
-    # signal is computed on the CLOSE of each bar
-    # +1 on golden cross, -1 on death cross
-    cross_up = (out[f"sma_{fast}"].shift(1) <= out[f"sma_{slow}"].shift(1)) & (out[f"sma_{fast}"] > out[f"sma_{slow}"])
-    cross_dn = (out[f"sma_{fast}"].shift(1) >= out[f"sma_{slow}"].shift(1)) & (out[f"sma_{fast}"] < out[f"sma_{slow}"])
-    out.loc[cross_up, "signal"] = 1
-    out.loc[cross_dn, "signal"] = -1
+def crossover_signal(sma_fast: np.ndarray, sma_slow: np.ndarray) -> np.ndarray:
+    """
+    +1 on golden cross, -1 on death cross, 0 otherwise (computed on the CLOSE of each bar).
+    NaN SMAs never compare true, so the warm-up period stays 0. Works along axis 0, so a
+    bars x symbols matrix gets one signal column per symbol.
+    """
+    signal = np.zeros(np.shape(sma_fast), dtype=np.int64)
+    if len(sma_fast) < 2:
+        return signal
+    prev_f, prev_s, f, s = sma_fast[:-1], sma_slow[:-1], sma_fast[1:], sma_slow[1:]
+    signal[1:][(prev_f <= prev_s) & (f > s)] = 1
+    signal[1:][(prev_f >= prev_s) & (f < s)] = -1
+    return signal
+
+
+class SMABank:
+    """
+    Prefix-sum SMA cache over one close series.
+
+    The cumulative sum of closes is built once; any window is then an O(n) difference
+    of two slices. Computed windows are memoized (read-only arrays) and the least
+    recently used ones are evicted once the cache exceeds `max_bytes`.
+    Values match rolling(w).mean() to floating-point rounding, not bit-for-bit.
+    """
+
+    def __init__(self, close, max_bytes: int = 512 * 2**20):
+        close = np.asarray(close, dtype=np.float64)
+        if np.isnan(close).any():
+            raise ValueError("SMABank needs a NaN-free close series.")
+        self.n = len(close)
+        self.max_bytes = max_bytes
+        # centre the prices before summing so the running total stays small and precise
+        self._offset = float(close.mean()) if self.n else 0.0
+        self._csum = np.concatenate(([0.0], np.cumsum(close - self._offset)))
+        self._cache: "OrderedDict[int, np.ndarray]" = OrderedDict()
+        self._cached_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return self.n
+
+    def sma(self, window: int) -> np.ndarray:
+        """SMA of `window` bars, NaN for the first window-1 bars (like rolling(window).mean())."""
+        if window < 1:
+            raise ValueError(f"SMA window must be >= 1, got {window}")
+        out = self._cache.get(window)
+        if out is not None:
+            self._cache.move_to_end(window)
+            self.hits += 1
+            return out
+        self.misses += 1
+        out = np.full(self.n, np.nan)
+        if window <= self.n:
+            out[window - 1:] = (self._csum[window:] - self._csum[:-window]) / window + self._offset
+        out.setflags(write=False)
+        if out.nbytes <= self.max_bytes:
+            while self._cache and self._cached_bytes + out.nbytes > self.max_bytes:
+                _, evicted = self._cache.popitem(last=False)
+                self._cached_bytes -= evicted.nbytes
+            self._cache[window] = out
+            self._cached_bytes += out.nbytes
+        return out
+
+    def windows(self) -> List[int]:
+        """Cached windows, least recently used first."""
+        return list(self._cache)
+
+
+def compute_indicators(df: pd.DataFrame, fast: int, slow: int, bank: Optional[SMABank] = None) -> pd.DataFrame:
+    # shallow copy: only new columns are added, the caller's frame is never modified
+    out = df.copy(deep=False)
+    if bank is not None:
+        if len(bank) != len(out):
+            raise ValueError(f"SMABank covers {len(bank)} bars but the frame has {len(out)}.")
+        out[f"sma_{fast}"] = bank.sma(fast)
+        out[f"sma_{slow}"] = bank.sma(slow)
+    else:
+        out[f"sma_{fast}"] = out["close"].rolling(fast).mean()
+        out[f"sma_{slow}"] = out["close"].rolling(slow).mean()
+    out["signal"] = crossover_signal(out[f"sma_{fast}"].to_numpy(dtype=float),
+                                     out[f"sma_{slow}"].to_numpy(dtype=float))
+    return out
+
+
+# ---------- Indicator pipeline ----------
+
+@dataclass(frozen=True)
+class Node:
+    """
+    One indicator in the pipeline DAG: `kind` selects an INDICATORS entry, `inputs` are
+    source column names or other Nodes, `params` its settings. Nodes compare by value,
+    so the same SMA declared by two strategies is one node and is computed once.
+    """
+    kind: str
+    inputs: Tuple[Union[str, "Node"], ...]
+    params: Tuple = ()
+
+    @property
+    def name(self) -> str:
+        args = [i if isinstance(i, str) else i.name for i in self.inputs] + [str(p) for p in self.params]
+        return f"{self.kind}({','.join(args)})"
+
+
+def sma(src: Union[str, Node], window: int) -> Node:
+    return Node("sma", (src,), (window,))
+
+
+def ema(src: Union[str, Node], span: int) -> Node:
+    return Node("ema", (src,), (span,))
+
+
+def wma(src: Union[str, Node], window: int) -> Node:
+    return Node("wma", (src,), (window,))
+
+
+def crossover(fast: Node, slow: Node) -> Node:
+    return Node("crossover", (fast, slow))
+
+
+def above(a: Union[str, Node], b: Union[str, Node], mult: float = 1.0) -> Node:
+    """1 where a > mult * b, else 0."""
+    return Node("above", (a, b), (mult,))
+
+
+def gate(signal: Node, condition: Node) -> Node:
+    """`signal` on bars where `condition` is non-zero, 0 elsewhere."""
+    return Node("gate", (signal, condition))
+
+
+def volume_filter(window: int, mult: float = 1.0) -> Node:
+    """Volume above `mult` times its own `window`-bar SMA."""
+    return above("volume", sma("volume", window), mult)
+
+
+def _ema(x: np.ndarray, span: int) -> np.ndarray:
+    return pd.Series(x).ewm(span=span, adjust=False).mean().to_numpy()
+
+
+def _wma(x: np.ndarray, window: int) -> np.ndarray:
+    out = np.full(len(x), np.nan)
+    if window <= len(x):
+        weights = np.arange(window, 0, -1, dtype=float)  # newest bar gets the largest weight
+        out[window - 1:] = np.convolve(x, weights / weights.sum(), "valid")
     return out
 
 
+def _ema_extend(prev: np.ndarray, inputs: List[np.ndarray], n_old: int, span: int) -> np.ndarray:
+    # recursive: restart from the last value instead of recomputing the history
+    x = inputs[0]
+    if n_old == 0 or np.isnan(prev[-1]):
+        return _ema(x, span)[n_old:]
+    return _ema(np.concatenate(([prev[-1]], x[n_old:])), span)[1:]
+
+
+@dataclass(frozen=True)
+class IndicatorSpec:
+    """
+    compute(inputs, *params) -> array over the whole input. When bars are appended, a node
+    is recomputed over its last lookback(*params) old input bars plus the new ones, or,
+    for recursive indicators, continued with extend(prev, inputs, n_old, *params).
+    """
+    compute: Callable
+    lookback: Callable = lambda *params: 0
+    extend: Optional[Callable] = None
+
+
+INDICATORS: Dict[str, IndicatorSpec] = {
+    "sma": IndicatorSpec(lambda x, w: pd.Series(x[0]).rolling(w).mean().to_numpy(), lambda w: w - 1),
+    "ema": IndicatorSpec(lambda x, span: _ema(x[0], span), extend=_ema_extend),
+    "wma": IndicatorSpec(lambda x, w: _wma(x[0], w), lambda w: w - 1),
+    "crossover": IndicatorSpec(lambda x: crossover_signal(x[0], x[1]), lambda: 1),
+    "above": IndicatorSpec(lambda x, mult: (x[0] > mult * x[1]).astype(np.int64)),
+    "gate": IndicatorSpec(lambda x: np.where(x[1] != 0, x[0], 0)),
+}
+
+
+def _append_to(buf: np.ndarray, n: int, values: np.ndarray) -> np.ndarray:
+    """Write `values` after the first n entries of `buf`, doubling its capacity if needed."""
+    k = len(values)
+    if n + k > len(buf):
+        grown = np.empty(max(n + k, 2 * len(buf)), dtype=np.result_type(buf, values))
+        grown[:n] = buf[:n]
+        buf = grown
+    buf[n:n + k] = values
+    return buf
+
+
+class IndicatorPipeline:
+    """
+    Evaluates indicator Nodes over one dataset, computing each distinct node (and its
+    inputs) once and caching the results as NumPy arrays; get() hands out read-only views.
+    append() extends the sources and every cached node with new bars, recomputing only the
+    tail each node needs (see IndicatorSpec) into growable buffers, so growing histories
+    don't start from scratch. Appended values match a full recompute to rounding.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self._n = 0
+        self._sources: Dict[str, np.ndarray] = {}
+        self._nodes: Dict[Node, np.ndarray] = {}  # insertion order = dependency order
+        self.hits = 0
+        self.misses = 0
+        self.append(df)
+
+    def __len__(self) -> int:
+        return self._n
+
+    def _view(self, buf: np.ndarray) -> np.ndarray:
+        out = buf[:self._n]
+        out.setflags(write=False)
+        return out
+
+    def _input(self, src: Union[str, Node]) -> np.ndarray:
+        if isinstance(src, Node):
+            return self.get(src)
+        if src not in self._sources:
+            raise KeyError(f"Source column {src!r} is not in the dataset.")
+        return self._view(self._sources[src])
+
+    def get(self, node: Node) -> np.ndarray:
+        buf = self._nodes.get(node)
+        if buf is not None:
+            self.hits += 1
+            return self._view(buf)
+        if node.kind not in INDICATORS:
+            raise ValueError(f"Unknown indicator {node.kind!r}. Choose from: {sorted(INDICATORS)}")
+        self.misses += 1
+        buf = np.array(INDICATORS[node.kind].compute([self._input(i) for i in node.inputs], *node.params))
+        self._nodes[node] = buf
+        return self._view(buf)
+
+    def nodes(self) -> List[str]:
+        return [n.name for n in self._nodes]
+
+    def append(self, df: pd.DataFrame):
+        """Add bars (same columns, later timestamps) and extend every cached node."""
+        n_old, k = self._n, len(df)
+        if not k:
+            return
+        for col in df.select_dtypes("number").columns:
+            if n_old and col not in self._sources:
+                continue  # a column that appears later can't be backfilled
+            values = df[col].to_numpy(dtype=float)
+            # the first block is referenced, not copied (its length leaves no spare capacity,
+            # so a later append moves it into a new buffer instead of writing into the frame)
+            self._sources[col] = values if not n_old else _append_to(self._sources[col], n_old, values)
+        self._n = n_old + k
+        for node, buf in list(self._nodes.items()):
+            spec = INDICATORS[node.kind]
+            inputs = [self._input(i) for i in node.inputs]  # upstream nodes were extended first
+            if spec.extend is not None:
+                tail = spec.extend(buf[:n_old], inputs, n_old, *node.params)
+            else:
+                start = max(0, n_old - spec.lookback(*node.params))
+                tail = spec.compute([x[start:] for x in inputs], *node.params)[n_old - start:]
+            self._nodes[node] = _append_to(buf, n_old, tail)
+
+
 @dataclass
 class Trade:
     entry_time: pd.Timestamp
@@ -95,8 +447,278 @@ class Trade:
     return_pct: Optional[float]
 
 
+TRADE_DTYPE = np.dtype([
+    ("entry_time", "i8"), ("exit_time", "i8"),  # ns since epoch (UTC when tz-aware)
+    ("entry_bar", "i8"), ("exit_bar", "i8"),
+    ("side", "i1"),  # +1 long, -1 short
+    ("entry_price", "f8"), ("exit_price", "f8"), ("qty", "f8"), ("pnl", "f8"), ("return_pct", "f8"),
+])
+
+
+class TradeLog:
+    """
+    Closed trades as one preallocated structured array that doubles when full, so
+    recording and summarizing cost no per-trade objects. Iterating or indexing yields
+    Trade instances for code that still wants them; to_frame()/to_csv()/to_parquet()
+    export the columns directly.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self._buf = np.empty(max(1, capacity), dtype=TRADE_DTYPE)
+        self._n = 0
+        self.tz = None
+
+    @classmethod
+    def from_array(cls, data: np.ndarray, tz=None) -> "TradeLog":
+        """Wrap an existing TRADE_DTYPE array (e.g. one loaded from disk)."""
+        log = cls(len(data))
+        log._buf[:len(data)] = data
+        log._n = len(data)
+        log.tz = tz
+        return log
+
+    def _reserve(self, extra: int):
+        need = self._n + extra
+        if need > len(self._buf):
+            grown = np.empty(max(need, 2 * len(self._buf)), dtype=TRADE_DTYPE)
+            grown[:self._n] = self._buf[:self._n]
+            self._buf = grown
+
+    def append(self, entry_time, exit_time, side: str, entry_price: float, exit_price: float,
+               qty: float, pnl: float, return_pct: float, entry_bar: int = -1, exit_bar: int = -1):
+        entry_time, exit_time = pd.Timestamp(entry_time), pd.Timestamp(exit_time)
+        if self._n == 0:
+            self.tz = entry_time.tz
+        self._reserve(1)
+        self._buf[self._n] = (entry_time.value, exit_time.value, entry_bar, exit_bar,
+                              1 if side == "long" else -1, entry_price, exit_price, qty, pnl, return_pct)
+        self._n += 1
+
+    def extend(self, index: pd.DatetimeIndex, entry_bar: np.ndarray, exit_bar: np.ndarray, side: np.ndarray,
+               entry_price: np.ndarray, exit_price: np.ndarray, qty: np.ndarray, pnl: np.ndarray,
+               return_pct: np.ndarray):
+        """Bulk append; times are looked up from `index` by bar number."""
+        k = len(entry_bar)
+        if not k:
+            return
+        index = pd.DatetimeIndex(index)
+        if self._n == 0:
+            self.tz = index.tz
+        self._reserve(k)
+        out = self._buf[self._n:self._n + k]
+        ns = index.values.astype("datetime64[ns]").view("i8")  # UTC; any index unit
+        out["entry_time"], out["exit_time"] = ns[entry_bar], ns[exit_bar]
+        out["entry_bar"], out["exit_bar"], out["side"] = entry_bar, exit_bar, side
+        out["entry_price"], out["exit_price"], out["qty"] = entry_price, exit_price, qty
+        out["pnl"], out["return_pct"] = pnl, return_pct
+        self._n += k
+
+    def clear(self):
+        self._n = 0
+
+    @property
+    def data(self) -> np.ndarray:
+        """The filled part of the buffer (a view, not a copy)."""
+        return self._buf[:self._n]
+
+    def column(self, name: str) -> np.ndarray:
+        return self._buf[name][:self._n]
+
+    def times(self, name: str) -> pd.DatetimeIndex:
+        """entry_time / exit_time as a DatetimeIndex in the original time zone."""
+        idx = pd.DatetimeIndex(self.column(name).view("datetime64[ns]"))
+        return idx.tz_localize("UTC").tz_convert(self.tz) if self.tz is not None else idx
+
+    def __len__(self) -> int:
+        return self._n
+
+    def __getitem__(self, i: int) -> Trade:
+        if not -self._n <= i < self._n:
+            raise IndexError("trade index out of range")
+        r = self._buf[i % self._n]
+        as_ts = lambda v: pd.Timestamp(int(v), tz="UTC").tz_convert(self.tz) if self.tz is not None else pd.Timestamp(int(v))
+        return Trade(entry_time=as_ts(r["entry_time"]), exit_time=as_ts(r["exit_time"]),
+                     side="long" if r["side"] > 0 else "short", entry_price=float(r["entry_price"]),
+                     exit_price=float(r["exit_price"]), qty=float(r["qty"]), pnl=float(r["pnl"]),
+                     return_pct=float(r["return_pct"]))
+
+    def __iter__(self) -> Iterator[Trade]:
+        return (self[i] for i in range(self._n))
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame({
+            "entry_time": self.times("entry_time"),
+            "exit_time": self.times("exit_time"),
+            "side": np.where(self.column("side") > 0, "long", "short"),
+            "entry_price": self.column("entry_price"),
+            "exit_price": self.column("exit_price"),
+            "qty": self.column("qty"),
+            "pnl": self.column("pnl"),
+            "return_pct": self.column("return_pct"),
+        })
+
+    def to_csv(self, path: str):
+        self.to_frame().to_csv(path, index=False)
+
+    def to_parquet(self, path: str):
+        """Needs pyarrow (or fastparquet) installed."""
+        self.to_frame().to_parquet(path, index=False)
+
+    def stats(self, n_bars: int) -> dict:
+        """Profit factor, average holding time and exposure (share of `n_bars` spent in a trade)."""
+        pnl = self.column("pnl")
+        gross_win = float(pnl[pnl > 0].sum())
+        gross_loss = float(-pnl[pnl < 0].sum())
+        if gross_loss > 0:
+            profit_factor = gross_win / gross_loss
+        else:
+            profit_factor = float("inf") if gross_win > 0 else float("nan")
+        held_ns = self.column("exit_time") - self.column("entry_time")
+        held_bars = self.column("exit_bar") - self.column("entry_bar")
+        return {
+            "profit_factor": profit_factor,
+            "avg_holding_seconds": float(held_ns.mean() / 1e9) if self._n else float("nan"),
+            "exposure": float(held_bars.sum() / n_bars) if n_bars and self._n else 0.0,
+        }
+
+
 # ---------- Backtester ----------
 
+@dataclass
+class SimState:
+    """Position carried between _simulate calls when history is processed in blocks."""
+    equity: float  # realized equity
+    position: int = 0  # +1 long, -1 short, 0 flat
+    entry_price: float = 0.0
+    entry_bar: int = -1  # global bar number of the entry
+    qty: float = 0.0
+
+
+ENGINES = ("pandas", "numpy")
+MOVING_AVERAGES = {"sma": sma, "ema": ema, "wma": wma}
+
+# bars per year, used to annualize returns
+PERIODS_PER_YEAR = {
+    "1m": 365 * 24 * 60,
+    "2m": 365 * 24 * 30,
+    "5m": 365 * 24 * 12,
+    "15m": 365 * 24 * 4,
+    "30m": 365 * 24 * 2,
+    "1h": 365 * 24,
+    "1d": 252,      # trading days
+    "1wk": 52,
+    "1mo": 12,
+}
+
+
+class OnlineMetrics:
+    """
+    Streaming counterpart of CrossoverBacktester.metrics(): equity arrives block by block
+    and only running totals are kept (Chan/Welford return moments, running peak and
+    drawdown, trade counts).
+    """
+
+    def __init__(self):
+        self.bars = 0
+        self.first: Optional[float] = None
+        self.last: Optional[float] = None
+        self._n = 0  # returns seen
+        self._mean = 0.0
+        self._m2 = 0.0
+        self._peak = -np.inf
+        self.max_drawdown = np.inf
+        self.trades = 0
+        self.wins = 0
+
+    def update_equity(self, eq: np.ndarray):
+        if not len(eq):
+            return
+        seq = eq if self.last is None else np.concatenate(([self.last], eq))
+        ret = seq[1:] / seq[:-1] - 1
+        if len(ret):
+            # merge this block's return moments into the running ones
+            n_b, mean_b = len(ret), float(ret.mean())
+            m2_b = float(((ret - mean_b) ** 2).sum())
+            n = self._n + n_b
+            delta = mean_b - self._mean
+            self._mean += delta * n_b / n
+            self._m2 += m2_b + delta * delta * self._n * n_b / n
+            self._n = n
+        peak = np.maximum(np.maximum.accumulate(eq), self._peak)
+        self.max_drawdown = min(self.max_drawdown, float((eq / peak - 1.0).min()))
+        self._peak = float(peak[-1])
+        if self.first is None:
+            self.first = float(eq[0])
+        self.last = float(eq[-1])
+        self.bars += len(eq)
+
+    def update_trades(self, pnl: np.ndarray):
+        self.trades += len(pnl)
+        self.wins += int(np.count_nonzero(pnl > 0))
+
+    def result(self, interval: str) -> dict:
+        if not self.bars:
+            return {}
+        total_return = self.last / self.first - 1
+        ppy = PERIODS_PER_YEAR.get(interval, 252)
+        years = max(1e-9, self.bars / ppy)
+        cagr = (1 + total_return) ** (1 / years) - 1
+        std = np.sqrt(self._m2 / (self._n - 1)) if self._n >= 2 else 0.0
+        sharpe = (self._mean / std) * np.sqrt(ppy) if std != 0 else 0.0
+        return {
+            "total_return": float(total_return),
+            "cagr": float(cagr),
+            "sharpe": float(sharpe),
+            "max_drawdown": self.max_drawdown,
+            "trades": self.trades,
+            "win_rate": self.wins / max(1, self.trades),
+        }
+
+
+def iter_ohlcv_chunks(chunk_bars: int, csv_path: Optional[str] = None, df: Optional[pd.DataFrame] = None,
+                      ts_col: str = "timestamp") -> Iterator[pd.DataFrame]:
+    """
+    Yield OHLCV blocks of about `chunk_bars` rows for run_chunked(), either by streaming a
+    time-ordered CSV or by slicing an existing (e.g. memory-mapped) frame without copying.
+    """
+    if df is not None:
+        for i in range(0, len(df), chunk_bars):
+            yield df.iloc[i:i + chunk_bars]
+        return
+    cols = ["open", "high", "low", "close", "volume"]
+    for chunk in pd.read_csv(csv_path, chunksize=chunk_bars):
+        chunk[ts_col] = pd.to_datetime(chunk[ts_col])
+        chunk = chunk.set_index(ts_col)
+        missing = [c for c in cols if c not in chunk.columns]
+        if missing:
+            raise ValueError(f"CSV missing columns: {missing}. Required: {cols}")
+        for c in cols:
+            chunk[c] = pd.to_numeric(chunk[c], errors="coerce")
+        yield chunk[cols].dropna()
+
+
+def minmax_indices(y: np.ndarray, buckets: int) -> np.ndarray:
+    """
+    Sorted indices of the first, minimum, maximum and last point of each of `buckets`
+    equal slices of `y` (NaNs ignored), or every index when y is already that short.
+    Plotting only these keeps the drawn envelope of the line pixel-identical at a width
+    of `buckets` pixels, at a cost of O(len(y)) vectorized work.
+    """
+    n = len(y)
+    if n <= 4 * buckets:
+        return np.arange(n)
+    size = n // buckets
+    m = size * buckets
+    filled = np.where(np.isnan(y), np.nanmean(y), y)
+    blocks = filled[:m].reshape(buckets, size)
+    base = np.arange(buckets) * size
+    picks = [base, base + blocks.argmin(axis=1), base + blocks.argmax(axis=1), base + size - 1]
+    if m < n:  # the remainder forms one more bucket
+        rest = filled[m:]
+        picks.append(np.array([m, m + rest.argmin(), m + rest.argmax(), n - 1]))
+    return np.unique(np.concatenate(picks))
+
+
 class CrossoverBacktester:
     def __init__(
         self,
@@ -107,9 +729,16 @@ class CrossoverBacktester:
         stop_loss_pct: float = 0.05,  # 5%
         take_profit_pct: float = 0.10,  # 10%
         allow_short: bool = False,
-        fee_bps: float = 5.0  # 5 bps per trade side = 0.05%
+        fee_bps: float = 5.0,  # 5 bps per trade side = 0.05%
+        engine: str = "pandas",  # 'pandas' (row loop) or 'numpy' (array state machine)
+        ma: str = "sma",  # moving average kind: 'sma', 'ema' or 'wma'
+        volume_filter: Optional[Tuple[int, float]] = None  # (window, mult): only act on crosses with high volume
     ):
         assert fast < slow, "fast SMA must be less than slow SMA"
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown engine {engine!r}. Choose from: {ENGINES}")
+        if ma not in MOVING_AVERAGES:
+            raise ValueError(f"Unknown moving average {ma!r}. Choose from: {tuple(MOVING_AVERAGES)}")
         self.fast = fast
         self.slow = slow
         self.initial_equity = initial_equity
@@ -118,24 +747,69 @@ class CrossoverBacktester:
         self.take_profit_pct = take_profit_pct
         self.allow_short = allow_short
         self.fee_bps = fee_bps / 10000.0
+        self.engine = engine
+        self.ma = ma
+        self.volume_filter = volume_filter
+        self._fast_col, self._slow_col = f"{ma}_{fast}", f"{ma}_{slow}"
 
-        self.equity_curve: List[float] = []
-        self.trades: List[Trade] = []
+        self.equity_curve: np.ndarray = np.empty(0)
+        self.trades = TradeLog()
+        self.open_trade: Optional[Tuple[int, int, float, float]] = None  # (side, entry bar, entry price, qty) after run()
 
-    def run(self, df: pd.DataFrame) -> Tuple[pd.DataFrame, List[Trade]]:
-        data = df.copy()
-        data = compute_indicators(data, self.fast, self.slow)
+    def indicator_nodes(self) -> Tuple[Node, Node, Node]:
+        """(fast MA, slow MA, entry/exit signal) as IndicatorPipeline nodes."""
+        make = MOVING_AVERAGES[self.ma]
+        fast, slow = make("close", self.fast), make("close", self.slow)
+        signal = crossover(fast, slow)
+        if self.volume_filter is not None:
+            signal = gate(signal, volume_filter(*self.volume_filter))
+        return fast, slow, signal
+
+    def indicators(self, df: pd.DataFrame, bank: Optional[SMABank] = None,
+                   pipeline: Optional[IndicatorPipeline] = None) -> pd.DataFrame:
+        """`df` plus the two moving averages and the signal column the engines read."""
+        if bank is not None and self.ma == "sma" and self.volume_filter is None:
+            return compute_indicators(df, self.fast, self.slow, bank=bank)
+        if pipeline is None:
+            pipeline = IndicatorPipeline(df)
+        elif len(pipeline) != len(df):
+            raise ValueError(f"IndicatorPipeline covers {len(pipeline)} bars but the frame has {len(df)}.")
+        fast, slow, signal = self.indicator_nodes()
+        out = df.copy(deep=False)
+        out[self._fast_col] = pipeline.get(fast)
+        out[self._slow_col] = pipeline.get(slow)
+        out["signal"] = pipeline.get(signal)
+        return out
+
+    def run(self, df: pd.DataFrame, bank: Optional[SMABank] = None,
+            pipeline: Optional[IndicatorPipeline] = None) -> Tuple[pd.DataFrame, TradeLog]:
+        """
+        Backtest over `df`. Pass an SMABank built from df["close"] (plain SMA strategies) or
+        an IndicatorPipeline over df to share indicators with other strategies on the same data.
+        """
+        data = self.indicators(df, bank=bank, pipeline=pipeline)
+        if self.engine == "numpy":
+            eq_series = self._run_numpy(data)
+        else:
+            eq_series = self._run_pandas(data)
+
+        data["equity"] = eq_series
+        self.equity_curve = data["equity"].to_numpy()
+        return data, self.trades
+
+    def _run_pandas(self, data: pd.DataFrame) -> List[float]:
+        """Reference engine: walks every bar with iterrows()."""
         position = 0  # +1 long, -1 short, 0 flat
         entry_price = None
         qty = 0.0
         equity = self.initial_equity
         eq_series = []
 
-        for ts, row in data.iterrows():
+        for bar, (ts, row) in enumerate(data.iterrows()):
             price = float(row["close"])
             signal = int(row["signal"])
-            sma_fast = row[f"sma_{self.fast}"]
-            sma_slow = row[f"sma_{self.slow}"]
+            sma_fast = row[self._fast_col]
+            sma_slow = row[self._slow_col]
 
             # skip until MAs exist
             if np.isnan(sma_fast) or np.isnan(sma_slow):
@@ -154,9 +828,8 @@ class CrossoverBacktester:
                         cash = price * qty - fee
                         equity += cash
                         ret_pct = (price - entry_price) / entry_price
-                        self.trades.append(Trade(entry_time=entry_ts, exit_time=ts, side="long",
-                                                 entry_price=entry_price, exit_price=price, qty=qty,
-                                                 pnl=cash - (entry_price * qty), return_pct=ret_pct))
+                        self.trades.append(entry_ts, ts, "long", entry_price, price, qty,
+                                           cash - (entry_price * qty), ret_pct, entry_bar, bar)
                         position = 0
                         entry_price = None
                         qty = 0.0
@@ -167,9 +840,8 @@ class CrossoverBacktester:
                         cash = -price * qty - fee  # closing short returns cash
                         equity += cash
                         ret_pct = (entry_price - price) / entry_price
-                        self.trades.append(Trade(entry_time=entry_ts, exit_time=ts, side="short",
-                                                 entry_price=entry_price, exit_price=price, qty=qty,
-                                                 pnl=cash - (-entry_price * qty), return_pct=ret_pct))
+                        self.trades.append(entry_ts, ts, "short", entry_price, price, qty,
+                                           cash - (-entry_price * qty), ret_pct, entry_bar, bar)
                         position = 0
                         entry_price = None
                         qty = 0.0
@@ -184,7 +856,7 @@ class CrossoverBacktester:
                     equity -= (price * qty + fee)
                     position = 1
                     entry_price = price
-                    entry_ts = ts
+                    entry_ts, entry_bar = ts, bar
                 elif signal < 0 and self.allow_short:
                     alloc = equity * self.risk_fraction
                     qty = (alloc / price)  # positive qty used; short position has negative cash at entry
@@ -192,79 +864,662 @@ class CrossoverBacktester:
                     equity -= fee  # borrow & sell gives cash; we keep equity bookkeeping by fees only here
                     position = -1
                     entry_price = price
-                    entry_ts = ts
+                    entry_ts, entry_bar = ts, bar
 
             eq_series.append(equity + (0 if position == 0 else (price - entry_price) * (qty if position > 0 else -qty)))
 
-        data["equity"] = eq_series
-        self.equity_curve = eq_series
-        return data, self.trades
+        self.open_trade = (position, entry_bar, entry_price, qty) if position != 0 else None
+        return eq_series
+
+    def _run_numpy(self, data: pd.DataFrame) -> np.ndarray:
+        """Array engine: runs _simulate over the indicator columns and records the trades in bulk."""
+        close = data["close"].to_numpy(dtype=float)
+        valid = ~(np.isnan(data[self._fast_col].to_numpy(dtype=float))
+                  | np.isnan(data[self._slow_col].to_numpy(dtype=float)))
+        eq, closed, st = self._simulate(close, data["signal"].to_numpy(), valid)
+        self.open_trade = (st.position, st.entry_bar, st.entry_price, st.qty) if st.position != 0 else None
+        if closed:
+            entry_bar, exit_bar, side, entry_price, exit_price, qty, pnl, ret = map(np.asarray, zip(*closed))
+            self.trades.extend(data.index, entry_bar, exit_bar, np.where(side == "long", 1, -1),
+                               entry_price, exit_price, qty, pnl, ret)
+
+        return eq
+
+    def _simulate(self, close: np.ndarray, signal: np.ndarray, valid: np.ndarray,
+                  state: Optional["SimState"] = None, offset: int = 0) -> Tuple[np.ndarray, list, "SimState"]:
+        """
+        Same entry/stop/take-profit/fee logic as _run_pandas, over plain arrays. Only bars
+        where the state can change are visited: flat stretches jump straight to the next
+        entry signal, open positions scan their holding span for the first stop/take hit
+        in one vectorized comparison, and equity is filled in per segment.
+
+        `state` resumes from a previous call (chunked runs) and `offset` is the global bar
+        number of close[0]. Returns the equity array, closed trades as
+        (entry bar, exit bar, side, entry price, exit price, qty, pnl, return) tuples with
+        global bar numbers, and the state to pass to the next call.
+        """
+        n = len(close)
+        st = state or SimState(equity=self.initial_equity)
+        equity, side, entry_price, entry_bar, qty = st.equity, st.position, st.entry_price, st.entry_bar, st.qty
+
+        # candidate bars for entries and for signal-driven exits (only where MAs exist)
+        long_sig = np.flatnonzero(valid & (signal > 0))
+        short_sig = np.flatnonzero(valid & (signal < 0))
+        entries = np.flatnonzero(valid & ((signal > 0) | ((signal < 0) & self.allow_short)))
+
+        eq = np.empty(n, dtype=float)
+        closed = []
+        i = 0  # first bar whose equity has not been written yet
+        scan_from = 0  # first bar where an open position may exit
+        while i < n:
+            if side == 0:
+                k = entries.searchsorted(i)
+                if k == len(entries):
+                    eq[i:] = equity
+                    break
+                j = int(entries[k])
+                eq[i:j] = equity
+
+                # enter at bar j
+                price = float(close[j])
+                alloc = equity * self.risk_fraction
+                qty = (alloc / price)
+                fee = price * qty * self.fee_bps
+                if signal[j] > 0:
+                    side = 1
+                    equity -= (price * qty + fee)
+                else:
+                    side = -1
+                    equity -= fee
+                entry_price = price
+                entry_bar = offset + j
+                i, scan_from = j, j + 1
+
+            if side > 0:
+                stop, take = entry_price * (1 - self.stop_loss_pct), entry_price * (1 + self.take_profit_pct)
+                opposite = short_sig
+            else:
+                stop, take = entry_price * (1 + self.stop_loss_pct), entry_price * (1 - self.take_profit_pct)
+                opposite = long_sig
+
+            # first bar after entry with an opposite crossover bounds the stop/take scan
+            k = opposite.searchsorted(scan_from)
+            end = int(opposite[k]) if k < len(opposite) else n
+            span = close[scan_from:end]
+            if side > 0:
+                hit = (span <= stop) | (span >= take)
+            else:
+                hit = (span >= stop) | (span <= take)
+            hit &= valid[scan_from:end]
+            x = scan_from + int(hit.argmax()) if hit.any() else end
+            if qty == 0:
+                x = n  # zero-size position is never managed, same as the row loop
+
+            eq[i:x] = np.where(valid[i:x], equity + (close[i:x] - entry_price) * (qty if side > 0 else -qty), equity)
+            if x >= n:
+                break
+
+            # exit at bar x; re-entry on the same bar is picked up by the next iteration
+            price = float(close[x])
+            fee = price * abs(qty) * self.fee_bps
+            if side > 0:
+                cash = price * qty - fee
+                equity += cash
+                closed.append((entry_bar, offset + x, "long", entry_price, price, qty,
+                               cash - (entry_price * qty), (price - entry_price) / entry_price))
+            else:
+                cash = -price * qty - fee
+                equity += cash
+                closed.append((entry_bar, offset + x, "short", entry_price, price, qty,
+                               cash - (-entry_price * qty), (entry_price - price) / entry_price))
+            side, entry_price, qty = 0, 0.0, 0.0
+            i = x
+
+        return eq, closed, SimState(equity=equity, position=side, entry_price=entry_price,
+                                    entry_bar=entry_bar, qty=qty)
+
+    def run_chunked(self, chunks: Iterable[pd.DataFrame], interval: str) -> dict:
+        """
+        Out-of-core backtest: consume history as a sequence of OHLCV blocks (each with a
+        'close' column, in time order) and return metrics() computed with streaming
+        accumulators over the marked-to-market equity. Only the last `slow` closes, the
+        position state and the running mark-to-market offset are carried between blocks,
+        so memory depends on the block size, not on history length.
+        Trades are counted rather than kept, so self.trades is not populated.
+        Only plain SMA crossovers (ma='sma', no volume filter) are supported.
+        """
+        if self.ma != "sma" or self.volume_filter is not None:
+            raise ValueError("run_chunked supports plain SMA crossovers only (ma='sma', no volume filter).")
+        acc = OnlineMetrics()
+        state = None
+        tail = np.empty(0)
+        offset = 0
+        short_cost = 0.0  # entry_price * qty of every short closed so far (see _mark_to_market)
+        for chunk in chunks:
+            close = chunk["close"].to_numpy(dtype=float)
+            if not len(close):
+                continue
+            # prepend the carried tail so the SMAs (and the crossover on the block's first bar,
+            # which compares against the previous bar) match a single pass over all history
+            ext = np.concatenate((tail, close))
+            sma_fast = pd.Series(ext).rolling(self.fast).mean().to_numpy()
+            sma_slow = pd.Series(ext).rolling(self.slow).mean().to_numpy()
+            signal = crossover_signal(sma_fast, sma_slow)[len(tail):]
+            sma_fast, sma_slow = sma_fast[len(tail):], sma_slow[len(tail):]
+            valid = ~(np.isnan(sma_fast) | np.isnan(sma_slow))
+            held = state.entry_price * state.qty if state is not None and state.position > 0 else 0.0
+            eq, closed, state = self._simulate(close, signal, valid, state=state, offset=offset)
+            if closed:
+                entry_bar, exit_bar, side, entry_price, _, qty = (np.asarray(col) for col in list(zip(*closed))[:6])
+                side, cost = np.where(side == "long", 1, -1), entry_price * qty
+            else:
+                entry_bar = exit_bar = side = np.empty(0, dtype=np.int64)
+                cost = np.empty(0)
+            open_trade = (state.position, state.entry_bar, state.entry_price, state.qty) if state.position != 0 else None
+            eq = self._mark_to_market(eq, side, cost, entry_bar.astype(np.int64), exit_bar.astype(np.int64),
+                                      open_trade, offset=offset, carry=short_cost + held)
+            short_cost += float(cost[side < 0].sum())
+            acc.update_equity(eq)
+            acc.update_trades(np.array([c[6] for c in closed], dtype=float))
+            tail = ext[-self.slow:]
+            offset += len(close)
+        return acc.result(interval)
 
     # ---------- Metrics ----------
 
     @staticmethod
-    def _sharpe(returns: pd.Series, periods_per_year: int) -> float:
-        if returns.std() == 0 or returns.empty:
+    def _sharpe(returns: np.ndarray, periods_per_year: int) -> float:
+        if len(returns) < 2 or returns.std(ddof=1) == 0:
             return 0.0
-        return (returns.mean() / returns.std()) * np.sqrt(periods_per_year)
+        return (returns.mean() / returns.std(ddof=1)) * np.sqrt(periods_per_year)
 
     @staticmethod
-    def _max_drawdown(equity: pd.Series) -> float:
-        roll_max = equity.cummax()
+    def _max_drawdown(equity: np.ndarray) -> float:
+        roll_max = np.maximum.accumulate(equity)
         dd = equity / roll_max - 1.0
         return float(dd.min())
 
-    def summarize(self, df_eq: pd.DataFrame, interval: str) -> dict:
-        eq = df_eq["equity"].dropna()
-        if eq.empty:
+    @classmethod
+    def _array_metrics(cls, eq: np.ndarray, pnl: np.ndarray, interval: str) -> dict:
+        """metrics() over a NaN-free equity array and the closed-trade PnLs."""
+        if len(eq) == 0:
             return {}
-        ret = eq.pct_change().dropna()
-        total_return = eq.iloc[-1] / eq.iloc[0] - 1
+        ret = eq[1:] / eq[:-1] - 1
+        total_return = eq[-1] / eq[0] - 1
         # infer periods per year
-        mapping = {
-            "1m": 365 * 24 * 60,
-            "2m": 365 * 24 * 30,
-            "5m": 365 * 24 * 12,
-            "15m": 365 * 24 * 4,
-            "30m": 365 * 24 * 2,
-            "1h": 365 * 24,
-            "1d": 252,      # trading days
-            "1wk": 52,
-            "1mo": 12,
-        }
-        ppy = mapping.get(interval, 252)
+        ppy = PERIODS_PER_YEAR.get(interval, 252)
         years = max(1e-9, len(eq) / ppy)
         cagr = (1 + total_return) ** (1 / years) - 1
-        sharpe = self._sharpe(ret, ppy)
-        mdd = self._max_drawdown(eq)
-        wins = [t for t in self.trades if t.pnl is not None and t.pnl > 0]
-        win_rate = len(wins) / max(1, len(self.trades))
+        sharpe = cls._sharpe(ret, ppy)
+        mdd = cls._max_drawdown(eq)
+        win_rate = float(np.count_nonzero(pnl > 0) / max(1, len(pnl)))
+        return {
+            "total_return": float(total_return),
+            "cagr": float(cagr),
+            "sharpe": float(sharpe),
+            "max_drawdown": mdd,
+            "trades": len(pnl),
+            "win_rate": win_rate,
+        }
+
+    def marked_equity(self, df_eq: pd.DataFrame) -> np.ndarray:
+        """
+        The equity column of run() marked to market. The engines deduct a long's cost at
+        entry but only add back (price - entry) * qty while it is held, so that column sits
+        one position cost low until the exit; a short's exit subtracts the buy-back cost
+        although the sale proceeds were never added, which leaves it entry_price * qty low
+        from then on. Both offsets are added back here (the recorded pnl is unaffected).
+        """
+        return self._mark_to_market(
+            df_eq["equity"].to_numpy(dtype=float), self.trades.column("side"),
+            self.trades.column("entry_price") * self.trades.column("qty"),
+            self.trades.column("entry_bar"), self.trades.column("exit_bar"), self.open_trade)
+
+    @staticmethod
+    def _mark_to_market(eq: np.ndarray, side: np.ndarray, cost: np.ndarray, entry_bar: np.ndarray,
+                        exit_bar: np.ndarray, open_trade: Optional[Tuple] = None, offset: int = 0,
+                        carry: float = 0.0) -> np.ndarray:
+        """
+        marked_equity() over plain arrays: closed trades' side, entry_price * qty and global
+        entry/exit bars, the (side, entry bar, entry price, qty) still open at the end, and
+        the global bar number of eq[0]. For a block of a longer run, `carry` is the offset
+        already owed at eq[0] (cost of a long open there plus every earlier short's cost);
+        entries before `offset` are assumed to be part of it.
+        """
+        adj = np.zeros(len(eq) + 1)
+        adj[0] = carry
+        long_, short = side > 0, side < 0
+        opened = long_ & (entry_bar >= offset)
+        np.add.at(adj, entry_bar[opened] - offset, cost[opened])
+        np.add.at(adj, exit_bar[long_] - offset, -cost[long_])
+        np.add.at(adj, exit_bar[short] - offset, cost[short])
+        if open_trade is not None and open_trade[0] > 0 and open_trade[1] >= offset:
+            adj[open_trade[1] - offset] += open_trade[2] * open_trade[3]
+        return eq + np.cumsum(adj)[:-1]
+
+    def trade_equity_returns(self) -> np.ndarray:
+        """
+        Each closed trade's return on the realized equity it started from, entry fee
+        included (the pnl recorded in the log only carries the exit fee). Trades never
+        overlap, so compounding these reproduces the equity after the last closed trade.
+        """
+        delta = self.trades.column("pnl") - self.trades.column("entry_price") * self.trades.column("qty") * self.fee_bps
+        before = self.initial_equity + np.concatenate(([0.0], np.cumsum(delta)[:-1]))
+        return delta / before
+
+    def metrics(self, df_eq: pd.DataFrame, interval: str) -> dict:
+        """
+        Raw (unformatted) summary metrics over the marked-to-market equity, the basis every
+        other path (sweep, walk-forward, chunked runs, plots) uses; summarize() renders them.
+        """
+        eq = self.marked_equity(df_eq)
+        eq = eq[~np.isnan(eq)]
+        m = self._array_metrics(eq, self.trades.column("pnl"), interval)
+        if m:
+            m.update(self.trades.stats(len(eq)))
+        return m
+
+    def summarize(self, df_eq: pd.DataFrame, interval: str) -> dict:
+        return self.format_metrics(self.metrics(df_eq, interval))
+
+    @staticmethod
+    def format_metrics(m: dict) -> dict:
+        """Display strings for a metrics() dict."""
+        if not m:
+            return {}
         return {
-            "Total Return": f"{total_return*100:.2f}%",
-            "CAGR": f"{cagr*100:.2f}%",
-            "Sharpe (simple)": f"{sharpe:.2f}",
-            "Max Drawdown": f"{mdd*100:.2f}%",
-            "Trades": len(self.trades),
-            "Win rate": f"{win_rate*100:.1f}%"
+            "Total Return": f"{m['total_return']*100:.2f}%",
+            "CAGR": f"{m['cagr']*100:.2f}%",
+            "Sharpe (simple)": f"{m['sharpe']:.2f}",
+            "Max Drawdown": f"{m['max_drawdown']*100:.2f}%",
+            "Trades": m["trades"],
+            "Win rate": f"{m['win_rate']*100:.1f}%",
+            **({
+                "Profit factor": f"{m['profit_factor']:.2f}",
+                "Avg holding": str(pd.Timedelta(seconds=m["avg_holding_seconds"]).round("s"))
+                if np.isfinite(m["avg_holding_seconds"]) else "n/a",
+                "Exposure": f"{m['exposure']*100:.1f}%",
+            } if "profit_factor" in m else {})
         }
 
-    def plot(self, df_eq: pd.DataFrame, show: bool = True, save_path: Optional[str] = None):
-        fig, ax = plt.subplots(figsize=(11, 6))
-        (df_eq["equity"] / df_eq["equity"].iloc[0]).plot(ax=ax, label="Equity (normalized)")
-        df_eq["close"].pct_change().add(1).cumprod().plot(ax=ax, alpha=0.6, label="Buy & Hold (normalized)")
+    def plot_data(self, df_eq: pd.DataFrame) -> pd.DataFrame:
+        """
+        The series plot() draws: marked-to-market equity and buy & hold, both normalized to
+        their first bar, and the equity drawdown (same basis as metrics()).
+        """
+        eq = self.marked_equity(df_eq)
+        close = df_eq["close"].to_numpy(dtype=float)
+        return pd.DataFrame({"growth": eq / eq[0], "hold": close / close[0],
+                             "drawdown": eq / np.fmax.accumulate(eq) - 1.0}, index=df_eq.index)
+
+    def plot(self, df_eq: pd.DataFrame, show: bool = True, save_path: Optional[str] = None,
+             width_px: Optional[int] = None):
+        """
+        Equity vs buy & hold, with the equity drawdown underneath (see plot_data()). Each
+        line is reduced with minmax_indices() to a few points per horizontal pixel
+        (`width_px`, default the saved image's width), so long histories render as fast as
+        short ones and look the same: every bucket's extremes are kept.
+        """
+        import matplotlib.pyplot as plt
+
+        dpi = 140
+        fig, (ax, ax_dd) = plt.subplots(2, 1, figsize=(11, 7), sharex=True,
+                                        gridspec_kw={"height_ratios": [3, 1]})
+        width_px = width_px or int(fig.get_figwidth() * dpi)
+        t = pd.DatetimeIndex(df_eq.index).to_numpy() if isinstance(df_eq.index, pd.DatetimeIndex) \
+            else np.arange(len(df_eq))
+        data = self.plot_data(df_eq)
+        growth, hold, drawdown = (data[c].to_numpy() for c in ("growth", "hold", "drawdown"))
+
+        i = minmax_indices(growth, width_px)
+        ax.plot(t[i], growth[i], lw=1, label="Equity (normalized)")
+        i = minmax_indices(hold, width_px)
+        ax.plot(t[i], hold[i], lw=1, alpha=0.6, label="Buy & Hold (normalized)")
+        i = minmax_indices(drawdown, width_px)
+        ax_dd.fill_between(t[i], drawdown[i], 0.0, color="tab:red", alpha=0.4, lw=0)
         ax.set_title(f"SMA Crossover Backtest (fast={self.fast}, slow={self.slow})")
         ax.set_ylabel("Growth (x)")
         ax.legend()
         ax.grid(True, alpha=0.3)
+        ax_dd.set_ylabel("Drawdown")
+        ax_dd.yaxis.set_major_formatter(plt.FuncFormatter(lambda v, _: f"{v:.0%}"))
+        ax_dd.grid(True, alpha=0.3)
+        fig.tight_layout()
         if save_path:
-            plt.savefig(save_path, dpi=140, bbox_inches="tight")
+            plt.savefig(save_path, dpi=dpi, bbox_inches="tight")
         if show:
             plt.show()
         plt.close(fig)
 
 
+# ---------- Portfolio backtest ----------
+
+class PortfolioBacktester(CrossoverBacktester):
+    """
+    Crossover strategy over a time-aligned bars x symbols close matrix.
+
+    SMAs and crossover signals are computed for all symbols at once as 2-D operations,
+    each column over its own bars only, so calendars with different gaps mix cleanly.
+    Each symbol's entries and stop/take-profit/signal exits follow the single-symbol
+    rules (the numpy engine's state machine, run per column). At every bar,
+    `risk_fraction` of portfolio equity is split equally across the symbols in position,
+    and fees are charged on the resulting weight turnover.
+    """
+
+    def run(self, closes: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        Returns (portfolio frame with equity/positions per bar, per-symbol stats frame).
+        NaN closes are allowed: SMAs and signals of each symbol run over its own bars only,
+        so a gap in the union index (e.g. weekends for a stock next to a crypto pair) neither
+        breaks its rolling windows nor triggers trades. Bars before a symbol's first close or
+        after its last one count as no position.
+        """
+        raw = closes.to_numpy(dtype=float)
+        n, m = raw.shape
+        # stable-sort each column's closes ahead of its NaNs, so row k holds every symbol's
+        # k-th own bar; the rolling windows and crossovers then run on that matrix and the
+        # results are scattered back to the original rows (NaN tails stay NaN / 0)
+        order = np.argsort(np.isnan(raw), axis=0, kind="stable")
+        packed = pd.DataFrame(np.take_along_axis(raw, order, axis=0))
+        packed_fast = packed.rolling(self.fast).mean().to_numpy()
+        packed_slow = packed.rolling(self.slow).mean().to_numpy()
+        sma_fast, sma_slow = np.empty((n, m)), np.empty((n, m))
+        signal = np.empty((n, m), dtype=np.int64)
+        np.put_along_axis(sma_fast, order, packed_fast, axis=0)
+        np.put_along_axis(sma_slow, order, packed_slow, axis=0)
+        np.put_along_axis(signal, order, crossover_signal(packed_fast, packed_slow), axis=0)
+        valid = ~(np.isnan(sma_fast) | np.isnan(sma_slow))
+        # listed span of each symbol; prices carry forward over its gaps for bar returns
+        listed = (closes.ffill().notna() & closes.bfill().notna()).to_numpy()
+        prices = np.where(listed, closes.ffill().to_numpy(dtype=float), np.nan)
+
+        # position held after each bar's decisions; only the column state machine is sequential
+        pos = np.zeros((n, m), dtype=np.int8)
+        trade_returns, per_symbol = [], []
+        for s in range(m):
+            _, closed, state = self._simulate(raw[:, s], signal[:, s], valid[:, s])
+            for entry_bar, exit_bar, side, *_ in closed:
+                pos[entry_bar:exit_bar, s] = 1 if side == "long" else -1
+            if state.position != 0:
+                pos[state.entry_bar:, s] = state.position
+            pos[~listed[:, s], s] = 0
+            rets = np.array([c[7] for c in closed], dtype=float)
+            trade_returns.append(rets)
+            per_symbol.append({
+                "symbol": closes.columns[s],
+                "trades": len(rets),
+                "win_rate": float(np.count_nonzero(rets > 0) / max(1, len(rets))),
+                "avg_trade_return": float(rets.mean()) if len(rets) else 0.0,
+                "exposure": float(np.count_nonzero(pos[:, s]) / max(1, n)),
+            })
+
+        # equal split of risk_fraction across open positions, held from bar t to t+1
+        held = np.count_nonzero(pos, axis=1)
+        weights = self.risk_fraction * pos / np.maximum(held, 1)[:, None]
+        bar_ret = np.zeros((n, m))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            bar_ret[1:] = prices[1:] / prices[:-1] - 1
+        bar_ret = np.nan_to_num(bar_ret, nan=0.0, posinf=0.0, neginf=0.0)
+        contrib = np.zeros((n, m))
+        contrib[1:] = weights[:-1] * bar_ret[1:]
+        turnover = np.abs(np.diff(weights, axis=0, prepend=0.0)).sum(axis=1)
+        port_ret = contrib.sum(axis=1) - turnover * self.fee_bps
+        equity = self.initial_equity * np.cumprod(1 + port_ret)
+
+        for s, row in enumerate(per_symbol):
+            row["contribution"] = float(contrib[:, s].sum())
+        self._trade_returns = np.concatenate(trade_returns) if trade_returns else np.empty(0)
+        self.equity_curve = equity
+        df_eq = pd.DataFrame({"equity": equity, "positions": held, "turnover": turnover}, index=closes.index)
+        return df_eq, pd.DataFrame(per_symbol).set_index("symbol")
+
+    def metrics(self, df_eq: pd.DataFrame, interval: str) -> dict:
+        """Aggregate metrics; trades and win rate count every symbol's closed trades."""
+        return self._array_metrics(df_eq["equity"].dropna().to_numpy(dtype=float),
+                                   getattr(self, "_trade_returns", np.empty(0)), interval)
+
+
+def load_close_matrix(tickers: List[str], interval: str, start=None, end=None,
+                      store: Optional["OHLCVStore"] = None, offline: bool = False, workers: int = 8) -> pd.DataFrame:
+    """
+    Closes of several tickers aligned on the union of their timestamps (NaN where missing).
+    Tickers are loaded concurrently with fetch_many; ones that still fail after retries are
+    reported and left out.
+    """
+    store = store or OHLCVStore()
+    frames, results = fetch_many([(t, interval, start, end) for t in tickers], store=store,
+                                 workers=workers, offline=offline)
+    if not all(r.ok for r in results):
+        print(format_fetch_report(results))
+    if not frames:
+        raise ValueError("No data for any of the requested tickers.")
+    closes = {t: frames[(t, interval)]["close"] for t in tickers if (t, interval) in frames}
+    return pd.DataFrame(closes).sort_index()
+
+
 # ---------- Paper trading (simulated) ----------
 
+class StreamingCrossover:
+    """
+    Bar-by-bar version of CrossoverBacktester for live use.
+
+    Keeps running SMA sums over the last `slow` closes plus the position, entry price and
+    equity, and applies exactly the backtester's per-bar entry/stop/take-profit/fee logic
+    to each newly closed bar. Every update costs O(1) time; memory is O(slow), independent
+    of how many bars have been consumed.
+    """
+
+    def __init__(
+        self,
+        fast: int = 50,
+        slow: int = 200,
+        initial_equity: float = 10_000.0,
+        risk_fraction: float = 0.99,
+        stop_loss_pct: float = 0.05,
+        take_profit_pct: float = 0.10,
+        allow_short: bool = False,
+        fee_bps: float = 5.0
+    ):
+        assert fast < slow, "fast SMA must be less than slow SMA"
+        self.fast = fast
+        self.slow = slow
+        self.risk_fraction = risk_fraction
+        self.stop_loss_pct = stop_loss_pct
+        self.take_profit_pct = take_profit_pct
+        self.allow_short = allow_short
+        self.fee_bps = fee_bps / 10000.0
+
+        self._fast_win: deque = deque(maxlen=fast)
+        self._slow_win: deque = deque(maxlen=slow)
+        self._fast_sum = 0.0
+        self._slow_sum = 0.0
+        self._prev_fast = np.nan
+        self._prev_slow = np.nan
+
+        self.position = 0  # +1 long, -1 short, 0 flat
+        self.entry_price: Optional[float] = None
+        self.entry_ts = None
+        self.qty = 0.0
+        self.cash_equity = initial_equity  # realized equity (same bookkeeping as the backtester)
+        self.equity = initial_equity  # marked to the last close
+        self.last_ts = None
+        self.last_price: Optional[float] = None
+        self.bars = 0
+        self.entry_bar = -1
+        self.trades = TradeLog()
+
+    def _push(self, price: float) -> Tuple[float, float]:
+        if len(self._fast_win) == self.fast:
+            self._fast_sum -= self._fast_win[0]
+        if len(self._slow_win) == self.slow:
+            self._slow_sum -= self._slow_win[0]
+        self._fast_win.append(price)
+        self._slow_win.append(price)
+        self._fast_sum += price
+        self._slow_sum += price
+        # re-sum once per slow window so floating-point drift cannot accumulate (amortized O(1))
+        if self.bars % self.slow == 0:
+            self._fast_sum = sum(self._fast_win)
+            self._slow_sum = sum(self._slow_win)
+        sma_fast = self._fast_sum / self.fast if len(self._fast_win) == self.fast else np.nan
+        sma_slow = self._slow_sum / self.slow if len(self._slow_win) == self.slow else np.nan
+        return sma_fast, sma_slow
+
+    def update(self, ts, close: float) -> float:
+        """Consume one closed bar and return the marked-to-market equity."""
+        price = float(close)
+        self.bars += 1
+        sma_fast, sma_slow = self._push(price)
+        signal = 0
+        if self._prev_fast <= self._prev_slow and sma_fast > sma_slow:
+            signal = 1
+        elif self._prev_fast >= self._prev_slow and sma_fast < sma_slow:
+            signal = -1
+        self._prev_fast, self._prev_slow = sma_fast, sma_slow
+        self.last_ts, self.last_price = ts, price
+
+        # skip until MAs exist
+        if np.isnan(sma_fast) or np.isnan(sma_slow):
+            self.equity = self.cash_equity
+            return self.equity
+
+        # manage open position (stop/take)
+        if self.position != 0 and self.entry_price is not None and self.qty != 0:
+            entry_price, qty = self.entry_price, self.qty
+            if self.position > 0:
+                if price <= entry_price * (1 - self.stop_loss_pct) or price >= entry_price * (1 + self.take_profit_pct) or signal < 0:
+                    fee = price * abs(qty) * self.fee_bps
+                    cash = price * qty - fee
+                    self.cash_equity += cash
+                    self.trades.append(self.entry_ts, ts, "long", entry_price, price, qty,
+                                       cash - (entry_price * qty), (price - entry_price) / entry_price,
+                                       self.entry_bar, self.bars - 1)
+                    self._flatten()
+            else:
+                if price >= entry_price * (1 + self.stop_loss_pct) or price <= entry_price * (1 - self.take_profit_pct) or signal > 0:
+                    fee = price * abs(qty) * self.fee_bps
+                    cash = -price * qty - fee  # closing short returns cash
+                    self.cash_equity += cash
+                    self.trades.append(self.entry_ts, ts, "short", entry_price, price, qty,
+                                       cash - (-entry_price * qty), (entry_price - price) / entry_price,
+                                       self.entry_bar, self.bars - 1)
+                    self._flatten()
+
+        # consider new entries if flat
+        if self.position == 0:
+            if signal > 0 or (signal < 0 and self.allow_short):
+                alloc = self.cash_equity * self.risk_fraction
+                self.qty = (alloc / price)
+                fee = price * self.qty * self.fee_bps
+                if signal > 0:
+                    self.cash_equity -= (price * self.qty + fee)
+                    self.position = 1
+                else:
+                    self.cash_equity -= fee
+                    self.position = -1
+                self.entry_price = price
+                self.entry_ts, self.entry_bar = ts, self.bars - 1
+
+        if self.position == 0:
+            self.equity = self.cash_equity
+        else:
+            self.equity = self.cash_equity + (price - self.entry_price) * (self.qty if self.position > 0 else -self.qty)
+        return self.equity
+
+    def _flatten(self):
+        self.position = 0
+        self.entry_price = None
+        self.entry_ts = None
+        self.qty = 0.0
+
+
+class LiveFeed:
+    """Closed bars from yfinance, polled in wall-clock time."""
+
+    done = False  # a live feed never runs out
+    speed = 1.0
+
+    def __init__(self, ticker: str, interval: str):
+        self.ticker = ticker
+        self.interval = interval
+
+    def clock(self) -> float:
+        """Current time on the feed's clock, epoch seconds."""
+        return time.time()
+
+    def history(self, bars: int) -> pd.DataFrame:
+        return fetch_closed_bars(self.ticker, self.interval, period="60d")
+
+    def poll(self, since) -> pd.DataFrame:
+        return fetch_closed_bars(self.ticker, self.interval, start=since)
+
+    def sleep(self, seconds: float):
+        time.sleep(seconds)
+
+
+class ReplayFeed:
+    """
+    Stored bars played back as if they were arriving live, for exercising the paper
+    loop offline. history() hands out the first `bars` rows as the seed window; after
+    that a virtual clock starts at the close of the last seeded bar and runs `speed`
+    times faster than real time, and poll() returns the bars that have closed on it.
+    speed=inf releases everything at once and sleep() returns immediately.
+    """
+
+    def __init__(self, df: pd.DataFrame, interval: str, speed: float = 1.0):
+        if speed <= 0:
+            raise ValueError("speed must be > 0 (use inf for as fast as possible)")
+        self.df = df
+        self.speed = speed
+        self.step = INTERVAL_DELTAS.get(interval, pd.Timedelta(days=1)).value
+        self._ns = pd.DatetimeIndex(df.index).values.astype("datetime64[ns]").view("i8")
+        self._pos = 0  # bars handed out so far
+        self._t0: Optional[int] = None  # virtual ns when the clock started
+        self._wall0 = 0.0
+
+    @property
+    def done(self) -> bool:
+        return self._pos >= len(self.df)
+
+    def _now(self) -> float:
+        return self._t0 + (time.perf_counter() - self._wall0) * 1e9 * self.speed
+
+    def clock(self) -> float:
+        """Virtual time in epoch seconds (the first bar's time until history() starts the clock)."""
+        if self._t0 is None:
+            return self._ns[0] / 1e9 if len(self._ns) else 0.0
+        return (self._now() if self.speed != np.inf else self._ns[-1] + self.step) / 1e9
+
+    def history(self, bars: int) -> pd.DataFrame:
+        self._pos = min(bars, len(self.df))
+        if self._pos:
+            self._t0 = int(self._ns[self._pos - 1]) + self.step
+            self._wall0 = time.perf_counter()
+        return self.df.iloc[:self._pos]
+
+    def poll(self, since) -> pd.DataFrame:
+        lo = self._pos
+        if since is not None:
+            lo = max(lo, int(self._ns.searchsorted(pd.Timestamp(since).as_unit("ns").value, side="right")))
+        # bars are stamped at their open; one is closed once open + step has passed
+        hi = len(self.df) if self.speed == np.inf else int(self._ns.searchsorted(self._now() - self.step, side="right"))
+        self._pos = max(lo, hi)
+        return self.df.iloc[lo:self._pos]
+
+    def sleep(self, seconds: float):
+        if self.speed != np.inf:
+            time.sleep(seconds / self.speed)
+
+
+def _latency_summary(seconds: List[float]) -> dict:
+    """Percentiles of per-bar decision latency, in microseconds."""
+    if not seconds:
+        return {}
+    us = np.asarray(seconds) * 1e6
+    p50, p95, p99 = np.percentile(us, [50, 95, 99])
+    return {"p50_us": float(p50), "p95_us": float(p95), "p99_us": float(p99), "max_us": float(us.max())}
+
+
 def paper_trade_loop(
     ticker: str,
     interval: str = "5m",
@@ -275,61 +1530,1371 @@ def paper_trade_loop(
     stop_loss_pct: float = 0.05,
     take_profit_pct: float = 0.10,
     allow_short: bool = False,
-    poll_seconds: int = 60
-):
+    poll_seconds: int = 60,
+    fee_bps: float = 5.0,
+    feed=None,
+    quiet: bool = False,
+    profiler: Optional["StageProfiler"] = None
+) -> dict:
     """
     Simulates a live trading loop by polling recent data and applying the strategy
     at the close of each new bar. Uses the same execution logic as the backtester.
+
+    The strategy is seeded once from recent history; afterwards each poll fetches only
+    the bars after the last one seen and feeds them to a StreamingCrossover.
+
+    `feed` defaults to a LiveFeed on yfinance; pass a ReplayFeed to run on stored bars.
+    The loop ends on Ctrl+C or when the feed runs out, and returns throughput (bars/s
+    after seeding) and per-bar decision latency, i.e. the time spent in update().
+    A StageProfiler, if given, times the fetch/seed/update stages and records a latency
+    histogram for every poll cycle.
     """
+    feed = feed or LiveFeed(ticker, interval)
+    stage = profiler.stage if profiler is not None else (lambda name: nullcontext({}))
     print(f"[paper] Starting simulated trading on {ticker} ({interval}). Ctrl+C to stop.")
-    state_equity = initial_equity
-    backtester = CrossoverBacktester(
+    strategy = StreamingCrossover(
         fast=fast, slow=slow, initial_equity=initial_equity,
         risk_fraction=risk_fraction, stop_loss_pct=stop_loss_pct,
-        take_profit_pct=take_profit_pct, allow_short=allow_short
+        take_profit_pct=take_profit_pct, allow_short=allow_short, fee_bps=fee_bps
     )
-
-    last_bar_time = None
-    history = None
+    lookback_bars = max(slow * 3, 500)
+    latencies: List[float] = []
+    t_live = None
 
     try:
-        while True:
-            # Fetch enough history to compute SMAs
-            lookback_bars = max(slow * 3, 500)
-            hist = yf.download(ticker, interval=interval, period="60d", progress=False).rename(columns=str.lower)
-            if hist.empty:
-                print("[paper] No data fetched. Retrying...")
-                time.sleep(poll_seconds)
-                continue
-            hist.index.name = "timestamp"
-            hist = hist[["open", "high", "low", "close", "volume"]].dropna()
+        # Seed: replay enough history to warm up the SMAs and derive the current position
+        while strategy.last_ts is None:
+            with stage("fetch") as rec:
+                hist = feed.history(lookback_bars)
+                rec["bars"] = len(hist)
             if len(hist) < slow + 5:
+                if feed.done:
+                    print("[paper] Not enough data to seed the strategy.")
+                    return {}
                 print("[paper] Not enough data yet. Retrying...")
-                time.sleep(poll_seconds)
+                feed.sleep(poll_seconds)
                 continue
-            hist = hist.tail(lookback_bars)
+            with stage("seed") as rec:
+                for ts, price in zip(hist.index[-lookback_bars:], hist["close"].to_numpy()[-lookback_bars:]):
+                    strategy.update(ts, price)
+                rec["bars"] = strategy.bars
+            print(f"[paper] Seeded with {strategy.bars} bars up to {strategy.last_ts} "
+                  f"equity={strategy.equity:.2f} position={strategy.position}")
 
-            # Only act when a new candle is finalized
-            current_last = hist.index[-1]
-            if last_bar_time is not None and current_last == last_bar_time:
-                time.sleep(poll_seconds)
-                continue
-            last_bar_time = current_last
-
-            # Run a one-pass "backtest" over history to get current position/equity
-            df_eq, _ = backtester.run(hist)
-            equity_now = df_eq["equity"].iloc[-1]
-            last_price = float(hist["close"].iloc[-1])
-            print(f"[paper] {current_last} price={last_price:.2f} equity={equity_now:.2f} trades={len(backtester.trades)}")
-
-            # Sleep until next poll
-            time.sleep(poll_seconds)
+        t_live = time.perf_counter()
+        while not feed.done:
+            feed.sleep(poll_seconds)
+            # Only the bars that closed since the last one we processed
+            t_fetch = time.perf_counter()
+            with stage("fetch") as rec:
+                new = feed.poll(strategy.last_ts)
+                rec["bars"] = len(new)
+            t_fetch = time.perf_counter() - t_fetch
+            n_before = len(latencies)
+            with stage("update") as rec:
+                for ts, price in zip(new.index, new["close"].to_numpy() if len(new) else []):
+                    t0 = time.perf_counter()
+                    strategy.update(ts, price)
+                    latencies.append(time.perf_counter() - t0)
+                    if not quiet:
+                        print(f"[paper] {ts} price={strategy.last_price:.2f} equity={strategy.equity:.2f} "
+                              f"position={strategy.position} trades={len(strategy.trades)}")
+                rec["bars"] = len(new)
+            if profiler is not None:
+                profiler.record_poll(strategy.last_ts, t_fetch, latencies[n_before:])
 
     except KeyboardInterrupt:
         print("\n[paper] Stopped by user.")
 
+    elapsed = time.perf_counter() - t_live if t_live is not None else 0.0
+    stats = {
+        "bars": len(latencies),
+        "seconds": elapsed,
+        "bars_per_sec": len(latencies) / elapsed if elapsed > 0 else 0.0,
+        "latency": _latency_summary(latencies),
+        "equity": strategy.equity,
+        "position": strategy.position,
+        "trades": len(strategy.trades),
+    }
+    lat = stats["latency"]
+    print(f"[paper] {stats['bars']} bars in {elapsed:.2f}s ({stats['bars_per_sec']:,.0f} bars/s), "
+          f"equity={strategy.equity:.2f} trades={stats['trades']}")
+    if lat:
+        print(f"[paper] decision latency p50={lat['p50_us']:.1f}us p95={lat['p95_us']:.1f}us "
+              f"p99={lat['p99_us']:.1f}us max={lat['max_us']:.1f}us")
+    return stats
 
-# ---------- CLI ----------
+
+@dataclass
+class PaperInstance:
+    name: str
+    ticker: str
+    interval: str
+    strategy: StreamingCrossover
+    lookback: int
+
+
+class PaperSupervisor:
+    """
+    Many paper-trading strategies in one asyncio event loop.
+
+    Instances on the same (ticker, interval) form a group that has one feed: it is seeded
+    and polled once, and every instance in it gets the same new bars. Each group sleeps
+    until the next bar close on its interval grid (plus `grace_seconds` for the source to
+    publish the bar) instead of polling on a fixed period. Feed calls block, so they run in
+    the default thread pool, at most `max_fetches` at a time. After each update the
+    per-instance equity/position table is printed and, with `status_path`, written as JSON.
+    A group whose feed raises is restarted with a new feed after `restart_seconds` (up to
+    `max_restarts` times); its strategies keep their state and skip bars already seen, and
+    the other groups keep running.
+
+    `feed_factory(ticker, interval)` defaults to LiveFeed; ReplayFeed-based factories
+    drive the same loop from stored bars.
+    """
+
+    def __init__(self, feed_factory=None, grace_seconds: float = 5.0, max_fetches: int = 4,
+                 status_path: Optional[str] = None, quiet: bool = False, max_restarts: int = 5,
+                 restart_seconds: float = 10.0):
+        self.feed_factory = feed_factory or LiveFeed
+        self.grace_seconds = grace_seconds
+        self.max_fetches = max_fetches
+        self.status_path = status_path
+        self.quiet = quiet
+        self.max_restarts = max_restarts
+        self.restart_seconds = restart_seconds
+        self.instances: List[PaperInstance] = []
+        self.fetches = 0
+        self.restarts = 0
+
+    def add(self, ticker: str, interval: str, name: Optional[str] = None, fast: int = 50, slow: int = 200,
+            **params) -> PaperInstance:
+        """Register a strategy; `params` are the remaining StreamingCrossover arguments."""
+        inst = PaperInstance(name=name or f"{ticker}:{interval}:{fast}/{slow}", ticker=ticker, interval=interval,
+                             strategy=StreamingCrossover(fast=fast, slow=slow, **params),
+                             lookback=max(slow * 3, 500))
+        self.instances.append(inst)
+        return inst
+
+    def snapshot(self) -> List[dict]:
+        return [{
+            "name": i.name, "ticker": i.ticker, "interval": i.interval,
+            "last_ts": str(i.strategy.last_ts) if i.strategy.last_ts is not None else None,
+            "price": i.strategy.last_price, "equity": i.strategy.equity,
+            "position": i.strategy.position, "trades": len(i.strategy.trades),
+        } for i in self.instances]
+
+    def _publish(self, group: List[PaperInstance]):
+        if not self.quiet:
+            for i in group:
+                st = i.strategy
+                print(f"[supervisor] {i.name} {st.last_ts} price={st.last_price:.2f} equity={st.equity:.2f} "
+                      f"position={st.position} trades={len(st.trades)}")
+        if self.status_path:
+            tmp = f"{self.status_path}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"updated": pd.Timestamp.now(tz="UTC").isoformat(), "instances": self.snapshot()}, f, indent=1)
+            os.replace(tmp, self.status_path)
+
+    async def _call(self, fn, *args):
+        async with self._fetch_slots:
+            self.fetches += 1
+            return await asyncio.get_running_loop().run_in_executor(None, fn, *args)
+
+    def _until_close(self, feed, interval: str) -> float:
+        """Real seconds until the next bar close (plus grace) on the feed's clock."""
+        if feed.speed == np.inf:
+            return 0.0
+        step = INTERVAL_DELTAS.get(interval, pd.Timedelta(days=1)).total_seconds()
+        now = feed.clock()
+        return ((now // step + 1) * step - now + self.grace_seconds) / feed.speed
+
+    async def _run_group(self, ticker: str, interval: str, group: List[PaperInstance]):
+        feed = self.feed_factory(ticker, interval)
+        need = max(i.strategy.slow for i in group) + 5
+        while True:
+            hist = await self._call(feed.history, max(i.lookback for i in group))
+            if len(hist) >= need:
+                break
+            if feed.done:
+                print(f"[supervisor] {ticker} {interval}: not enough data to seed, skipping.")
+                return
+            await asyncio.sleep(self._until_close(feed, interval))
+        closes = hist["close"].to_numpy()
+        for i in group:
+            last = i.strategy.last_ts  # set when the group is restarted
+            for ts, price in zip(hist.index[-i.lookback:], closes[-i.lookback:]):
+                if last is None or ts > last:
+                    i.strategy.update(ts, price)
+        self._publish(group)
+
+        while not feed.done:
+            await asyncio.sleep(self._until_close(feed, interval))
+            new = await self._call(feed.poll, min(i.strategy.last_ts for i in group))
+            if not len(new):
+                continue
+            closes = new["close"].to_numpy()
+            for i in group:
+                last = i.strategy.last_ts
+                for ts, price in zip(new.index, closes):
+                    if ts > last:
+                        i.strategy.update(ts, price)
+            self._publish(group)
+
+    async def _supervise_group(self, ticker: str, interval: str, group: List[PaperInstance]):
+        for attempt in range(self.max_restarts + 1):
+            try:
+                return await self._run_group(ticker, interval, group)
+            except Exception as e:  # cancellation is not an Exception, so Ctrl+C still stops everything
+                if attempt == self.max_restarts:
+                    print(f"[supervisor] {ticker} {interval} failed {attempt + 1} times ({type(e).__name__}: {e}); "
+                          f"giving up on it.")
+                    return
+                self.restarts += 1
+                print(f"[supervisor] {ticker} {interval} crashed ({type(e).__name__}: {e}); "
+                      f"restarting in {self.restart_seconds:g}s.")
+                await asyncio.sleep(self.restart_seconds)
+
+    async def run(self):
+        """Run every group until its feed runs out (replay) or the task is cancelled (live)."""
+        self._fetch_slots = asyncio.Semaphore(self.max_fetches)
+        groups: Dict[Tuple[str, str], List[PaperInstance]] = {}
+        for inst in self.instances:
+            groups.setdefault((inst.ticker, inst.interval), []).append(inst)
+        print(f"[supervisor] {len(self.instances)} strategies on {len(groups)} feeds. Ctrl+C to stop.")
+        await asyncio.gather(*(self._supervise_group(t, i, g) for (t, i), g in groups.items()))
+
+
+def parse_paper_specs(spec: str, default_interval: str, fast: int, slow: int) -> List[Tuple[str, str, int, int]]:
+    """'BTC-USD,ETH-USD:1m,SOL-USD:5m:20:100' -> (ticker, interval, fast, slow) tuples."""
+    out = []
+    for item in (x.strip() for x in spec.split(",")):
+        if not item:
+            continue
+        parts = item.split(":")
+        if len(parts) not in (1, 2, 4):
+            raise ValueError(f"Bad strategy spec {item!r}; use TICKER[:INTERVAL[:FAST:SLOW]].")
+        out.append((parts[0], parts[1] if len(parts) > 1 else default_interval,
+                    int(parts[2]) if len(parts) == 4 else fast, int(parts[3]) if len(parts) == 4 else slow))
+    return out
+
+
+# ---------- Binary bar files ----------
+
+OHLCV_COLUMNS = ["open", "high", "low", "close", "volume"]
+
+
+def _read_meta(d: pathlib.Path) -> Optional[dict]:
+    try:
+        with open(d / "meta.json", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def _write_meta(d: pathlib.Path, meta: dict):
+    tmp = d / "meta.json.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=1)
+    os.replace(tmp, d / "meta.json")
+
+
+def _bound_ns(value, tz: str) -> Optional[int]:
+    """Range bound (date string/Timestamp/None) -> int64 ns in the stored timestamp convention."""
+    if value is None:
+        return None
+    ts = pd.Timestamp(value)
+    if tz:
+        ts = ts.tz_localize(tz) if ts.tzinfo is None else ts.tz_convert(tz)
+    elif ts.tzinfo is not None:
+        ts = ts.tz_convert(None)
+    return int(ts.as_unit("ns").value)
+
+
+def _ns_to_ts(ns: int, tz: str) -> pd.Timestamp:
+    return pd.Timestamp(ns, unit="ns", tz="UTC").tz_convert(tz) if tz else pd.Timestamp(ns, unit="ns")
+
+
+def _file_fingerprint(*paths) -> tuple:
+    """(resolved path, size, mtime_ns) per file: changes whenever a file is rewritten."""
+    out = ()
+    for path in paths:
+        st = os.stat(path)
+        out += (str(pathlib.Path(path).resolve()), st.st_size, st.st_mtime_ns)
+    return out
+
+
+def _bars_index(ts: np.ndarray, tz: str) -> pd.DatetimeIndex:
+    index = pd.DatetimeIndex(ts.view("M8[ns]"), name="timestamp")
+    return index.tz_localize("UTC").tz_convert(tz) if tz else index
+
+
+def write_bars(d, df: pd.DataFrame) -> str:
+    """
+    Write an OHLCV frame as a bars directory: timestamp.npy (int64 ns, UTC for tz-aware
+    data) and ohlcv.npy (bars x 5 float64 in column-major order, so each column is one
+    contiguous run on disk). Returns the timezone name to record in meta.json ('' if naive).
+    """
+    d = pathlib.Path(d)
+    d.mkdir(parents=True, exist_ok=True)
+    idx = df.index
+    tz = str(idx.tz) if idx.tz is not None else ""
+    ts = (idx.tz_convert("UTC") if tz else idx).as_unit("ns").asi8
+    arrays = {
+        "timestamp": ts.astype(np.int64),
+        "ohlcv": np.asfortranarray(df[OHLCV_COLUMNS].to_numpy(dtype=np.float64)),
+    }
+    for name, arr in arrays.items():
+        # write-then-rename so readers holding an old mmap keep a consistent file
+        tmp = d / f"{name}.npy.tmp"
+        with open(tmp, "wb") as f:
+            np.save(f, arr)
+        os.replace(tmp, d / f"{name}.npy")
+    return tz
+
+
+def _open_bar_arrays(d: pathlib.Path) -> Tuple[np.ndarray, np.ndarray]:
+    return np.load(d / "timestamp.npy", mmap_mode="r"), np.load(d / "ohlcv.npy", mmap_mode="r")
+
+
+def open_bars(path, start=None, end=None) -> pd.DataFrame:
+    """
+    Memory-map a bars directory and return OHLCV for [start, end) without copying:
+    the frame's values are a view of ohlcv.npy.
+    """
+    d = pathlib.Path(path)
+    meta = _read_meta(d)
+    if meta is None:
+        raise ValueError(f"{d} is not a bars directory (missing meta.json).")
+    tz = meta.get("tz", "")
+    ts, ohlcv = _open_bar_arrays(d)
+    lo_ns, hi_ns = _bound_ns(start, tz), _bound_ns(end, tz)
+    lo = int(ts.searchsorted(lo_ns)) if lo_ns is not None else 0
+    hi = int(ts.searchsorted(hi_ns)) if hi_ns is not None else len(ts)
+    # a row slice of the column-major memmap is still a view; pandas keeps it as its block
+    return pd.DataFrame(ohlcv[lo:hi], columns=OHLCV_COLUMNS, index=_bars_index(ts[lo:hi], tz), copy=False)
+
+
+def ingest_csv(
+    csv_path: str,
+    out_dir: str,
+    ts_col: str = "timestamp",
+    chunksize: int = 1_000_000,
+    ts_format: Optional[str] = "ISO8601",
+    ts_unit: Optional[str] = None,
+) -> dict:
+    """
+    Stream a (possibly multi-GB) OHLCV CSV into a bars directory with bounded memory.
+
+    Chunks are parsed with explicit float64 dtypes and a fixed timestamp format (or an
+    epoch unit), rows with missing values are dropped, and each chunk is sorted and
+    spilled as a run. Runs that are already in order are copied straight through;
+    otherwise they are k-way merged block by block. Peak memory is about one chunk.
+    Returns ingest statistics (also stored in meta.json).
+    """
+    header = pd.read_csv(csv_path, nrows=0).columns
+    missing = [c for c in [ts_col] + OHLCV_COLUMNS if c not in header]
+    if missing:
+        raise ValueError(f"CSV missing columns: {missing}. Required: {[ts_col] + OHLCV_COLUMNS}")
+
+    out = pathlib.Path(out_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    run_dir = pathlib.Path(tempfile.mkdtemp(prefix=".runs-", dir=out))
+    dtypes = {c: np.float64 for c in OHLCV_COLUMNS}
+    dtypes[ts_col] = np.int64 if ts_unit else str
+    runs = []  # (timestamps, ohlcv) memmaps of each sorted chunk
+    tz = None
+    dropped = 0
+    in_order = True
+    try:
+        reader = pd.read_csv(csv_path, usecols=[ts_col] + OHLCV_COLUMNS, dtype=dtypes,
+                             chunksize=chunksize, engine="c")
+        for i, chunk in enumerate(reader):
+            if ts_unit:
+                when = pd.to_datetime(chunk[ts_col].to_numpy(), unit=ts_unit, utc=True)
+            else:
+                when = pd.DatetimeIndex(pd.to_datetime(chunk[ts_col], format=ts_format))
+            chunk_tz = "UTC" if when.tz is not None else ""
+            if tz is None:
+                tz = chunk_tz
+            elif tz != chunk_tz:
+                raise ValueError(f"Chunk {i} mixes timezone-aware and naive timestamps.")
+            if chunk_tz:
+                when = when.tz_convert("UTC")
+            ts = when.as_unit("ns").asi8.copy()
+            values = chunk[OHLCV_COLUMNS].to_numpy(dtype=np.float64)
+            keep = ~(np.isnan(values).any(axis=1) | (ts == np.iinfo(np.int64).min))  # NaN / NaT
+            dropped += int(len(keep) - keep.sum())
+            ts, values = ts[keep], values[keep]
+            if not len(ts):
+                continue
+            if (np.diff(ts) < 0).any():
+                order = np.argsort(ts, kind="stable")
+                ts, values = ts[order], values[order]
+                in_order = False
+            if runs and ts[0] < runs[-1][0][-1]:
+                in_order = False
+            np.save(run_dir / f"{i}.ts.npy", ts)
+            np.save(run_dir / f"{i}.ohlcv.npy", values)
+            runs.append((np.load(run_dir / f"{i}.ts.npy", mmap_mode="r"),
+                         np.load(run_dir / f"{i}.ohlcv.npy", mmap_mode="r")))
+
+        total = sum(len(r[0]) for r in runs)
+        ts_out = np.lib.format.open_memmap(out / "timestamp.npy.tmp", mode="w+", dtype=np.int64, shape=(total,))
+        ohlcv_out = np.lib.format.open_memmap(out / "ohlcv.npy.tmp", mode="w+", dtype=np.float64,
+                                              shape=(total, len(OHLCV_COLUMNS)), fortran_order=True)
+        pos = 0
+        if in_order:
+            for run_ts, run_values in runs:
+                ts_out[pos:pos + len(run_ts)] = run_ts
+                ohlcv_out[pos:pos + len(run_ts)] = run_values
+                pos += len(run_ts)
+        else:
+            block = max(1024, chunksize // max(1, len(runs)))
+            cursors = [0] * len(runs)
+            while pos < total:
+                live = [k for k in range(len(runs)) if cursors[k] < len(runs[k][0])]
+                # everything <= the smallest block end is final: no later block can undercut it
+                cutoff = min(runs[k][0][min(cursors[k] + block, len(runs[k][0])) - 1] for k in live)
+                parts_ts, parts_values = [], []
+                for k in live:
+                    run_ts = runs[k][0][cursors[k]:cursors[k] + block]
+                    take = int(run_ts.searchsorted(cutoff, side="right"))
+                    parts_ts.append(run_ts[:take])
+                    parts_values.append(runs[k][1][cursors[k]:cursors[k] + take])
+                    cursors[k] += take
+                merged_ts = np.concatenate(parts_ts)
+                order = np.argsort(merged_ts, kind="stable")
+                ts_out[pos:pos + len(order)] = merged_ts[order]
+                ohlcv_out[pos:pos + len(order)] = np.concatenate(parts_values)[order]
+                pos += len(order)
+        ts_out.flush()
+        ohlcv_out.flush()
+        del ts_out, ohlcv_out, runs
+        os.replace(out / "timestamp.npy.tmp", out / "timestamp.npy")
+        os.replace(out / "ohlcv.npy.tmp", out / "ohlcv.npy")
+    finally:
+        shutil.rmtree(run_dir, ignore_errors=True)
+
+    stats = {"source": str(csv_path), "tz": tz or "", "rows": total, "dropped_rows": dropped,
+             "sorted_input": in_order}
+    _write_meta(out, stats)
+    return stats
+
+
+# ---------- Local OHLCV store ----------
+
+
+def _yf_fetch(ticker: str, interval: str, start=None, end=None) -> pd.DataFrame:
+    """One yfinance request; an empty frame (not an error) when the range has no bars."""
+    import yfinance as yf
+
+    df = yf.download(ticker, interval=interval, start=start, end=end, auto_adjust=False, progress=False)
+    if df.empty:
+        return pd.DataFrame(columns=OHLCV_COLUMNS, index=pd.DatetimeIndex([], name="timestamp"))
+    return _tidy_yf(df)
+
+
+class OHLCVStore:
+    """
+    On-disk OHLCV cache keyed by (ticker, interval).
+
+    Each series is a bars directory (see write_bars) whose meta.json also records the
+    time range already requested from the source. Loads go through open_bars, so the
+    returned frame is memory-mapped rather than copied. Requests inside the covered
+    range need no network call; otherwise only the missing head and/or tail is fetched
+    and merged in.
+
+    `fetcher(ticker, interval, start, end)` defaults to yfinance and can be swapped for a
+    local source.
+    """
+
+    def __init__(self, root: str = "ohlcv_cache", fetcher=None):
+        self.root = pathlib.Path(root)
+        self.fetcher = fetcher or _yf_fetch
+        self.network_calls = 0
+
+    def _dir(self, ticker: str, interval: str) -> pathlib.Path:
+        return self.root / f"{re.sub(r'[^A-Za-z0-9._-]', '_', ticker)}__{interval}"
+
+    def load(self, ticker: str, interval: str, start=None, end=None, offline: bool = False) -> pd.DataFrame:
+        """
+        OHLCV for [start, end) with columns open/high/low/close/volume, backed by the on-disk
+        memory maps. With offline=True only cached bars are returned and no fetch is attempted.
+        """
+        d = self._dir(ticker, interval)
+        meta = _read_meta(d)
+        now_ns = pd.Timestamp.now(tz="UTC").value
+        if meta is None:
+            if offline:
+                raise ValueError(f"No cached data for {ticker} {interval} and offline mode is on.")
+            df = self._fetch(ticker, interval, start, end)
+            if df.empty:
+                raise ValueError("No data returned from yfinance. Check ticker/interval/time range.")
+            tz = write_bars(d, df)
+            meta = {"ticker": ticker, "interval": interval, "tz": tz,
+                    "covered_start": _bound_ns(start, tz),
+                    "covered_end": _bound_ns(end, tz) if end is not None else _bound_ns(
+                        pd.Timestamp(now_ns, unit="ns", tz="UTC"), tz),
+                    "rows": len(df)}
+        elif not offline:
+            meta = self._extend(d, meta, ticker, interval, start, end, now_ns)
+
+        meta["last_used"] = time.time()
+        _write_meta(d, meta)
+
+        return open_bars(d, start=start, end=end)
+
+    def fingerprint(self, ticker: str, interval: str, start=None, end=None, offline: bool = False) -> Optional[tuple]:
+        """
+        Cheap identity of what load() would return, without opening the bars: None when the
+        series is not cached or load() would have to fetch more; otherwise a tuple that
+        changes whenever the series is rewritten.
+        """
+        d = self._dir(ticker, interval)
+        meta = _read_meta(d)
+        if meta is None:
+            return None
+        if not offline:
+            tz = meta["tz"]
+            cov_lo, cov_hi = meta["covered_start"], meta["covered_end"]
+            req_lo = _bound_ns(start, tz)
+            req_hi = _bound_ns(end, tz) if end is not None else _bound_ns(pd.Timestamp.now(tz="UTC"), tz)
+            step = INTERVAL_DELTAS.get(interval, pd.Timedelta(days=1)).value
+            # same conditions under which _extend would fetch
+            if cov_lo is not None and (req_lo is None or req_lo < cov_lo):
+                return None
+            if req_hi > cov_hi and (end is not None or req_hi - cov_hi >= step):
+                return None
+        return ("store", ticker, interval, str(start), str(end)) + _file_fingerprint(
+            d / "timestamp.npy", d / "ohlcv.npy")
+
+    def _fetch(self, ticker: str, interval: str, start, end) -> pd.DataFrame:
+        self.network_calls += 1
+        return self.fetcher(ticker, interval, start, end)
+
+    def _extend(self, d: pathlib.Path, meta: dict, ticker: str, interval: str, start, end, now_ns: int) -> dict:
+        """Fetch whatever part of [start, end) lies outside the covered range and merge it in."""
+        tz = meta["tz"]
+        cov_lo, cov_hi = meta["covered_start"], meta["covered_end"]
+        req_lo = _bound_ns(start, tz)
+        req_hi = _bound_ns(end, tz) if end is not None else _bound_ns(
+            pd.Timestamp(now_ns, unit="ns", tz="UTC"), tz)
+        parts = []
+        if cov_lo is not None and (req_lo is None or req_lo < cov_lo):
+            parts.append(self._fetch(ticker, interval, start, _ns_to_ts(cov_lo, tz)))
+            cov_lo = req_lo
+        step = INTERVAL_DELTAS.get(interval, pd.Timedelta(days=1)).value
+        # open-ended requests only refetch once at least one more bar can have closed
+        if req_hi > cov_hi and (end is not None or req_hi - cov_hi >= step):
+            ts = np.load(d / "timestamp.npy", mmap_mode="r")
+            # restart from the last stored bar so a candle that was still forming gets replaced
+            tail_from = min(cov_hi, int(ts[-1])) if len(ts) else cov_hi
+            parts.append(self._fetch(ticker, interval, _ns_to_ts(tail_from, tz), end))
+            cov_hi = req_hi
+        if not parts:
+            return meta
+
+        ts, ohlcv = _open_bar_arrays(d)
+        cached = pd.DataFrame(np.array(ohlcv), columns=OHLCV_COLUMNS, index=_bars_index(np.array(ts), tz))
+        fresh = [p for p in parts if not p.empty]
+        if tz:
+            fresh = [p.tz_convert(tz) if p.index.tz is not None else p.tz_localize(tz) for p in fresh]
+        merged = pd.concat([cached] + fresh)
+        # fetched bars win over cached ones with the same timestamp
+        merged = merged[~merged.index.duplicated(keep="last")].sort_index()
+        del ts, ohlcv, cached
+        write_bars(d, merged)
+        return dict(meta, covered_start=cov_lo, covered_end=cov_hi, rows=len(merged))
+
+    def entries(self) -> List[dict]:
+        """One summary dict per cached series."""
+        out = []
+        if not self.root.exists():
+            return out
+        for d in sorted(p for p in self.root.iterdir() if p.is_dir()):
+            meta = _read_meta(d)
+            if meta is None:
+                continue
+            size = sum(f.stat().st_size for f in d.iterdir() if f.is_file())
+            tz = meta.get("tz", "")
+            ts = np.load(d / "timestamp.npy", mmap_mode="r")
+            out.append({
+                "ticker": meta["ticker"],
+                "interval": meta["interval"],
+                "rows": len(ts),
+                "first": _ns_to_ts(int(ts[0]), tz) if len(ts) else None,
+                "last": _ns_to_ts(int(ts[-1]), tz) if len(ts) else None,
+                "size_mb": size / 2**20,
+                "last_used": pd.Timestamp(meta.get("last_used", 0), unit="s"),
+                "path": str(d),
+            })
+        return out
+
+    def evict(self, ticker: Optional[str] = None, interval: Optional[str] = None,
+              older_than_days: Optional[float] = None, max_mb: Optional[float] = None) -> List[dict]:
+        """
+        Delete cached series. Filters by ticker/interval/last use; with max_mb, the least
+        recently used series are removed until the cache fits. Returns the removed entries.
+        """
+        entries = sorted(self.entries(), key=lambda e: e["last_used"])
+        doomed = []
+        if ticker or interval or older_than_days is not None:
+            cutoff = pd.Timestamp.now(tz="UTC").tz_localize(None) - pd.Timedelta(days=older_than_days) if older_than_days is not None else None
+            doomed = [e for e in entries
+                      if (ticker is None or e["ticker"] == ticker)
+                      and (interval is None or e["interval"] == interval)
+                      and (cutoff is None or e["last_used"] < cutoff)]
+        if max_mb is not None:
+            remaining = [e for e in entries if e not in doomed]
+            total = sum(e["size_mb"] for e in remaining)
+            for e in remaining:
+                if total <= max_mb:
+                    break
+                doomed.append(e)
+                total -= e["size_mb"]
+        for e in doomed:
+            d = pathlib.Path(e["path"])
+            for f in d.iterdir():
+                f.unlink()
+            d.rmdir()
+        return doomed
+
+
+# ---------- Bulk fetch ----------
+
+class RateLimiter:
+    """Token bucket shared by all fetch threads: `rate` calls per second on average, bursts up to `burst`."""
+
+    def __init__(self, rate: float, burst: int = 1):
+        if not rate > 0:
+            raise ValueError(f"rate must be positive, got {rate!r}")
+        if burst < 1:
+            raise ValueError(f"burst must be at least 1, got {burst!r}")
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+@dataclass
+class FetchResult:
+    ticker: str
+    interval: str
+    ok: bool
+    rows: int
+    attempts: int
+    seconds: float
+    error: Optional[str] = None
+
+
+def fetch_many(
+    requests: Iterable[Tuple[str, str, Optional[str], Optional[str]]],
+    store: Optional["OHLCVStore"] = None,
+    fetcher=None,
+    workers: int = 8,
+    rate: float = 2.0,
+    burst: int = 2,
+    retries: int = 3,
+    backoff: float = 1.0,
+    max_backoff: float = 30.0,
+    offline: bool = False,
+) -> Tuple[Dict[Tuple[str, str], pd.DataFrame], List[FetchResult]]:
+    """
+    Fetch many (ticker, interval, start, end) requests on a thread pool.
+
+    Every call to the data source, across all threads, goes through one RateLimiter.
+    A request that raises or comes back empty (yfinance's usual answer to throttling) is
+    retried up to `retries` times after an exponential backoff with jitter. With `store`
+    the bars go through OHLCVStore.load, so cached ranges cost nothing and new bars are
+    persisted; otherwise `fetcher(ticker, interval, start, end)` (yfinance by default) is
+    called directly.
+
+    Returns the frames of the successful requests keyed by (ticker, interval) and one
+    FetchResult per request, failures included, instead of raising on the first error.
+    Repeated identical requests are fetched once; two different ranges for the same
+    ticker/interval raise ValueError, since they would share one key.
+    """
+    requests = list(dict.fromkeys(tuple(req) for req in requests))
+    seen: Dict[Tuple[str, str], tuple] = {}
+    for req in requests:
+        other = seen.setdefault((req[0], req[1]), req)
+        if other != req:
+            raise ValueError(f"Conflicting requests for {req[0]} {req[1]}: {other[2:]} and {req[2:]}; "
+                             f"fetch one range per ticker/interval.")
+    limiter = RateLimiter(rate, burst)
+    source = fetcher or (store.fetcher if store is not None else _yf_fetch)
+
+    def limited(*args):
+        limiter.acquire()
+        return source(*args)
+
+    # a private store on the same directory, so the caller's instance isn't modified
+    shared = OHLCVStore(store.root, fetcher=limited) if store is not None else None
+
+    def run_one(req):
+        ticker, interval, start, end = req
+        t0 = time.perf_counter()
+        attempt, error, df = 0, None, None
+        while True:
+            attempt += 1
+            try:
+                if shared is not None:
+                    df = shared.load(ticker, interval, start=start, end=end, offline=offline)
+                else:
+                    df = limited(ticker, interval, start, end)
+                if df.empty:
+                    raise ValueError("no data returned")
+                error = None
+                break
+            except Exception as e:  # network, parsing and throttling errors all look alike here
+                error = f"{type(e).__name__}: {e}"
+                if offline or attempt > retries:
+                    break
+                delay = min(max_backoff, backoff * 2 ** (attempt - 1))
+                time.sleep(delay / 2 + random.uniform(0, delay / 2))
+        res = FetchResult(ticker, interval, ok=error is None, rows=0 if error else len(df),
+                          attempts=attempt, seconds=time.perf_counter() - t0, error=error)
+        return res, None if error else df
+
+    frames: Dict[Tuple[str, str], pd.DataFrame] = {}
+    results: List[FetchResult] = []
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        for res, df in pool.map(run_one, requests):
+            results.append(res)
+            if df is not None:
+                frames[(res.ticker, res.interval)] = df
+    if store is not None:
+        store.network_calls += shared.network_calls
+    return frames, results
+
+
+def format_fetch_report(results: List[FetchResult]) -> str:
+    ok = sum(r.ok for r in results)
+    lines = [f"[fetch] {ok}/{len(results)} requests succeeded"]
+    for r in results:
+        status = f"{r.rows} bars" if r.ok else f"FAILED ({r.error})"
+        lines.append(f"  {r.ticker:12s} {r.interval:4s} {status}  attempts={r.attempts} {r.seconds:.2f}s")
+    return "\n".join(lines)
+
+
+# ---------- Backtest result cache ----------
+
+RESULT_CACHE_VERSION = 3  # bump when the simulation or the stored layout changes
+
+
+class BacktestCache:
+    """
+    On-disk memo of CrossoverBacktester results, one .npz per (bars, parameters, interval).
+
+    Keys use a content hash of the bars the strategy reads (timestamps and closes), so
+    editing the data invalidates old results automatically. Source fingerprints (file
+    size/mtime, see _file_fingerprint) are mapped to those hashes in meta.json, which lets
+    run() answer a repeat request without loading or hashing the bars at all. Entries are
+    evicted least recently used first once the directory grows past `max_mb`.
+    """
+
+    def __init__(self, root: str = "backtest_cache", max_mb: float = 512.0):
+        self.root = pathlib.Path(root)
+        self.max_mb = max_mb
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def bars_digest(df: pd.DataFrame) -> str:
+        idx = pd.DatetimeIndex(df.index)
+        h = hashlib.blake2b(digest_size=16)
+        h.update(str(idx.tz).encode())
+        h.update(np.ascontiguousarray(idx.values.astype("datetime64[ns]").view("i8")).data)
+        # every OHLCV column present, not just close: the volume filter reads volume
+        for col in ("open", "high", "low", "close", "volume"):
+            if col in df.columns:
+                h.update(col.encode())
+                h.update(np.ascontiguousarray(df[col].to_numpy(dtype=float)).data)
+        return h.hexdigest()
+
+    @staticmethod
+    def key(bt: "CrossoverBacktester", digest: str, interval: str) -> str:
+        params = (RESULT_CACHE_VERSION, digest, interval, bt.fast, bt.slow, bt.initial_equity, bt.risk_fraction,
+                  bt.stop_loss_pct, bt.take_profit_pct, bt.allow_short, bt.fee_bps, bt.ma, bt.volume_filter)
+        return hashlib.blake2b(repr(params).encode(), digest_size=16).hexdigest()
+
+    def _path(self, key: str) -> pathlib.Path:
+        return self.root / f"{key}.npz"
+
+    def source_digest(self, fingerprint: tuple) -> Optional[str]:
+        meta = _read_meta(self.root) or {}
+        return meta.get("sources", {}).get(json.dumps(fingerprint))
+
+    def remember_source(self, fingerprint: tuple, digest: str, keep: int = 1024):
+        self.root.mkdir(parents=True, exist_ok=True)
+        meta = _read_meta(self.root) or {}
+        sources = meta.get("sources", {})
+        sources.pop(json.dumps(fingerprint), None)
+        sources[json.dumps(fingerprint)] = digest
+        meta["sources"] = dict(list(sources.items())[-keep:])
+        _write_meta(self.root, meta)
+
+    def get(self, key: str) -> Optional[Tuple[pd.DataFrame, TradeLog, dict, Optional[tuple]]]:
+        """(equity frame with close/equity columns, trades, metrics, open trade) or None."""
+        path = self._path(key)
+        try:
+            with np.load(path) as z:
+                info = json.loads(str(z["info"]))
+                index = _bars_index(z["timestamp"], info["tz"])
+                df_eq = pd.DataFrame({"close": z["close"], "equity": z["equity"]}, index=index)
+                trades = TradeLog.from_array(z["trades"], tz=index.tz)
+        except (FileNotFoundError, KeyError, ValueError, OSError):
+            return None
+        os.utime(path)  # mtime doubles as last-used time for eviction
+        open_trade = info.get("open_trade")
+        if open_trade:
+            side, entry_bar, entry_price, qty = open_trade
+            open_trade = (int(side), int(entry_bar), float(entry_price), float(qty))
+        return df_eq, trades, info["metrics"], open_trade
+
+    def put(self, key: str, df_eq: pd.DataFrame, trades: TradeLog, metrics: dict,
+            open_trade: Optional[tuple] = None):
+        self.root.mkdir(parents=True, exist_ok=True)
+        idx = pd.DatetimeIndex(df_eq.index)
+        tz = str(idx.tz) if idx.tz is not None else ""
+        info = json.dumps({"tz": tz, "metrics": metrics,
+                           "open_trade": [int(open_trade[0]), int(open_trade[1]), float(open_trade[2]),
+                                          float(open_trade[3])] if open_trade else None})
+        tmp = self._path(key).with_suffix(".tmp")
+        with open(tmp, "wb") as f:
+            np.savez(f, timestamp=idx.values.astype("datetime64[ns]").view("i8"),
+                     close=df_eq["close"].to_numpy(dtype=float), equity=df_eq["equity"].to_numpy(dtype=float),
+                     trades=trades.data, info=np.array(info))
+        os.replace(tmp, self._path(key))
+        self.evict(self.max_mb)
+
+    def entries(self) -> List[dict]:
+        if not self.root.exists():
+            return []
+        out = []
+        for path in self.root.glob("*.npz"):
+            st = path.stat()
+            out.append({"key": path.stem, "size_mb": st.st_size / 2**20,
+                        "last_used": pd.Timestamp(st.st_mtime, unit="s"), "path": str(path)})
+        return sorted(out, key=lambda e: e["last_used"])
+
+    def evict(self, max_mb: float) -> List[dict]:
+        """Remove least recently used results until the cache fits in max_mb."""
+        entries = self.entries()
+        total = sum(e["size_mb"] for e in entries)
+        doomed = []
+        for e in entries:
+            if total <= max_mb:
+                break
+            pathlib.Path(e["path"]).unlink(missing_ok=True)
+            doomed.append(e)
+            total -= e["size_mb"]
+        return doomed
+
+    def run(self, bt: "CrossoverBacktester", interval: str, load, fingerprint: Optional[tuple] = None
+            ) -> Tuple[pd.DataFrame, TradeLog, dict, bool]:
+        """
+        Memoized bt.run() + bt.metrics(). `load()` returns the bars and is only called when
+        the fingerprint is unknown or stale. Returns (df_eq, trades, metrics, hit); on a hit
+        df_eq only has close and equity columns. bt.trades and bt.open_trade are set either
+        way, so bt.marked_equity(df_eq) works on a hit too.
+        """
+        digest = self.source_digest(fingerprint) if fingerprint else None
+        cached = self.get(self.key(bt, digest, interval)) if digest else None
+        if cached is None:
+            df = load()
+            digest = self.bars_digest(df)
+            if fingerprint:
+                self.remember_source(fingerprint, digest)
+            key = self.key(bt, digest, interval)
+            cached = self.get(key)
+            if cached is None:
+                self.misses += 1
+                df_eq, trades = bt.run(df)
+                metrics = bt.metrics(df_eq, interval)
+                self.put(key, df_eq, trades, metrics, bt.open_trade)
+                return df_eq, trades, metrics, False
+        self.hits += 1
+        df_eq, bt.trades, metrics, bt.open_trade = cached
+        return df_eq, bt.trades, metrics, True
+
+
+# ---------- Parameter sweep ----------
+
+SWEEP_PARAMS = ("fast", "slow", "stop_loss_pct", "take_profit_pct", "fee_bps")
+
+# per-worker state, set once by _sweep_init
+_sweep_shm: Optional[shared_memory.SharedMemory] = None
+_sweep_close: Optional[np.ndarray] = None
+_sweep_bank: Optional[SMABank] = None
+_sweep_opts: dict = {}
+
+
+def parse_range(spec: str, cast=float) -> list:
+    """
+    Parse a sweep range.
+    'a:b:step' -> a, a+step, ..., b (inclusive); 'a,b,c' -> explicit values; 'a' -> single value.
+    """
+    if ":" in spec:
+        parts = spec.split(":")
+        if len(parts) != 3:
+            raise ValueError(f"Range must look like start:stop:step, got {spec!r}")
+        start, stop, step = (float(x) for x in parts)
+        if step <= 0:
+            raise ValueError(f"Range step must be positive, got {spec!r}")
+        count = int(round((stop - start) / step)) + 1
+        values = [round(start + i * step, 10) for i in range(max(0, count))]
+    else:
+        values = [float(x) for x in spec.split(",") if x.strip()]
+    return [cast(v) for v in values]
+
+
+def _sweep_init(shm_name: str, n: int, interval: str, opts: dict, sma_cache_bytes: int):
+    global _sweep_shm, _sweep_close, _sweep_bank, _sweep_opts
+    _sweep_shm = shared_memory.SharedMemory(name=shm_name)
+    _sweep_close = np.ndarray((n,), dtype=np.float64, buffer=_sweep_shm.buf)
+    # each window is computed once per worker and reused by every combination that needs it
+    _sweep_bank = SMABank(_sweep_close, max_bytes=sma_cache_bytes)
+    _sweep_opts = dict(opts, interval=interval)
+
+
+def _sweep_eval(params: Tuple, lo: int = 0, hi: Optional[int] = None,
+                initial_equity: Optional[float] = None) -> Tuple[np.ndarray, list]:
+    """
+    Backtest one parameter tuple over bars [lo, hi) of the shared close array. The equity
+    returned is marked to market (see CrossoverBacktester.marked_equity), so a position
+    still open at `hi` is valued at its last close rather than net of its full cost.
+    """
+    fast, slow, stop_loss_pct, take_profit_pct, fee_bps = params
+    opts = _sweep_opts
+    bt = CrossoverBacktester(
+        fast=fast, slow=slow,
+        initial_equity=opts["initial_equity"] if initial_equity is None else initial_equity,
+        risk_fraction=opts["risk_fraction"], stop_loss_pct=stop_loss_pct,
+        take_profit_pct=take_profit_pct, allow_short=opts["allow_short"],
+        fee_bps=fee_bps, engine="numpy"
+    )
+    # SMAs come from the full-history bank, so any window is already warmed up at `lo`
+    sma_fast, sma_slow = _sweep_bank.sma(fast), _sweep_bank.sma(slow)
+    valid = ~(np.isnan(sma_fast) | np.isnan(sma_slow))
+    signal = crossover_signal(sma_fast, sma_slow)
+    hi = len(_sweep_close) if hi is None else hi
+    eq, closed, st = bt._simulate(_sweep_close[lo:hi], signal[lo:hi], valid[lo:hi], offset=lo)
+    if closed:
+        entry_bar, exit_bar, side, entry_price, _, qty = (np.asarray(col) for col in list(zip(*closed))[:6])
+        side = np.where(side == "long", 1, -1)
+    else:
+        entry_bar = exit_bar = side = np.empty(0, dtype=np.int64)
+        entry_price = qty = np.empty(0)
+    open_trade = (st.position, st.entry_bar, st.entry_price, st.qty) if st.position != 0 else None
+    eq = bt._mark_to_market(eq, side, entry_price * qty, entry_bar.astype(np.int64), exit_bar.astype(np.int64),
+                            open_trade, offset=lo)
+    return eq, closed
+
+
+def _sweep_one(params: Tuple) -> dict:
+    with np.errstate(invalid="ignore", divide="ignore"):
+        eq, closed = _sweep_eval(params)
+        pnl = np.array([c[6] for c in closed], dtype=float)
+        metrics = CrossoverBacktester._array_metrics(eq, pnl, _sweep_opts["interval"])
+    return dict(zip(SWEEP_PARAMS, params), **metrics)
+
+
+@contextmanager
+def _shared_close_pool(close: np.ndarray, interval: str, opts: dict, workers: Optional[int],
+                       sma_cache_bytes: int):
+    """Process pool whose workers see `close` through one shared-memory block (see _sweep_init)."""
+    workers = workers or os.cpu_count() or 1
+    shm = shared_memory.SharedMemory(create=True, size=max(1, close.nbytes))
+    try:
+        np.ndarray(close.shape, dtype=np.float64, buffer=shm.buf)[:] = close
+        with Pool(workers, initializer=_sweep_init,
+                  initargs=(shm.name, len(close), interval, opts, sma_cache_bytes)) as pool:
+            yield pool
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def _param_grid(fasts, slows, stop_losses, take_profits, fee_bps_list) -> List[Tuple]:
+    grid = [c for c in itertools.product(fasts, slows, stop_losses, take_profits, fee_bps_list) if c[0] < c[1]]
+    if not grid:
+        raise ValueError("Empty sweep grid (every combination has fast >= slow).")
+    return grid
+
+
+def run_sweep(
+    df: pd.DataFrame,
+    interval: str,
+    fasts: List[int],
+    slows: List[int],
+    stop_losses: List[float],
+    take_profits: List[float],
+    fee_bps_list: List[float],
+    initial_equity: float = 10_000.0,
+    risk_fraction: float = 0.99,
+    allow_short: bool = False,
+    workers: Optional[int] = None,
+    rank_by: str = "sharpe",
+    sma_cache_bytes: int = 512 * 2**20,
+) -> pd.DataFrame:
+    """
+    Backtest every parameter combination on a process pool and return a table of
+    metrics() results ranked by `rank_by` (best first). The close array is placed in
+    shared memory once; workers attach to it by name instead of receiving a pickled frame.
+    """
+    grid = _param_grid(fasts, slows, stop_losses, take_profits, fee_bps_list)
+    close = df["close"].to_numpy(dtype=np.float64)
+    opts = {"initial_equity": initial_equity, "risk_fraction": risk_fraction, "allow_short": allow_short}
+    workers = workers or os.cpu_count() or 1
+    with _shared_close_pool(close, interval, opts, workers, sma_cache_bytes) as pool:
+        chunksize = max(1, len(grid) // (workers * 8))
+        rows = list(pool.imap_unordered(_sweep_one, grid, chunksize=chunksize))
+
+    results = pd.DataFrame(rows)
+    if rank_by not in results.columns:
+        raise ValueError(f"Cannot rank by {rank_by!r}. Columns: {list(results.columns)}")
+    return results.sort_values(rank_by, ascending=False, kind="stable").reset_index(drop=True)
+
+
+# ---------- Walk-forward optimization ----------
+
+def _walkforward_fold(task: Tuple) -> dict:
+    fold, is_lo, is_hi, oos_hi, grid, rank_by = task
+    interval = _sweep_opts["interval"]
+    best, best_score = grid[0], -np.inf
+    with np.errstate(invalid="ignore", divide="ignore"):
+        for params in grid:
+            eq, closed = _sweep_eval(params, is_lo, is_hi)
+            m = CrossoverBacktester._array_metrics(eq, np.array([c[6] for c in closed], dtype=float), interval)
+            score = m.get(rank_by, np.nan)
+            if score > best_score:  # NaN never wins
+                best, best_score = params, score
+        # out-of-sample run starts flat with unit equity; the caller chains the folds
+        eq, closed = _sweep_eval(best, is_hi, oos_hi, initial_equity=1.0)
+        pnl = np.array([c[6] for c in closed], dtype=float)
+        oos = CrossoverBacktester._array_metrics(eq, pnl, interval)
+    return dict(
+        {"fold": fold, "is_start": is_lo, "oos_start": is_hi, "oos_end": oos_hi},
+        **dict(zip(SWEEP_PARAMS, best)),
+        **{f"is_{rank_by}": best_score},
+        **{f"oos_{k}": v for k, v in oos.items()},
+        oos_equity=eq, oos_pnl=pnl,
+    )
+
+
+def run_walkforward(
+    df: pd.DataFrame,
+    interval: str,
+    is_bars: int,
+    oos_bars: int,
+    fasts: List[int],
+    slows: List[int],
+    stop_losses: List[float],
+    take_profits: List[float],
+    fee_bps_list: List[float],
+    initial_equity: float = 10_000.0,
+    risk_fraction: float = 0.99,
+    allow_short: bool = False,
+    anchored: bool = False,
+    workers: Optional[int] = None,
+    rank_by: str = "sharpe",
+    sma_cache_bytes: int = 512 * 2**20,
+) -> Tuple[pd.DataFrame, pd.DataFrame, dict]:
+    """
+    Rolling (or anchored) walk-forward optimization.
+
+    Each fold picks the grid point with the best in-sample `rank_by`, then trades it on
+    the following `oos_bars` bars. Folds run concurrently on the shared-close pool, and
+    every worker's SMABank covers the whole history, so SMAs are computed once per window
+    and reused by every overlapping fold that worker handles. Out-of-sample segments are
+    chained into one equity curve. Ranking and chaining use marked-to-market equity, so a
+    position still open at a fold end is valued at that bar's close, and the next fold
+    starts flat from that value.
+    Returns (fold table, stitched OOS equity frame, aggregate OOS metrics).
+    """
+    grid = _param_grid(fasts, slows, stop_losses, take_profits, fee_bps_list)
+    n = len(df)
+    tasks = []
+    is_lo = 0
+    while is_lo + is_bars < n:
+        lo = 0 if anchored else is_lo
+        tasks.append((len(tasks), lo, is_lo + is_bars, min(is_lo + is_bars + oos_bars, n), grid, rank_by))
+        is_lo += oos_bars
+    if not tasks:
+        raise ValueError(f"Need more than is_bars={is_bars} bars for a walk-forward fold, got {n}.")
+
+    close = df["close"].to_numpy(dtype=np.float64)
+    opts = {"initial_equity": initial_equity, "risk_fraction": risk_fraction, "allow_short": allow_short}
+    with _shared_close_pool(close, interval, opts, workers, sma_cache_bytes) as pool:
+        folds = sorted(pool.imap_unordered(_walkforward_fold, tasks), key=lambda f: f["fold"])
+
+    # chain the unit-equity OOS segments
+    scale = initial_equity
+    segments = []
+    for f in folds:
+        seg = f.pop("oos_equity") * scale
+        scale = float(seg[-1])
+        segments.append(seg)
+    equity = np.concatenate(segments)
+    pnl = np.concatenate([f.pop("oos_pnl") for f in folds])
+    index = df.index[folds[0]["oos_start"]:folds[-1]["oos_end"]]
+    stitched = pd.DataFrame({"equity": equity}, index=index)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        overall = CrossoverBacktester._array_metrics(equity, pnl, interval)
+    table = pd.DataFrame(folds)
+    table["is_start"] = df.index[table["is_start"].to_numpy()]
+    table["oos_start"] = df.index[table["oos_start"].to_numpy()]
+    table["oos_end"] = df.index[table["oos_end"].to_numpy() - 1]  # last out-of-sample bar
+    return table, stitched, overall
+
+
+# ---------- Monte Carlo ----------
+
+MC_METHODS = ("trades", "block")
+
+
+def _path_metrics(log_steps: np.ndarray, s1: np.ndarray, s2: np.ndarray, years: float,
+                  periods_per_year: float) -> Dict[str, np.ndarray]:
+    """
+    Per-path metrics from a paths x steps matrix of log returns plus each path's sum of
+    simple returns (s1) and of their squares (s2), which give the Sharpe ratio without
+    another pass over the matrix. `log_steps` is overwritten.
+    """
+    n = log_steps.shape[1]
+    cum = np.cumsum(log_steps, axis=1, out=log_steps)
+    log_total = cum[:, -1].copy()
+    # the path starts at 0 (equity 1.0), which counts as the first peak
+    peak = np.maximum.accumulate(cum, axis=1)
+    np.maximum(peak, 0.0, out=peak)
+    np.subtract(cum, peak, out=cum)
+    mdd = np.expm1(cum.min(axis=1))
+    var = np.maximum(s2 - s1 * s1 / n, 0.0) / max(1, n - 1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sharpe = np.where(var > 0, (s1 / n) / np.sqrt(var) * np.sqrt(periods_per_year), 0.0)
+    return {"total_return": np.expm1(log_total), "cagr": np.expm1(log_total / years),
+            "max_drawdown": mdd, "sharpe": sharpe}
+
+
+def monte_carlo(
+    returns: np.ndarray,
+    years: float,
+    periods_per_year: float,
+    paths: int = 100_000,
+    method: str = "trades",
+    block: int = 20,
+    seed: Optional[int] = None,
+    max_batch_bytes: int = 32 * 2**20,
+) -> pd.DataFrame:
+    """
+    Resample `returns` into `paths` equity paths of the same length and return one row
+    of metrics (total_return, cagr, max_drawdown, sharpe) per path.
+
+    method='trades' draws trade returns independently with replacement (the order of
+    trades is what's being tested); method='block' stitches together random blocks of
+    `block` consecutive bar returns, keeping short-range autocorrelation. Paths are
+    generated as 2-D arrays in batches of at most `max_batch_bytes` per matrix, so there
+    is no per-path Python loop and memory stays bounded.
+    """
+    if method not in MC_METHODS:
+        raise ValueError(f"Unknown method {method!r}. Choose from: {MC_METHODS}")
+    r = np.asarray(returns, dtype=float)
+    r = r[np.isfinite(r)]
+    n = len(r)
+    if n < 2:
+        raise ValueError("Need at least two returns to resample.")
+    log_r = np.log1p(np.maximum(r, -1 + 1e-12))  # a total loss becomes a ~1e-12 equity floor
+    block = max(1, min(block, n))
+    n_blocks = -(-n // block)
+    tail = n - (n_blocks - 1) * block  # length used from each path's last block
+    # block method: rows of the sliding-window view are whole blocks, and block sums of
+    # r and r**2 come from prefix sums instead of the full matrix
+    windows = np.lib.stride_tricks.sliding_window_view(log_r, block)
+    c1 = np.concatenate(([0.0], np.cumsum(r)))
+    c2 = np.concatenate(([0.0], np.cumsum(r * r)))
+
+    rng = np.random.default_rng(seed)
+    batch = max(1, min(paths, max_batch_bytes // (8 * n_blocks * block)))
+    out = {k: np.empty(paths) for k in ("total_return", "cagr", "max_drawdown", "sharpe")}
+    for lo in range(0, paths, batch):
+        b = min(batch, paths - lo)
+        if method == "trades":
+            idx = rng.integers(0, n, size=(b, n))
+            steps = log_r[idx]
+            s1, s2 = r[idx].sum(axis=1), (r * r)[idx].sum(axis=1)
+        else:
+            starts = rng.integers(0, n - block + 1, size=(b, n_blocks))
+            steps = windows[starts].reshape(b, -1)[:, :n]
+            ends = starts + block
+            ends[:, -1] = starts[:, -1] + tail
+            s1 = (c1[ends] - c1[starts]).sum(axis=1)
+            s2 = (c2[ends] - c2[starts]).sum(axis=1)
+        for k, v in _path_metrics(steps, s1, s2, years, periods_per_year).items():
+            out[k][lo:lo + b] = v
+    return pd.DataFrame(out)
+
+
+def observed_path_metrics(returns: np.ndarray, years: float, periods_per_year: float) -> dict:
+    """
+    The metrics monte_carlo() reports per path, for `returns` in their original order:
+    the backtest's own path on the same basis as the resampled ones.
+    """
+    r = np.asarray(returns, dtype=float)
+    r = r[np.isfinite(r)]
+    log_r = np.log1p(np.maximum(r, -1 + 1e-12))[None, :]
+    m = _path_metrics(log_r, np.array([r.sum()]), np.array([(r * r).sum()]), years, periods_per_year)
+    return {k: float(v[0]) for k, v in m.items()}
+
+
+def summarize_monte_carlo(sims: pd.DataFrame, actual: Optional[dict] = None,
+                          percentiles=(5, 25, 50, 75, 95), label: str = "backtest") -> pd.DataFrame:
+    """Percentiles (and the backtest's own value, if given, in column `label`) of each simulated metric."""
+    table = sims.quantile([p / 100 for p in percentiles]).T
+    table.columns = [f"p{p}" for p in percentiles]
+    table["mean"] = sims.mean()
+    table["P(<0)"] = (sims < 0).mean()
+    if actual:
+        table.insert(0, label, [actual.get(k, np.nan) for k in table.index])
+    return table
+
+
+# ---------- Profiling ----------
+
+# upper edges (microseconds) of the per-bar decision latency histogram; the last bucket is open
+LATENCY_BUCKETS_US = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1_000, 2_000, 5_000, 10_000, 100_000)
+
+
+class StageProfiler:
+    """
+    Per-stage wall time, CPU time, peak traced memory and bars/s for one run.
+
+    Wrap each stage in `with profiler.stage(name) as rec:` and set rec["bars"] once the
+    bar count is known; stages run more than once (paper polls) accumulate. Stages must
+    not nest. With `memory` the whole run is traced by tracemalloc, and with `cprofile`
+    every stage gets its own cProfile.Profile so the hottest one can be dumped; both
+    slow the code down, so compare timings only between runs with the same options.
+    """
+
+    def __init__(self, memory: bool = True, cprofile: bool = False):
+        self.memory = memory
+        self.cprofile = cprofile
+        self.stages: Dict[str, dict] = {}
+        self.polls: List[dict] = []
+        self._profiles: Dict[str, "cProfile.Profile"] = {}
+        self._t0 = time.perf_counter()
+        if memory:
+            import tracemalloc
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+
+    @contextmanager
+    def stage(self, name: str, bars: int = 0):
+        import tracemalloc
+
+        rec = self.stages.setdefault(name, {"calls": 0, "bars": 0, "wall_s": 0.0, "cpu_s": 0.0, "peak_mb": None})
+        step = {"bars": bars}
+        prof = None
+        if self.cprofile:
+            import cProfile
+            prof = self._profiles.setdefault(name, cProfile.Profile())
+        tracing = self.memory and tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.reset_peak()
+        w0, c0 = time.perf_counter(), time.process_time()
+        if prof is not None:
+            prof.enable()
+        try:
+            yield step
+        finally:
+            if prof is not None:
+                prof.disable()
+            rec["wall_s"] += time.perf_counter() - w0
+            rec["cpu_s"] += time.process_time() - c0
+            rec["calls"] += 1
+            rec["bars"] += step["bars"]
+            if tracing:
+                peak = tracemalloc.get_traced_memory()[1] / 2**20
+                rec["peak_mb"] = peak if rec["peak_mb"] is None else max(rec["peak_mb"], peak)
+
+    def record_poll(self, ts, fetch_seconds: float, latencies: List[float]):
+        """One paper poll cycle: feed fetch time and a histogram of its per-bar update latencies."""
+        us = np.asarray(latencies) * 1e6
+        counts = np.bincount(np.searchsorted(LATENCY_BUCKETS_US, us), minlength=len(LATENCY_BUCKETS_US) + 1)
+        self.polls.append({
+            "last_bar": str(ts) if ts is not None else None,
+            "fetch_ms": fetch_seconds * 1e3,
+            "bars": len(latencies),
+            "latency_hist": counts.tolist(),
+            **_latency_summary(latencies),
+        })
+
+    def hottest(self) -> Optional[str]:
+        return max(self.stages, key=lambda k: self.stages[k]["wall_s"]) if self.stages else None
+
+    def report(self) -> dict:
+        stages = {}
+        for name, rec in self.stages.items():
+            stages[name] = dict(rec, bars_per_sec=rec["bars"] / rec["wall_s"] if rec["bars"] and rec["wall_s"] else None)
+        report = {
+            "total_s": time.perf_counter() - self._t0,
+            "hottest": self.hottest(),
+            "memory_traced": self.memory,
+            "cprofile": self.cprofile,
+            "stages": stages,
+        }
+        try:
+            import resource
+            report["maxrss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        except ImportError:  # not on Windows
+            pass
+        if self.polls:
+            total = np.sum([p["latency_hist"] for p in self.polls], axis=0)
+            report["latency_buckets_us"] = list(LATENCY_BUCKETS_US)
+            report["latency_hist"] = total.tolist()
+            report["polls"] = self.polls
+        return report
+
+    def write(self, path: str) -> dict:
+        report = self.report()
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=1, default=str)
+        return report
+
+    def dump_hottest(self, path: str, top: int = 15) -> Optional[str]:
+        """Write the hottest stage's cProfile stats to `path` and print its top functions."""
+        import pstats
+
+        name = self.hottest()
+        if name is None or name not in self._profiles:
+            return None
+        self._profiles[name].dump_stats(path)
+        pstats.Stats(path).sort_stats("cumulative").print_stats(top)
+        return name
+
+    def print_summary(self):
+        print("\n=== Profile ===")
+        print(f"{'stage':12s} {'calls':>7s} {'wall':>10s} {'cpu':>10s} {'peak':>10s} {'bars/s':>14s}")
+        for name, rec in self.report()["stages"].items():
+            peak = f"{rec['peak_mb']:.1f} MB" if rec["peak_mb"] is not None else "-"
+            rate = f"{rec['bars_per_sec']:,.0f}" if rec["bars_per_sec"] else "-"
+            print(f"{name:12s} {rec['calls']:7d} {rec['wall_s'] * 1e3:8.1f}ms {rec['cpu_s'] * 1e3:8.1f}ms "
+                  f"{peak:>10s} {rate:>14s}")
+
+
+# ---------- CLI ----------
 
 def main():
     parser = argparse.ArgumentParser(description="SMA Crossover Trend-Following Bot")
@@ -340,10 +2905,14 @@ def main():
     src = p_back.add_mutually_exclusive_group(required=True)
     src.add_argument("--ticker", type=str, help="yfinance ticker, e.g., BTC-USD, AAPL")
     src.add_argument("--csv", type=str, help="Path to CSV with columns timestamp,open,high,low,close,volume")
+    src.add_argument("--bars", type=str, help="Bars directory written by the 'ingest' command")
 
     p_back.add_argument("--interval", type=str, default="1d", help="yfinance interval (1m,5m,15m,1h,1d,1wk,1mo)")
     p_back.add_argument("--start", type=str, default=None, help="start date YYYY-MM-DD")
     p_back.add_argument("--end", type=str, default=None, help="end date YYYY-MM-DD")
+    p_back.add_argument("--cache-dir", type=str, default="ohlcv_cache", help="local OHLCV store for --ticker data")
+    p_back.add_argument("--no-cache", action="store_true", help="always download, bypassing the local store")
+    p_back.add_argument("--offline", action="store_true", help="serve --ticker data from the local store only")
     p_back.add_argument("--fast", type=int, default=50)
     p_back.add_argument("--slow", type=int, default=200)
     p_back.add_argument("--equity", type=float, default=10_000.0)
@@ -352,8 +2921,27 @@ def main():
     p_back.add_argument("--take-profit", type=float, default=0.10)
     p_back.add_argument("--allow-short", action="store_true")
     p_back.add_argument("--fee-bps", type=float, default=5.0)
+    p_back.add_argument("--engine", type=str, choices=ENGINES, default="pandas",
+                        help="execution engine: 'pandas' row loop or vectorized 'numpy'")
+    p_back.add_argument("--ma", type=str, choices=list(MOVING_AVERAGES), default="sma",
+                        help="moving average used for the fast/slow lines")
+    p_back.add_argument("--volume-filter", type=str, default=None, metavar="WINDOW:MULT",
+                        help="only act on crosses where volume > MULT x its WINDOW-bar SMA, e.g. 20:1.5")
+    p_back.add_argument("--chunk-bars", type=int, default=None,
+                        help="out-of-core mode: process history in blocks of this many bars (metrics only)")
     p_back.add_argument("--plot", action="store_true")
     p_back.add_argument("--save-plot", type=str, default=None)
+    p_back.add_argument("--result-cache", type=str, default="backtest_cache",
+                        help="directory memoizing backtest results by bars content + parameters")
+    p_back.add_argument("--result-cache-mb", type=float, default=512.0, help="size bound of the result cache")
+    p_back.add_argument("--no-result-cache", action="store_true", help="always recompute")
+    p_back.add_argument("--trades-out", type=str, default=None,
+                        help="write the full trade log to this .csv or .parquet file")
+    p_back.add_argument("--profile", type=str, nargs="?", const="profile.json", default=None, metavar="JSON",
+                        help="time every stage (wall, CPU, peak memory, bars/s) and write a report (default profile.json)")
+    p_back.add_argument("--profile-dump", type=str, default=None, metavar="PROF",
+                        help="also cProfile each stage and write the hottest one's stats here (implies --profile)")
+    p_back.add_argument("--profile-no-memory", action="store_true", help="skip tracemalloc while profiling (lower overhead)")
 
     # Paper-trading (simulated)
     p_paper = sub.add_parser("paper", help="Simulated live trading")
@@ -366,27 +2954,269 @@ def main():
     p_paper.add_argument("--stop-loss", type=float, default=0.05)
     p_paper.add_argument("--take-profit", type=float, default=0.10)
     p_paper.add_argument("--allow-short", action="store_true")
+    p_paper.add_argument("--fee-bps", type=float, default=5.0)
     p_paper.add_argument("--poll-seconds", type=int, default=60)
+    replay = p_paper.add_mutually_exclusive_group()
+    replay.add_argument("--replay-csv", type=str, default=None, help="replay bars from this CSV instead of polling yfinance")
+    replay.add_argument("--replay-bars", type=str, default=None, help="replay a bars directory written by 'ingest'")
+    replay.add_argument("--replay-cache", action="store_true", help="replay --ticker's history from the local OHLCV store")
+    p_paper.add_argument("--cache-dir", type=str, default="ohlcv_cache", help="local OHLCV store for --replay-cache")
+    p_paper.add_argument("--speed", type=float, default=1.0,
+                         help="replay speed-up over real time ('inf' = as fast as possible)")
+    p_paper.add_argument("--quiet", action="store_true", help="print only the seed line and the final report")
+    p_paper.add_argument("--profile", type=str, nargs="?", const="profile.json", default=None, metavar="JSON",
+                         help="time every stage (wall, CPU, peak memory, bars/s) and write a report (default profile.json)")
+    p_paper.add_argument("--profile-dump", type=str, default=None, metavar="PROF",
+                         help="also cProfile each stage and write the hottest one's stats here (implies --profile)")
+    p_paper.add_argument("--profile-no-memory", action="store_true", help="skip tracemalloc while profiling (lower overhead)")
+
+    # Multi-symbol paper trading in one process
+    p_sup = sub.add_parser("supervise", help="Paper-trade many symbols/intervals in one asyncio process")
+    p_sup.add_argument("--symbols", type=str, required=True,
+                       help="comma-separated TICKER[:INTERVAL[:FAST:SLOW]] specs, e.g. BTC-USD:5m,ETH-USD:1m:20:100")
+    p_sup.add_argument("--interval", type=str, default="5m", help="interval for specs that don't give one")
+    p_sup.add_argument("--fast", type=int, default=50)
+    p_sup.add_argument("--slow", type=int, default=200)
+    p_sup.add_argument("--equity", type=float, default=10_000.0)
+    p_sup.add_argument("--risk-fraction", type=float, default=0.99)
+    p_sup.add_argument("--stop-loss", type=float, default=0.05)
+    p_sup.add_argument("--take-profit", type=float, default=0.10)
+    p_sup.add_argument("--allow-short", action="store_true")
+    p_sup.add_argument("--fee-bps", type=float, default=5.0)
+    p_sup.add_argument("--grace-seconds", type=float, default=5.0, help="wait this long after each bar close")
+    p_sup.add_argument("--max-fetches", type=int, default=4, help="concurrent data requests")
+    p_sup.add_argument("--status-json", type=str, default=None, help="keep per-strategy equity/position in this file")
+    p_sup.add_argument("--replay-cache", action="store_true", help="replay the local OHLCV store instead of yfinance")
+    p_sup.add_argument("--cache-dir", type=str, default="ohlcv_cache")
+    p_sup.add_argument("--speed", type=float, default=1.0, help="replay speed-up ('inf' = as fast as possible)")
+    p_sup.add_argument("--quiet", action="store_true")
+
+    # Parameter sweep
+    p_sweep = sub.add_parser("sweep", help="Backtest a grid of parameters in parallel")
+    src = p_sweep.add_mutually_exclusive_group(required=True)
+    src.add_argument("--ticker", type=str, help="yfinance ticker, e.g., BTC-USD, AAPL")
+    src.add_argument("--csv", type=str, help="Path to CSV with columns timestamp,open,high,low,close,volume")
+    src.add_argument("--bars", type=str, help="Bars directory written by the 'ingest' command")
+    p_sweep.add_argument("--interval", type=str, default="1d", help="yfinance interval (1m,5m,15m,1h,1d,1wk,1mo)")
+    p_sweep.add_argument("--start", type=str, default=None, help="start date YYYY-MM-DD")
+    p_sweep.add_argument("--end", type=str, default=None, help="end date YYYY-MM-DD")
+    p_sweep.add_argument("--cache-dir", type=str, default="ohlcv_cache", help="local OHLCV store for --ticker data")
+    p_sweep.add_argument("--no-cache", action="store_true", help="always download, bypassing the local store")
+    p_sweep.add_argument("--offline", action="store_true", help="serve --ticker data from the local store only")
+    p_sweep.add_argument("--fast", type=str, default="10:100:10", help="range start:stop:step or list a,b,c")
+    p_sweep.add_argument("--slow", type=str, default="50:300:25", help="range start:stop:step or list a,b,c")
+    p_sweep.add_argument("--stop-loss", type=str, default="0.05")
+    p_sweep.add_argument("--take-profit", type=str, default="0.10")
+    p_sweep.add_argument("--fee-bps", type=str, default="5")
+    p_sweep.add_argument("--equity", type=float, default=10_000.0)
+    p_sweep.add_argument("--risk-fraction", type=float, default=0.99)
+    p_sweep.add_argument("--allow-short", action="store_true")
+    p_sweep.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    p_sweep.add_argument("--sma-cache-mb", type=int, default=512, help="per-worker SMA cache size before LRU eviction")
+    p_sweep.add_argument("--rank-by", type=str, default="sharpe",
+                         help="metric to rank by: total_return, cagr, sharpe, max_drawdown, win_rate")
+    p_sweep.add_argument("--out", type=str, default="sweep_results.csv", help="where to write the ranked table")
+    p_sweep.add_argument("--top", type=int, default=10, help="rows to print")
+
+    # Walk-forward optimization
+    p_wf = sub.add_parser("walkforward", help="Rolling in-sample optimization / out-of-sample evaluation")
+    src = p_wf.add_mutually_exclusive_group(required=True)
+    src.add_argument("--ticker", type=str, help="yfinance ticker, e.g., BTC-USD, AAPL")
+    src.add_argument("--csv", type=str, help="Path to CSV with columns timestamp,open,high,low,close,volume")
+    src.add_argument("--bars", type=str, help="Bars directory written by the 'ingest' command")
+    p_wf.add_argument("--interval", type=str, default="1d", help="yfinance interval (1m,5m,15m,1h,1d,1wk,1mo)")
+    p_wf.add_argument("--start", type=str, default=None, help="start date YYYY-MM-DD")
+    p_wf.add_argument("--end", type=str, default=None, help="end date YYYY-MM-DD")
+    p_wf.add_argument("--cache-dir", type=str, default="ohlcv_cache", help="local OHLCV store for --ticker data")
+    p_wf.add_argument("--no-cache", action="store_true", help="always download, bypassing the local store")
+    p_wf.add_argument("--offline", action="store_true", help="serve --ticker data from the local store only")
+    p_wf.add_argument("--is-bars", type=int, default=750, help="in-sample window length")
+    p_wf.add_argument("--oos-bars", type=int, default=250, help="out-of-sample window length (and fold step)")
+    p_wf.add_argument("--anchored", action="store_true", help="in-sample windows all start at the first bar")
+    p_wf.add_argument("--fast", type=str, default="10:100:10", help="range start:stop:step or list a,b,c")
+    p_wf.add_argument("--slow", type=str, default="50:300:25", help="range start:stop:step or list a,b,c")
+    p_wf.add_argument("--stop-loss", type=str, default="0.05")
+    p_wf.add_argument("--take-profit", type=str, default="0.10")
+    p_wf.add_argument("--fee-bps", type=str, default="5")
+    p_wf.add_argument("--equity", type=float, default=10_000.0)
+    p_wf.add_argument("--risk-fraction", type=float, default=0.99)
+    p_wf.add_argument("--allow-short", action="store_true")
+    p_wf.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    p_wf.add_argument("--sma-cache-mb", type=int, default=512, help="per-worker SMA cache size before LRU eviction")
+    p_wf.add_argument("--rank-by", type=str, default="sharpe",
+                      help="in-sample metric to optimize: total_return, cagr, sharpe, max_drawdown, win_rate")
+    p_wf.add_argument("--out", type=str, default=None, help="write the stitched out-of-sample equity to this CSV")
+
+    # Monte Carlo robustness
+    p_mc = sub.add_parser("montecarlo", help="Backtest once, then resample trades or bar returns into many paths")
+    src = p_mc.add_mutually_exclusive_group(required=True)
+    src.add_argument("--ticker", type=str, help="yfinance ticker, e.g., BTC-USD, AAPL")
+    src.add_argument("--csv", type=str, help="Path to CSV with columns timestamp,open,high,low,close,volume")
+    src.add_argument("--bars", type=str, help="Bars directory written by the 'ingest' command")
+    p_mc.add_argument("--interval", type=str, default="1d", help="yfinance interval (1m,5m,15m,1h,1d,1wk,1mo)")
+    p_mc.add_argument("--start", type=str, default=None, help="start date YYYY-MM-DD")
+    p_mc.add_argument("--end", type=str, default=None, help="end date YYYY-MM-DD")
+    p_mc.add_argument("--cache-dir", type=str, default="ohlcv_cache", help="local OHLCV store for --ticker data")
+    p_mc.add_argument("--no-cache", action="store_true", help="always download, bypassing the local store")
+    p_mc.add_argument("--offline", action="store_true", help="serve --ticker data from the local store only")
+    p_mc.add_argument("--fast", type=int, default=50)
+    p_mc.add_argument("--slow", type=int, default=200)
+    p_mc.add_argument("--equity", type=float, default=10_000.0)
+    p_mc.add_argument("--risk-fraction", type=float, default=0.99)
+    p_mc.add_argument("--stop-loss", type=float, default=0.05)
+    p_mc.add_argument("--take-profit", type=float, default=0.10)
+    p_mc.add_argument("--allow-short", action="store_true")
+    p_mc.add_argument("--fee-bps", type=float, default=5.0)
+    p_mc.add_argument("--method", type=str, choices=MC_METHODS, default="trades",
+                      help="'trades': resample trade returns; 'block': block-bootstrap bar returns of the equity curve")
+    p_mc.add_argument("--paths", type=int, default=100_000)
+    p_mc.add_argument("--block-bars", type=int, default=20, help="block length for --method block")
+    p_mc.add_argument("--seed", type=int, default=None)
+    p_mc.add_argument("--out", type=str, default=None, help="write per-path metrics to this CSV")
+
+    # Multi-asset portfolio
+    p_port = sub.add_parser("portfolio", help="Backtest the crossover across many symbols in one pass")
+    src = p_port.add_mutually_exclusive_group(required=True)
+    src.add_argument("--tickers", type=str, help="comma-separated yfinance tickers")
+    src.add_argument("--csv", type=str, help="wide CSV: timestamp column plus one close column per symbol")
+    p_port.add_argument("--interval", type=str, default="1d")
+    p_port.add_argument("--start", type=str, default=None)
+    p_port.add_argument("--end", type=str, default=None)
+    p_port.add_argument("--cache-dir", type=str, default="ohlcv_cache")
+    p_port.add_argument("--offline", action="store_true")
+    p_port.add_argument("--fast", type=int, default=50)
+    p_port.add_argument("--slow", type=int, default=200)
+    p_port.add_argument("--equity", type=float, default=10_000.0)
+    p_port.add_argument("--risk-fraction", type=float, default=0.99)
+    p_port.add_argument("--stop-loss", type=float, default=0.05)
+    p_port.add_argument("--take-profit", type=float, default=0.10)
+    p_port.add_argument("--allow-short", action="store_true")
+    p_port.add_argument("--fee-bps", type=float, default=5.0)
+    p_port.add_argument("--out", type=str, default=None, help="write the per-symbol table to this CSV")
+
+    # CSV ingestion
+    p_ingest = sub.add_parser("ingest", help="Convert a large OHLCV CSV into a memory-mappable bars directory")
+    p_ingest.add_argument("--csv", type=str, required=True)
+    p_ingest.add_argument("--out", type=str, required=True, help="bars directory to (over)write")
+    p_ingest.add_argument("--ts-col", type=str, default="timestamp")
+    p_ingest.add_argument("--ts-format", type=str, default="ISO8601", help="strftime format of the timestamp column")
+    p_ingest.add_argument("--ts-unit", type=str, default=None, choices=["s", "ms", "us", "ns"],
+                          help="timestamps are integer epochs in this unit (overrides --ts-format)")
+    p_ingest.add_argument("--chunksize", type=int, default=1_000_000, help="rows parsed per chunk")
+
+    # Local data store
+    # Bulk fetch into the local store
+    p_fetch = sub.add_parser("fetch", help="Download many tickers concurrently into the local OHLCV store")
+    p_fetch.add_argument("--tickers", type=str, required=True, help="comma-separated yfinance tickers")
+    p_fetch.add_argument("--interval", type=str, default="1d", help="one interval or a comma-separated list")
+    p_fetch.add_argument("--start", type=str, default=None)
+    p_fetch.add_argument("--end", type=str, default=None)
+    p_fetch.add_argument("--cache-dir", type=str, default="ohlcv_cache")
+    p_fetch.add_argument("--workers", type=int, default=8)
+    p_fetch.add_argument("--rate", type=float, default=2.0, help="max requests per second across all workers")
+    p_fetch.add_argument("--retries", type=int, default=3)
+    p_fetch.add_argument("--backoff", type=float, default=1.0, help="first retry delay in seconds (doubles, jittered)")
+
+    p_cache = sub.add_parser("cache", help="Inspect or evict the local OHLCV store")
+    p_cache.add_argument("action", choices=["list", "evict"])
+    p_cache.add_argument("--cache-dir", type=str, default="ohlcv_cache")
+    p_cache.add_argument("--ticker", type=str, default=None, help="evict only this ticker")
+    p_cache.add_argument("--interval", type=str, default=None, help="evict only this interval")
+    p_cache.add_argument("--older-than-days", type=float, default=None, help="evict series unused for this long")
+    p_cache.add_argument("--max-mb", type=float, default=None, help="evict least recently used series down to this size")
 
     args = parser.parse_args()
 
-    if args.mode == "backtest":
+    profiler = None
+    if args.mode in ("backtest", "paper") and (args.profile or args.profile_dump):
+        profiler = StageProfiler(memory=not args.profile_no_memory, cprofile=bool(args.profile_dump))
+    stage = profiler.stage if profiler is not None else (lambda name: nullcontext({}))
+
+    if args.mode in ("backtest", "sweep", "walkforward", "montecarlo"):
         # Load data
-        if args.csv:
-            df = load_ohlcv_from_csv(args.csv)
-            interval = "1d"  # unknown; used only for annualization—adjust if you know it
+        interval = "1d" if args.csv else args.interval  # CSV: unknown; used only for annualization—adjust if you know it
+        store = OHLCVStore(args.cache_dir) if args.ticker and not args.no_cache else None
+
+        def load_df() -> pd.DataFrame:
+            if args.csv:
+                return load_ohlcv_from_csv(args.csv)
+            if args.bars:
+                return open_bars(args.bars, start=args.start, end=args.end)
+            if store is None:
+                return load_ohlcv_from_yf(args.ticker, args.interval, start=args.start, end=args.end)
+            return store.load(args.ticker, args.interval, start=args.start, end=args.end, offline=args.offline)
+
+        if args.mode == "backtest" and args.chunk_bars and args.csv:
+            df = None  # streamed block by block below
+        elif args.mode == "backtest" and not args.chunk_bars and not args.no_result_cache and profiler is None:
+            df = None  # loaded by the result cache, and only on a miss
         else:
-            df = load_ohlcv_from_yf(args.ticker, args.interval, start=args.start, end=args.end)
-            interval = args.interval
+            with stage("load") as rec:
+                df = load_df()
+                rec["bars"] = len(df)
 
+    if args.mode == "backtest":
+        vol_filter = None
+        if args.volume_filter:
+            window, mult = args.volume_filter.split(":")
+            vol_filter = (int(window), float(mult))
+
+    if args.mode == "backtest" and args.chunk_bars:
         bt = CrossoverBacktester(
             fast=args.fast, slow=args.slow, initial_equity=args.equity,
             risk_fraction=args.risk_fraction, stop_loss_pct=args.stop_loss,
             take_profit_pct=args.take_profit, allow_short=args.allow_short,
-            fee_bps=args.fee_bps
+            fee_bps=args.fee_bps, ma=args.ma, volume_filter=vol_filter
+        )
+        def counted(chunks):
+            for chunk in chunks:
+                rec["bars"] += len(chunk)
+                yield chunk
+
+        chunks = iter_ohlcv_chunks(args.chunk_bars, csv_path=args.csv if df is None else None, df=df)
+        with stage("run") as rec:
+            rec.setdefault("bars", 0)
+            stats = bt.format_metrics(bt.run_chunked(counted(chunks), interval))
+        print(f"\n=== Backtest Summary (chunked, {args.chunk_bars} bars/block) ===")
+        for k, v in stats.items():
+            print(f"{k:16s} : {v}")
+
+    elif args.mode == "backtest":
+        bt = CrossoverBacktester(
+            fast=args.fast, slow=args.slow, initial_equity=args.equity,
+            risk_fraction=args.risk_fraction, stop_loss_pct=args.stop_loss,
+            take_profit_pct=args.take_profit, allow_short=args.allow_short,
+            fee_bps=args.fee_bps, engine=args.engine, ma=args.ma, volume_filter=vol_filter
         )
-        df_eq, trades = bt.run(df)
-        stats = bt.summarize(df_eq, interval)
+        if args.no_result_cache or profiler is not None:
+            if not args.no_result_cache:
+                print("[profile] result cache bypassed so that every stage runs")
+            with stage("indicators") as rec:
+                pipeline = IndicatorPipeline(df)
+                for node in bt.indicator_nodes():
+                    pipeline.get(node)
+                rec["bars"] = len(df)
+            with stage("run") as rec:
+                df_eq, trades = bt.run(df, pipeline=pipeline)
+                rec["bars"] = len(df)
+            with stage("summarize") as rec:
+                stats = bt.summarize(df_eq, interval)
+                rec["bars"] = len(df_eq)
+        else:
+            if args.csv:
+                fingerprint = ("csv",) + _file_fingerprint(args.csv)
+            elif args.bars:
+                bars = pathlib.Path(args.bars)
+                fingerprint = ("bars", str(args.start), str(args.end)) + _file_fingerprint(
+                    bars / "timestamp.npy", bars / "ohlcv.npy")
+            elif store is not None:
+                fingerprint = store.fingerprint(args.ticker, args.interval, args.start, args.end, offline=args.offline)
+            else:
+                fingerprint = None
+            cache = BacktestCache(args.result_cache, max_mb=args.result_cache_mb)
+            df_eq, trades, m, hit = cache.run(bt, interval, load_df, fingerprint)
+            stats = bt.format_metrics(m)
+            print(f"[result-cache] {'hit' if hit else 'miss'} ({args.result_cache})")
         # Print summary
         print("\n=== Backtest Summary ===")
         for k, v in stats.items():
@@ -394,26 +3224,194 @@ def main():
         print(f"Trades               : {len(trades)}")
         # Trade log
         if trades:
-            tl = pd.DataFrame([{
-                "entry_time": t.entry_time, "exit_time": t.exit_time, "side": t.side,
-                "entry_price": t.entry_price, "exit_price": t.exit_price,
-                "qty": t.qty, "pnl": t.pnl, "return_pct": t.return_pct
-            } for t in trades])
+            tl = trades.to_frame()
             print("\n--- Trade Log (last 10) ---")
             print(tl.tail(10).to_string(index=False))
-        # Plot
+        if args.trades_out:
+            with stage("export"):
+                if args.trades_out.endswith(".parquet"):
+                    trades.to_parquet(args.trades_out)
+                else:
+                    trades.to_csv(args.trades_out)
+            print(f"\n[trades] {len(trades)} trades written to {args.trades_out}")
+        # Plot (with --plot the time includes the window staying open)
         if args.plot or args.save_plot:
-            bt.plot(df_eq, show=args.plot, save_path=args.save_plot)
+            with stage("plot") as rec:
+                bt.plot(df_eq, show=args.plot, save_path=args.save_plot)
+                rec["bars"] = len(df_eq)
+
+    elif args.mode == "sweep":
+        t0 = time.perf_counter()
+        results = run_sweep(
+            df, interval,
+            fasts=parse_range(args.fast, int), slows=parse_range(args.slow, int),
+            stop_losses=parse_range(args.stop_loss), take_profits=parse_range(args.take_profit),
+            fee_bps_list=parse_range(args.fee_bps), initial_equity=args.equity,
+            risk_fraction=args.risk_fraction, allow_short=args.allow_short,
+            workers=args.workers, rank_by=args.rank_by, sma_cache_bytes=args.sma_cache_mb * 2**20
+        )
+        results.to_csv(args.out, index=False)
+        print(f"\n=== Sweep: {len(results)} combinations in {time.perf_counter() - t0:.1f}s ===")
+        print(results.head(args.top).to_string(index=False))
+        print(f"\nFull ranked table written to {args.out}")
+
+    elif args.mode == "walkforward":
+        t0 = time.perf_counter()
+        folds, stitched, overall = run_walkforward(
+            df, interval, is_bars=args.is_bars, oos_bars=args.oos_bars,
+            fasts=parse_range(args.fast, int), slows=parse_range(args.slow, int),
+            stop_losses=parse_range(args.stop_loss), take_profits=parse_range(args.take_profit),
+            fee_bps_list=parse_range(args.fee_bps), initial_equity=args.equity,
+            risk_fraction=args.risk_fraction, allow_short=args.allow_short, anchored=args.anchored,
+            workers=args.workers, rank_by=args.rank_by, sma_cache_bytes=args.sma_cache_mb * 2**20
+        )
+        print(f"\n=== Walk-forward: {len(folds)} folds in {time.perf_counter() - t0:.1f}s ===")
+        print(folds.to_string(index=False))
+        print("\n--- Stitched out-of-sample ---")
+        for k, v in CrossoverBacktester.format_metrics(overall).items():
+            print(f"{k:16s} : {v}")
+        if args.out:
+            stitched.to_csv(args.out)
+
+    elif args.mode == "montecarlo":
+        bt = CrossoverBacktester(
+            fast=args.fast, slow=args.slow, initial_equity=args.equity,
+            risk_fraction=args.risk_fraction, stop_loss_pct=args.stop_loss,
+            take_profit_pct=args.take_profit, allow_short=args.allow_short,
+            fee_bps=args.fee_bps, engine="numpy"
+        )
+        df_eq, _ = bt.run(df)
+        marked = bt.marked_equity(df_eq)
+        marked = marked[~np.isnan(df_eq["equity"].to_numpy(dtype=float))]
+        ppy = PERIODS_PER_YEAR.get(interval, 252)
+        years = max(1e-9, len(marked) / ppy)
+        if args.method == "trades":
+            returns = bt.trade_equity_returns()
+            steps_per_year = len(returns) / years  # Sharpe is annualized by trade frequency
+            basis = "closed trades"
+        else:
+            returns = marked[1:] / marked[:-1] - 1
+            steps_per_year = ppy
+            basis = "marked bars"
+        usable = int(np.count_nonzero(np.isfinite(returns)))
+        if usable < 2:
+            print(f"[montecarlo] Need at least two returns ({basis}) to resample, the backtest produced "
+                  f"{usable}. Use a longer history, other SMA windows or the other --method.")
+            return
+        # the backtest's own value is measured on the same returns the paths resample
+        actual = observed_path_metrics(returns, years, steps_per_year)
+        t0 = time.perf_counter()
+        sims = monte_carlo(returns, years, steps_per_year, paths=args.paths, method=args.method,
+                           block=args.block_bars, seed=args.seed)
+        print(f"\n=== Monte Carlo: {args.paths:,} paths of {len(returns):,} "
+              f"{'trades' if args.method == 'trades' else 'bars'} in {time.perf_counter() - t0:.2f}s ===")
+        print(summarize_monte_carlo(sims, actual, label=f"backtest ({basis})").to_string(float_format=lambda v: f"{v:.4f}"))
+        if args.out:
+            sims.to_csv(args.out, index=False)
+
+    elif args.mode == "portfolio":
+        if args.csv:
+            closes = pd.read_csv(args.csv, index_col=0, parse_dates=True).sort_index()
+            closes = closes.apply(pd.to_numeric, errors="coerce")
+        else:
+            tickers = [t.strip() for t in args.tickers.split(",") if t.strip()]
+            closes = load_close_matrix(tickers, args.interval, start=args.start, end=args.end,
+                                       store=OHLCVStore(args.cache_dir), offline=args.offline)
+        pb = PortfolioBacktester(
+            fast=args.fast, slow=args.slow, initial_equity=args.equity,
+            risk_fraction=args.risk_fraction, stop_loss_pct=args.stop_loss,
+            take_profit_pct=args.take_profit, allow_short=args.allow_short,
+            fee_bps=args.fee_bps
+        )
+        df_eq, per_symbol = pb.run(closes)
+        stats = pb.summarize(df_eq, args.interval)
+        print(f"\n=== Portfolio Summary ({closes.shape[1]} symbols, {closes.shape[0]} bars) ===")
+        for k, v in stats.items():
+            print(f"{k:16s} : {v}")
+        print("\n--- Per symbol ---")
+        print(per_symbol.sort_values("contribution", ascending=False).to_string())
+        if args.out:
+            per_symbol.to_csv(args.out)
+
+    elif args.mode == "ingest":
+        t0 = time.perf_counter()
+        stats = ingest_csv(args.csv, args.out, ts_col=args.ts_col, chunksize=args.chunksize,
+                           ts_format=None if args.ts_unit else args.ts_format, ts_unit=args.ts_unit)
+        print(f"[ingest] {stats['rows']} bars -> {args.out} in {time.perf_counter() - t0:.1f}s "
+              f"(dropped {stats['dropped_rows']} incomplete rows, input sorted: {stats['sorted_input']})")
+
+    elif args.mode == "fetch":
+        tickers = [t.strip() for t in args.tickers.split(",") if t.strip()]
+        intervals = [i.strip() for i in args.interval.split(",") if i.strip()]
+        t0 = time.perf_counter()
+        _, results = fetch_many([(t, i, args.start, args.end) for t in tickers for i in intervals],
+                                store=OHLCVStore(args.cache_dir), workers=args.workers, rate=args.rate,
+                                retries=args.retries, backoff=args.backoff)
+        print(format_fetch_report(results))
+        print(f"[fetch] done in {time.perf_counter() - t0:.1f}s")
+        if not all(r.ok for r in results):
+            raise SystemExit(1)
+
+    elif args.mode == "cache":
+        store = OHLCVStore(args.cache_dir)
+        if args.action == "evict":
+            if not (args.ticker or args.interval or args.older_than_days is not None or args.max_mb is not None):
+                parser.error("cache evict needs --ticker, --interval, --older-than-days or --max-mb")
+            removed = store.evict(ticker=args.ticker, interval=args.interval,
+                                  older_than_days=args.older_than_days, max_mb=args.max_mb)
+            print(f"[cache] Evicted {len(removed)} series.")
+            for e in removed:
+                print(f"  {e['ticker']} {e['interval']} ({e['size_mb']:.2f} MB)")
+        entries = store.entries()
+        if entries:
+            print(pd.DataFrame(entries).drop(columns="path").to_string(index=False))
+        else:
+            print(f"[cache] {store.root} is empty.")
+
+    elif args.mode == "supervise":
+        feed_factory = None
+        if args.replay_cache:
+            store = OHLCVStore(args.cache_dir)
+            feed_factory = lambda t, i: ReplayFeed(store.load(t, i, offline=True), i, speed=args.speed)
+        sup = PaperSupervisor(feed_factory=feed_factory, grace_seconds=args.grace_seconds,
+                              max_fetches=args.max_fetches, status_path=args.status_json, quiet=args.quiet)
+        for ticker, interval, fast, slow in parse_paper_specs(args.symbols, args.interval, args.fast, args.slow):
+            sup.add(ticker, interval, fast=fast, slow=slow, initial_equity=args.equity,
+                    risk_fraction=args.risk_fraction, stop_loss_pct=args.stop_loss,
+                    take_profit_pct=args.take_profit, allow_short=args.allow_short, fee_bps=args.fee_bps)
+        try:
+            asyncio.run(sup.run())
+        except KeyboardInterrupt:
+            print("\n[supervisor] Stopped by user.")
+        print(pd.DataFrame(sup.snapshot()).to_string(index=False))
 
     elif args.mode == "paper":
+        feed = None
+        with stage("load") as rec:
+            if args.replay_csv:
+                feed = ReplayFeed(load_ohlcv_from_csv(args.replay_csv), args.interval, speed=args.speed)
+            elif args.replay_bars:
+                feed = ReplayFeed(open_bars(args.replay_bars), args.interval, speed=args.speed)
+            elif args.replay_cache:
+                df = OHLCVStore(args.cache_dir).load(args.ticker, args.interval, offline=True)
+                feed = ReplayFeed(df, args.interval, speed=args.speed)
+            rec["bars"] = len(feed.df) if feed is not None else 0
         paper_trade_loop(
             ticker=args.ticker, interval=args.interval, fast=args.fast, slow=args.slow,
             initial_equity=args.equity, risk_fraction=args.risk_fraction,
-            stop_loss_pct=args.stop_profit if hasattr(args, "stop_profit") else 0.05,
-            take_profit_pct=args.take_profit, allow_short=args.allow_short,
-            poll_seconds=args.poll_seconds
+            stop_loss_pct=args.stop_loss, take_profit_pct=args.take_profit,
+            allow_short=args.allow_short, poll_seconds=args.poll_seconds, fee_bps=args.fee_bps,
+            feed=feed, quiet=args.quiet, profiler=profiler
         )
 
+    if profiler is not None:
+        profiler.print_summary()
+        profiler.write(args.profile or "profile.json")
+        print(f"[profile] report written to {args.profile or 'profile.json'}")
+        if args.profile_dump:
+            name = profiler.dump_hottest(args.profile_dump)
+            print(f"[profile] cProfile stats of the hottest stage ({name}) written to {args.profile_dump}")
+
 
 if __name__ == "__main__":
     main()
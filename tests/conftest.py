@@ -0,0 +1,22 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_backtester import synthetic_ohlcv  # noqa: E402
+
+
+@pytest.fixture
+def trending_bars():
+    """3,000 daily-ish bars: a fast cycle (frequent crosses) on top of an upward drift."""
+    df = synthetic_ohlcv(3000, seed=1, cycle_bars=400, cycle_amp=0.05)
+    df["close"] = df["close"] * np.exp(np.arange(len(df)) * 0.0003)
+    return df
+
+
+@pytest.fixture
+def cycling_bars():
+    return synthetic_ohlcv(5000, seed=0, cycle_bars=300)
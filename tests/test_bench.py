@@ -0,0 +1,10 @@
+import os
+import sys
+
+import bench_backtester as bench
+
+
+def test_child_run_without_wait4_skips_peak_rss(monkeypatch):
+    monkeypatch.delattr(os, "wait4", raising=False)
+    wall, peak = bench._child_maxrss_mb([sys.executable, "-c", "pass"])
+    assert wall > 0 and peak is None
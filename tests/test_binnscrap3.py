@@ -0,0 +1,238 @@
+import os
+import socket
+import stat
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("playwright")
+pytest.importorskip("dotenv")
+
+import BINNSCRAP3 as bn  # noqa: E402
+
+
+class _Session:
+    symbol = "BTC_USDT"
+    orders = 0
+    pool = None
+
+    def execute(self, request):
+        self.orders += 1
+        return {"ok": True, "cmd": request["cmd"]}
+
+
+@pytest.fixture
+def served(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(bn, "SESSION_READ_TIMEOUT", 0.5)
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    thread = threading.Thread(target=bn.serve_session, args=(_Session(),), kwargs={"port": port}, daemon=True)
+    thread.start()
+    deadline = time.time() + 5
+    while not os.path.exists(bn.SESSION_TOKEN_FILE) and time.time() < deadline:
+        time.sleep(0.01)
+    yield port
+    bn.send_to_session({"cmd": "shutdown"}, port=port)
+    thread.join(5)
+
+
+def test_token_file_is_owner_only(served):
+    mode = stat.S_IMODE(os.stat(bn.SESSION_TOKEN_FILE).st_mode)
+    assert mode == 0o600
+
+
+def test_silent_client_does_not_block_others(served):
+    silent = socket.create_connection(("127.0.0.1", served))
+    try:
+        t0 = time.time()
+        reply = bn.send_to_session({"cmd": "ping"}, port=served, timeout=5)
+        assert reply["ok"] and time.time() - t0 < 3
+    finally:
+        silent.close()
+
+
+def test_requests_without_token_are_rejected(served):
+    with socket.create_connection(("127.0.0.1", served), timeout=5) as conn:
+        conn.sendall(b'{"cmd": "buy", "amount": 5}\n')
+        assert b"bad or missing token" in conn.recv(200)
+
+
+class _Locator:
+    def __init__(self, page, selector):
+        self.page, self.selector, self.first = page, selector, self
+
+    def count(self):
+        return int(self.page.dialog and "Confirm" in self.selector)
+
+    def is_visible(self):
+        return self.count() > 0
+
+    def wait_for(self, **kwargs):
+        if not self.count():
+            raise bn.PWTimeout("not visible")
+
+    def click(self):
+        self.page.confirm_clicks += 1  # the dialog stays up, as a re-rendering one would
+
+
+class _Response:
+    status = 200
+
+
+class _Expect:
+    value = _Response()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class _Page:
+    def __init__(self, dialog):
+        self.dialog = dialog
+        self.confirm_clicks = 0
+
+    def locator(self, selector):
+        return _Locator(self, selector)
+
+    def expect_response(self, predicate, timeout):
+        return _Expect()
+
+
+class _Button:
+    clicks = 0
+
+    def click(self):
+        self.clicks += 1
+
+
+@pytest.mark.parametrize("dialog", [True, False])
+def test_submit_order_clicks_each_control_at_most_once(dialog, tmp_path, monkeypatch):
+    monkeypatch.setattr(bn, "RESOLVER", bn.SelectorResolver(tmp_path / "selectors.json"))
+    page, button = _Page(dialog), _Button()
+    assert bn.submit_order(page, button, "buy_order_response", confirm_ms=50) == 200
+    assert button.clicks == 1
+    assert page.confirm_clicks == (1 if dialog else 0)
+
+
+class _TabPage:
+    def __init__(self):
+        self.url, self.closed = "about:blank", False
+
+    def is_closed(self):
+        return self.closed
+
+    def close(self):
+        self.closed = True
+
+
+class _Ctx:
+    def new_page(self):
+        return _TabPage()
+
+
+@pytest.fixture
+def offline_pool(monkeypatch):
+    def goto(page, symbol):
+        page.url = f"https://www.binance.com/en/trade/{symbol}?type=spot"
+
+    monkeypatch.setattr(bn, "ensure_trade_page", goto)
+    for name in ("ensure_market_mode", "ensure_buy_tab", "ensure_sell_tab"):
+        monkeypatch.setattr(bn, name, lambda page: None)
+    return lambda max_tabs: bn.TradeTabPool(_Ctx(), max_tabs=max_tabs, health_seconds=3600)
+
+
+@pytest.mark.parametrize("max_tabs", [0, -1])
+def test_pool_rejects_non_positive_bound(offline_pool, max_tabs):
+    with pytest.raises(ValueError):
+        offline_pool(max_tabs)
+
+
+def test_pool_evicts_least_recently_used(offline_pool):
+    pool = offline_pool(2)
+    first = pool.get("A", "buy")
+    pool.get("B", "buy")
+    pool.get("A", "sell")
+    pool.get("C", "buy")
+    assert list(pool.tabs) == ["A", "C"]
+    assert pool.tabs["A"]["page"] is first and pool.tabs["A"]["side"] == "sell"
+
+
+def test_disabled_tracer_keeps_nothing():
+    tracer = bn.Tracer()
+    with tracer.span("order", kind="wait") as span:
+        span["ok"] = True
+    assert not tracer.spans
+
+    tracer.enable(max_spans=3)
+    for i in range(5):
+        with tracer.span(f"s{i}"):
+            pass
+    assert [rec["name"] for rec in tracer.spans] == ["s2", "s3", "s4"]
+
+
+def test_resolver_record_stays_fixed_size(tmp_path):
+    resolver = bn.SelectorResolver(tmp_path / "selectors.json")
+    page = _Page(dialog=True)
+    for _ in range(50):
+        resolver.resolve(page, "order_confirm", bn.CONFIRM_SELECTORS)
+    summary = resolver.summary()
+    assert sum(agg["count"] for agg in summary["order_confirm"].values()) == 50
+    assert resolver.stats.keys() == {"order_confirm"}
+
+
+def test_session_order_clears_the_wait_log(monkeypatch):
+    session = object.__new__(bn.TradingSession)
+    session.pool, session.symbol, session.orders, session.page = None, "BTC_USDT", 0, object()
+
+    def fake_buy(page, amount, execute, ready):
+        with bn.wait_step("buy_order_response"):
+            pass
+        return {}
+
+    monkeypatch.setattr(bn, "market_buy", fake_buy)
+    bn.WAIT_LOG.append({"step": "health", "ms": 1.0, "ok": True})
+    result = session.execute({"cmd": "buy", "amount": 5, "dry": True})
+    assert [w["step"] for w in result["waits"]] == ["buy_order_response"]
+    assert not bn.WAIT_LOG
+
+
+@pytest.mark.parametrize("flow", ["buy", "sell"])
+def test_pooled_order_still_checks_market_mode(flow, tmp_path, monkeypatch):
+    monkeypatch.setattr(bn, "RESOLVER", bn.SelectorResolver(tmp_path / "selectors.json"))
+    monkeypatch.setattr(bn, "SNAP_DIR", None)
+    checked = []
+    monkeypatch.setattr(bn, "ensure_market_mode", checked.append)
+    page = _Page(dialog=False)  # empty form: the flow stops once it looks for its inputs
+    with pytest.raises(bn.PWTimeout):
+        if flow == "buy":
+            bn.market_buy(page, 5, execute=False, ready=True)
+        else:
+            bn.sell_all(page, execute=False, ready=True)
+    assert checked == [page]
+
+
+class _Frame(_Page):
+    def __init__(self):
+        super().__init__(dialog=False)
+        self.probes = 0
+
+    def locator(self, selector):
+        self.probes += 1
+        return super().locator(selector)
+
+
+def test_cookie_polling_probes_each_frame_once_and_logs_no_misses(tmp_path, monkeypatch):
+    monkeypatch.setattr(bn, "RESOLVER", bn.SelectorResolver(tmp_path / "selectors.json"))
+    main, child = _Frame(), _Frame()
+    main.frames = [main, child]
+    assert not bn.accept_cookies_everywhere(main, timeout_ms=0, max_wait_s=0.05)
+    # one combined query per frame and round, plus the banner locator built once on the page
+    assert main.probes - 1 == child.probes >= 1
+    assert bn.RESOLVER.summary() == {}
+    assert bn.RESOLVER.known.get("cookie_accept", {}).get("misses", 0) == 0
@@ -0,0 +1,17 @@
+import pytest
+
+import moving_average_crossovers as mac
+
+
+@pytest.mark.parametrize("chunk_bars", [7, 97, 1000, 10_000])
+def test_chunked_matches_single_pass(cycling_bars, chunk_bars):
+    bt = mac.CrossoverBacktester(fast=20, slow=100, allow_short=True, engine="numpy")
+    df_eq, _ = bt.run(cycling_bars)
+    single = bt.metrics(df_eq, "1m")
+
+    chunked = mac.CrossoverBacktester(fast=20, slow=100, allow_short=True).run_chunked(
+        mac.iter_ohlcv_chunks(chunk_bars, df=cycling_bars), "1m")
+
+    assert chunked["trades"] == single["trades"] > 5
+    for key, value in chunked.items():
+        assert value == pytest.approx(single[key], rel=1e-9, abs=1e-12), key
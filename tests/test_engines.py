@@ -0,0 +1,24 @@
+import numpy as np
+import pytest
+
+import moving_average_crossovers as mac
+
+
+@pytest.mark.parametrize("allow_short", [False, True])
+def test_numpy_engine_matches_pandas(trending_bars, allow_short):
+    runs = {}
+    for engine in mac.ENGINES:
+        bt = mac.CrossoverBacktester(fast=20, slow=100, allow_short=allow_short, engine=engine)
+        df_eq, trades = bt.run(trending_bars)
+        runs[engine] = (df_eq["equity"].to_numpy(), trades, bt.open_trade)
+
+    (eq_p, trades_p, open_p), (eq_n, trades_n, open_n) = runs["pandas"], runs["numpy"]
+    assert len(trades_p) > 5
+    np.testing.assert_allclose(eq_n, eq_p, rtol=1e-12)
+    for col in ("entry_bar", "exit_bar", "side", "entry_time", "exit_time"):
+        np.testing.assert_array_equal(trades_n.column(col), trades_p.column(col))
+    for col in ("entry_price", "exit_price", "qty", "pnl", "return_pct"):
+        np.testing.assert_allclose(trades_n.column(col), trades_p.column(col), rtol=1e-12)
+    assert (open_n is None) == (open_p is None)
+    if open_p is not None:
+        assert open_n == pytest.approx(open_p)
@@ -0,0 +1,64 @@
+import threading
+import time
+
+import pytest
+
+import moving_average_crossovers as mac
+from bench_backtester import synthetic_ohlcv
+
+
+class FakeSource:
+    """Stand-in for yfinance: records call times and fails on request."""
+
+    def __init__(self, fail_first=None, always_empty=()):
+        self.fail_first = dict(fail_first or {})
+        self.always_empty = set(always_empty)
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def __call__(self, ticker, interval, start, end):
+        with self._lock:
+            self.calls.append((ticker, time.monotonic()))
+            if self.fail_first.get(ticker, 0) > 0:
+                self.fail_first[ticker] -= 1
+                raise ConnectionError("throttled")
+        if ticker in self.always_empty:
+            return synthetic_ohlcv(10).iloc[:0]
+        return synthetic_ohlcv(50)
+
+
+def test_calls_respect_the_rate_limit():
+    source = FakeSource()
+    t0 = time.monotonic()
+    frames, results = mac.fetch_many([(t, "1d", None, None) for t in "ABCDEF"], fetcher=source,
+                                     workers=6, rate=20.0, burst=1)
+    assert len(frames) == 6 and all(r.ok for r in results)
+    # burst 1 at 20/s: the 5 calls after the first need at least 0.25s however many threads ask
+    assert len(source.calls) == 6
+    assert max(t for _, t in source.calls) - t0 >= 0.24
+
+
+def test_retries_and_partial_failure():
+    source = FakeSource(fail_first={"A": 2}, always_empty={"B"})
+    frames, results = mac.fetch_many([("A", "1d", None, None), ("B", "1d", None, None), ("C", "1d", None, None)],
+                                     fetcher=source, rate=1000.0, burst=10, retries=3, backoff=0.001)
+    by_ticker = {r.ticker: r for r in results}
+    assert by_ticker["A"].ok and by_ticker["A"].attempts == 3
+    assert not by_ticker["B"].ok and by_ticker["B"].attempts == 4 and "no data" in by_ticker["B"].error
+    assert by_ticker["C"].ok and by_ticker["C"].attempts == 1
+    assert set(frames) == {("A", "1d"), ("C", "1d")}
+    assert "FAILED" in mac.format_fetch_report(results)
+
+
+def test_duplicate_requests_are_fetched_once():
+    source = FakeSource()
+    frames, results = mac.fetch_many([("A", "1d", None, None)] * 3, fetcher=source, rate=1000.0)
+    assert len(results) == 1 and len(source.calls) == 1
+    with pytest.raises(ValueError, match="Conflicting"):
+        mac.fetch_many([("A", "1d", "2020-01-01", None), ("A", "1d", "2021-01-01", None)], fetcher=source)
+
+
+@pytest.mark.parametrize("rate", [0, -1.0])
+def test_rate_limiter_rejects_non_positive_rate(rate):
+    with pytest.raises(ValueError):
+        mac.RateLimiter(rate)
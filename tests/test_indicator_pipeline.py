@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+import moving_average_crossovers as mac
+
+NODES = [
+    mac.sma("close", 20),
+    mac.ema("close", 30),
+    mac.wma("close", 15),
+    mac.crossover(mac.sma("close", 20), mac.sma("close", 100)),
+    mac.gate(mac.crossover(mac.ema("close", 10), mac.wma("close", 40)), mac.volume_filter(20, 1.2)),
+]
+
+
+@pytest.mark.parametrize("step", [9, 37, 800])
+def test_append_matches_full_recompute(cycling_bars, step):
+    head = 1000
+    pipeline = mac.IndicatorPipeline(cycling_bars.iloc[:head])
+    for node in NODES:
+        pipeline.get(node)
+    for i in range(head, len(cycling_bars), step):
+        pipeline.append(cycling_bars.iloc[i:i + step])
+
+    full = mac.IndicatorPipeline(cycling_bars)
+    assert len(pipeline) == len(full)
+    for node in NODES:
+        np.testing.assert_allclose(pipeline.get(node), full.get(node), rtol=1e-9, equal_nan=True,
+                                   err_msg=node.name)
+
+
+def test_appended_pipeline_drives_the_same_backtest(cycling_bars):
+    pipeline = mac.IndicatorPipeline(cycling_bars.iloc[:2000])
+    bt = mac.CrossoverBacktester(fast=20, slow=100, ma="ema", engine="numpy")
+    bt.indicators(cycling_bars.iloc[:2000], pipeline=pipeline)
+    pipeline.append(cycling_bars.iloc[2000:])
+    df_eq, trades = bt.run(cycling_bars, pipeline=pipeline)
+
+    fresh = mac.CrossoverBacktester(fast=20, slow=100, ma="ema", engine="numpy")
+    df_fresh, trades_fresh = fresh.run(cycling_bars)
+    np.testing.assert_allclose(df_eq["equity"].to_numpy(), df_fresh["equity"].to_numpy(), rtol=1e-9)
+    np.testing.assert_array_equal(trades.column("exit_bar"), trades_fresh.column("exit_bar"))
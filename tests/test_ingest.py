@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from bench_backtester import synthetic_ohlcv
+from moving_average_crossovers import OHLCV_COLUMNS, ingest_csv, open_bars
+
+
+@pytest.fixture(params=["sorted", "shuffled"])
+def bars_csv(request, tmp_path):
+    df = synthetic_ohlcv(2000, seed=3)
+    df.iloc[[5, 777, 1500], 1] = np.nan  # dropped on ingest
+    if request.param == "shuffled":
+        df = df.sample(frac=1.0, random_state=0)
+    path = tmp_path / "bars.csv"
+    df.to_csv(path)
+    expected = df.dropna().sort_index()
+    return path, expected
+
+
+@pytest.mark.parametrize("chunksize", [97, 500, 10_000])
+def test_chunked_ingest_matches_single_read(tmp_path, bars_csv, chunksize):
+    path, expected = bars_csv
+    stats = ingest_csv(str(path), str(tmp_path / f"bars_{chunksize}"), chunksize=chunksize)
+    single = ingest_csv(str(path), str(tmp_path / "bars_single"), chunksize=10**7)
+
+    chunked, whole = open_bars(tmp_path / f"bars_{chunksize}"), open_bars(tmp_path / "bars_single")
+    pd.testing.assert_frame_equal(chunked, whole)
+    np.testing.assert_array_equal(chunked.index.asi8, expected.index.as_unit("ns").asi8)
+    np.testing.assert_allclose(chunked[OHLCV_COLUMNS].to_numpy(), expected[OHLCV_COLUMNS].to_numpy(), rtol=1e-15)
+    assert stats["rows"] == single["rows"] == len(expected)
+    assert stats["dropped_rows"] == 3
+
+
+def test_missing_columns_are_rejected(tmp_path):
+    path = tmp_path / "bad.csv"
+    synthetic_ohlcv(10).drop(columns="volume").to_csv(path)
+    with pytest.raises(ValueError, match="volume"):
+        ingest_csv(str(path), str(tmp_path / "out"))
@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+
+import moving_average_crossovers as mac
+
+
+def test_trades_basis_matches_realized_equity(trending_bars):
+    bt = mac.CrossoverBacktester(fast=20, slow=100, engine="numpy")
+    bt.run(trending_bars)
+    returns = bt.trade_equity_returns()
+    observed = mac.observed_path_metrics(returns, years=1.0, periods_per_year=len(returns))
+
+    realized = bt.initial_equity + bt.trades.column("pnl").sum() - (
+        bt.trades.column("entry_price") * bt.trades.column("qty") * bt.fee_bps).sum()
+    assert np.isclose(observed["total_return"], realized / bt.initial_equity - 1)
+
+
+def test_observed_equals_unshuffled_path():
+    # a one-block bootstrap of the whole series can only reproduce the series itself
+    r = np.random.default_rng(0).normal(0.001, 0.01, 250)
+    sims = mac.monte_carlo(r, 1.0, 252, paths=3, method="block", block=len(r), seed=0)
+    observed = mac.observed_path_metrics(r, 1.0, 252)
+    pd.testing.assert_series_equal(sims.iloc[0], pd.Series(observed, name=0), check_exact=False)
+    table = mac.summarize_monte_carlo(sims, observed, label="backtest (marked bars)")
+    assert table.columns[0] == "backtest (marked bars)"
+
+
+def test_cli_reports_too_few_trades(tmp_path, monkeypatch, capsys, cycling_bars):
+    csv = tmp_path / "bars.csv"
+    cycling_bars.iloc[:260].to_csv(csv)
+    monkeypatch.setattr("sys.argv", ["moving_average_crossovers.py", "montecarlo", "--csv", str(csv),
+                                     "--fast", "50", "--slow", "200", "--paths", "100"])
+    mac.main()
+    assert "Need at least two returns (closed trades)" in capsys.readouterr().out
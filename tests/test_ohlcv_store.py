@@ -0,0 +1,25 @@
+import time
+
+import pytest
+
+from bench_backtester import synthetic_ohlcv
+from moving_average_crossovers import OHLCVStore
+
+
+@pytest.fixture
+def east_of_utc(monkeypatch):
+    # local clock 12 hours ahead of UTC, where a local-time cutoff lands in the future
+    monkeypatch.setenv("TZ", "Etc/GMT-12")
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+@pytest.mark.skipif(not hasattr(time, "tzset"), reason="time.tzset is POSIX-only")
+def test_evict_by_age_uses_utc(tmp_path, east_of_utc):
+    store = OHLCVStore(str(tmp_path), fetcher=lambda *args: synthetic_ohlcv(500))
+    store.load("X", "1d")
+    assert store.evict(older_than_days=0.25) == []
+    assert len(store.entries()) == 1
+    assert len(store.evict(older_than_days=0)) == 1
@@ -0,0 +1,25 @@
+import numpy as np
+import pytest
+
+import moving_average_crossovers as mac
+
+
+def test_plot_panels_use_marked_equity(trending_bars):
+    bt = mac.CrossoverBacktester(fast=20, slow=100, engine="numpy")
+    df_eq, _ = bt.run(trending_bars)
+    data = bt.plot_data(df_eq)
+
+    marked = bt.marked_equity(df_eq)
+    np.testing.assert_allclose(data["growth"].to_numpy(), marked / marked[0])
+    assert data["drawdown"].min() == pytest.approx(bt.metrics(df_eq, "1m")["max_drawdown"])
+    # opening a long must not show up as a near-total loss
+    assert data["drawdown"].min() > -0.5
+
+
+def test_plot_renders_offscreen(tmp_path, trending_bars):
+    matplotlib = pytest.importorskip("matplotlib")
+    matplotlib.use("Agg")
+    bt = mac.CrossoverBacktester(fast=20, slow=100, engine="numpy")
+    df_eq, _ = bt.run(trending_bars)
+    bt.plot(df_eq, show=False, save_path=str(tmp_path / "equity.png"), width_px=200)
+    assert (tmp_path / "equity.png").stat().st_size > 0
@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+
+from bench_backtester import synthetic_ohlcv
+from moving_average_crossovers import PortfolioBacktester
+
+
+def _closes(n, seed, index):
+    return synthetic_ohlcv(n, seed=seed, cycle_bars=60)["close"].set_axis(index)
+
+
+def test_mixed_calendars_trade_every_symbol():
+    # a 7-day crypto calendar next to a business-day stock listed later and delisted early
+    days = pd.date_range("2020-01-01", periods=1500, freq="D")
+    bdays = pd.bdate_range("2020-03-02", "2023-06-30")
+    closes = pd.DataFrame({
+        "BTC-USD": _closes(len(days), 1, days),
+        "AAPL": _closes(len(bdays), 2, bdays),
+    })
+    assert closes["AAPL"].isna().any()
+
+    bt = PortfolioBacktester(fast=5, slow=20)
+    df_eq, stats = bt.run(closes)
+
+    assert (stats["trades"] > 0).all()
+    assert np.isfinite(df_eq["equity"]).all()
+
+    # the stock alone trades exactly as on its own calendar
+    own, own_stats = PortfolioBacktester(fast=5, slow=20).run(closes[["AAPL"]].dropna())
+    assert stats.loc["AAPL", "trades"] == own_stats.loc["AAPL", "trades"]
+
+
+def test_no_position_outside_listing():
+    days = pd.date_range("2020-01-01", periods=800, freq="D")
+    a = _closes(800, 3, days)
+    b = a.copy()
+    b.iloc[:200] = np.nan
+    b.iloc[600:] = np.nan
+    bt = PortfolioBacktester(fast=5, slow=20)
+    df_eq, _ = bt.run(pd.DataFrame({"B": b}))
+    assert (df_eq["positions"].iloc[:200] == 0).all()
+    assert (df_eq["positions"].iloc[600:] == 0).all()
+    assert df_eq["positions"].iloc[200:600].any()
@@ -0,0 +1,68 @@
+import json
+import os
+import time
+import tracemalloc
+
+import pytest
+
+from moving_average_crossovers import LATENCY_BUCKETS_US, StageProfiler
+
+
+@pytest.fixture
+def untraced():
+    was_tracing = tracemalloc.is_tracing()
+    yield
+    if not was_tracing:
+        tracemalloc.stop()
+
+
+def test_repeated_stages_accumulate(untraced):
+    prof = StageProfiler(memory=True)
+    for n in (100, 300):
+        with prof.stage("update") as rec:
+            time.sleep(0.01)
+            rec["bars"] = n
+    with prof.stage("fetch"):
+        blob = bytearray(4 * 2**20)
+    del blob
+    report = prof.report()
+    update = report["stages"]["update"]
+    assert update["calls"] == 2 and update["bars"] == 400
+    assert update["wall_s"] >= 0.02
+    assert update["bars_per_sec"] == pytest.approx(400 / update["wall_s"])
+    assert report["stages"]["fetch"]["bars_per_sec"] is None
+    assert report["stages"]["fetch"]["peak_mb"] >= 4
+    assert report["hottest"] == "update"
+
+
+def test_memory_off_leaves_peak_unset():
+    prof = StageProfiler(memory=False)
+    with prof.stage("update", bars=10):
+        pass
+    assert prof.report()["stages"]["update"]["peak_mb"] is None
+
+
+def test_poll_histograms_sum_per_bucket():
+    prof = StageProfiler(memory=False)
+    prof.record_poll(None, 0.002, [0.5e-6, 3e-6, 3e-6])
+    prof.record_poll("2024-01-01", 0.001, [1.0])
+    report = prof.report()
+    assert len(report["latency_hist"]) == len(LATENCY_BUCKETS_US) + 1
+    assert sum(report["latency_hist"]) == 4
+    assert report["latency_hist"][0] == 1 and report["latency_hist"][2] == 2 and report["latency_hist"][-1] == 1
+    assert [p["bars"] for p in report["polls"]] == [3, 1]
+
+
+def test_write_and_dump_hottest(tmp_path, capsys):
+    prof = StageProfiler(memory=False, cprofile=True)
+    with prof.stage("seed", bars=5):
+        sum(range(10_000))
+    with prof.stage("update", bars=50):
+        time.sleep(0.02)
+    written = prof.write(str(tmp_path / "profile.json"))
+    with open(tmp_path / "profile.json", encoding="utf-8") as f:
+        assert json.load(f)["stages"].keys() == written["stages"].keys() == {"seed", "update"}
+    assert prof.dump_hottest(str(tmp_path / "hot.prof"), top=3) == "update"
+    assert os.path.getsize(tmp_path / "hot.prof") > 0
+    assert "sleep" in capsys.readouterr().out
+    assert StageProfiler(memory=False).dump_hottest(str(tmp_path / "none.prof")) is None
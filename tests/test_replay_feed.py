@@ -0,0 +1,51 @@
+import math
+import time
+
+import pandas as pd
+import pytest
+
+from bench_backtester import synthetic_ohlcv
+from moving_average_crossovers import ReplayFeed
+
+
+@pytest.fixture
+def minute_bars():
+    return synthetic_ohlcv(300, seed=4, freq="1min")
+
+
+def _drain(feed, seed_bars):
+    parts = [feed.history(seed_bars)]
+    since = parts[0].index[-1]
+    deadline = time.monotonic() + 10
+    while not feed.done and time.monotonic() < deadline:
+        new = feed.poll(since)
+        if len(new):
+            # only bars whose close (open + 1 minute) has passed on the virtual clock
+            assert new.index[-1] + pd.Timedelta(minutes=1) <= pd.Timestamp(feed.clock(), unit="s")
+            parts.append(new)
+            since = new.index[-1]
+        feed.sleep(5.0)
+    return pd.concat(parts)
+
+
+def test_unthrottled_replay_emits_every_bar_once_in_order(minute_bars):
+    feed = ReplayFeed(minute_bars, "1m", speed=math.inf)
+    out = _drain(feed, 50)
+    assert feed.done
+    pd.testing.assert_frame_equal(out, minute_bars)
+
+
+def test_accelerated_replay_releases_bars_as_they_close(minute_bars):
+    feed = ReplayFeed(minute_bars, "1m", speed=60 * 200)  # 200 bars per wall-clock second
+    t0 = time.perf_counter()
+    out = _drain(feed, 200)
+    assert feed.done
+    pd.testing.assert_frame_equal(out, minute_bars)
+    assert out.index.is_monotonic_increasing and not out.index.has_duplicates
+    assert time.perf_counter() - t0 >= 0.4  # 100 bars at 200/s
+
+
+@pytest.mark.parametrize("speed", [0, -2.0])
+def test_rejects_non_positive_speed(minute_bars, speed):
+    with pytest.raises(ValueError):
+        ReplayFeed(minute_bars, "1m", speed=speed)
@@ -0,0 +1,41 @@
+import numpy as np
+
+import moving_average_crossovers as mac
+
+
+def _backtester(**kwargs):
+    return mac.CrossoverBacktester(fast=20, slow=100, engine="numpy", **kwargs)
+
+
+def test_changed_volume_misses_with_a_volume_filter(tmp_path, cycling_bars):
+    cache = mac.BacktestCache(tmp_path)
+    cache.run(_backtester(volume_filter=(20, 1.2)), "1m", lambda: cycling_bars)
+    changed = cycling_bars.copy()
+    changed["volume"] = changed["volume"].to_numpy()[::-1]
+    _, trades, _, hit = cache.run(_backtester(volume_filter=(20, 1.2)), "1m", lambda: changed)
+    fresh = _backtester(volume_filter=(20, 1.2))
+    fresh.run(changed)
+    assert not hit
+    assert len(trades) == len(fresh.trades)
+
+
+def test_hit_returns_the_same_result_as_the_miss(tmp_path, cycling_bars):
+    cache = mac.BacktestCache(tmp_path)
+    eq1, trades1, m1, hit1 = cache.run(_backtester(), "1m", lambda: cycling_bars)
+    eq2, trades2, m2, hit2 = cache.run(_backtester(), "1m", lambda: cycling_bars)
+    assert (hit1, hit2) == (False, True)
+    assert m1 == m2
+    np.testing.assert_array_equal(eq1["equity"].to_numpy(), eq2["equity"].to_numpy())
+    np.testing.assert_array_equal(trades1.data, trades2.data)
+
+
+def test_hit_restores_the_open_position(tmp_path, trending_bars):
+    bars = trending_bars.iloc[:2400]  # ends with a long open
+    cache = mac.BacktestCache(tmp_path)
+    miss, hit = _backtester(), _backtester()
+    eq1, _, m1, _ = cache.run(miss, "1m", lambda: bars)
+    eq2, _, m2, was_hit = cache.run(hit, "1m", lambda: bars)
+    assert was_hit and miss.open_trade is not None
+    assert hit.open_trade == miss.open_trade
+    np.testing.assert_array_equal(hit.marked_equity(eq2), miss.marked_equity(eq1))
+    assert hit.metrics(eq2, "1m") == m1 == m2
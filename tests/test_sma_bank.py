@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from moving_average_crossovers import SMABank
+
+
+@pytest.fixture
+def close():
+    rng = np.random.default_rng(7)
+    return 20_000 + np.cumsum(rng.normal(0, 50, 4000))  # large level: prefix sums must stay precise
+
+
+@pytest.mark.parametrize("window", [1, 5, 200, 4000, 4001])
+def test_matches_rolling_mean(close, window):
+    expected = pd.Series(close).rolling(window).mean().to_numpy()
+    np.testing.assert_allclose(SMABank(close).sma(window), expected, rtol=1e-12, equal_nan=True)
+
+
+def test_evicts_least_recently_used_and_recomputes_identically(close):
+    bank = SMABank(close, max_bytes=2 * close.nbytes)  # room for two windows
+    first = bank.sma(10).copy()
+    bank.sma(20)
+    bank.sma(10)  # hit: 10 becomes most recently used
+    bank.sma(30)  # evicts 20
+    assert bank.windows() == [10, 30]
+    assert (bank.hits, bank.misses) == (1, 3)
+    np.testing.assert_array_equal(bank.sma(10), first)
+    np.testing.assert_allclose(bank.sma(20), pd.Series(close).rolling(20).mean().to_numpy(),
+                               rtol=1e-12, equal_nan=True)
+    assert bank.windows() == [10, 20]
+
+
+def test_cached_windows_are_read_only(close):
+    with pytest.raises(ValueError):
+        SMABank(close).sma(10)[0] = 0.0
+
+
+def test_rejects_nan_and_bad_windows(close):
+    with pytest.raises(ValueError):
+        SMABank(np.array([1.0, np.nan, 3.0]))
+    with pytest.raises(ValueError):
+        SMABank(close).sma(0)
@@ -0,0 +1,19 @@
+import numpy as np
+import pytest
+
+import moving_average_crossovers as mac
+
+
+@pytest.mark.parametrize("allow_short", [False, True])
+def test_streaming_matches_backtester(trending_bars, allow_short):
+    bt = mac.CrossoverBacktester(fast=20, slow=100, allow_short=allow_short, engine="numpy")
+    df_eq, trades = bt.run(trending_bars)
+
+    live = mac.StreamingCrossover(fast=20, slow=100, allow_short=allow_short)
+    eq = np.array([live.update(ts, c) for ts, c in trending_bars["close"].items()])
+
+    assert len(trades) > 5
+    np.testing.assert_allclose(eq, df_eq["equity"].to_numpy(), rtol=1e-9)
+    for col in ("entry_bar", "exit_bar", "side"):
+        np.testing.assert_array_equal(live.trades.column(col), trades.column(col))
+    np.testing.assert_allclose(live.trades.column("pnl"), trades.column("pnl"), rtol=1e-9)
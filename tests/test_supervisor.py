@@ -0,0 +1,58 @@
+import asyncio
+import math
+
+import pytest
+
+from bench_backtester import synthetic_ohlcv
+from moving_average_crossovers import PaperSupervisor, ReplayFeed
+
+
+class CrashingFeed(ReplayFeed):
+    """Replays its bars but raises on the first poll, like a dropped connection."""
+
+    def poll(self, since):
+        raise ConnectionError("feed dropped")
+
+
+@pytest.fixture
+def bars():
+    return {"AAA": synthetic_ohlcv(2000, seed=5, cycle_bars=150), "BBB": synthetic_ohlcv(2000, seed=6, cycle_bars=150)}
+
+
+def _run(bars, crash=()):
+    feeds = []
+
+    def factory(ticker, interval):
+        cls = CrashingFeed if ticker in crash and not any(f[0] == ticker for f in feeds) else ReplayFeed
+        feeds.append((ticker, cls))
+        return cls(bars[ticker], interval, speed=math.inf)
+
+    sup = PaperSupervisor(feed_factory=factory, quiet=True, restart_seconds=0)
+    for ticker in bars:
+        sup.add(ticker, "1m", fast=10, slow=50)
+    asyncio.run(sup.run())
+    return sup, feeds
+
+
+def test_crashed_group_is_restarted_and_resumes(bars):
+    clean, _ = _run(bars)
+    sup, feeds = _run(bars, crash={"AAA"})
+    assert sup.restarts == 1
+    assert [f for f in feeds if f[0] == "AAA"] == [("AAA", CrashingFeed), ("AAA", ReplayFeed)]
+    # the restarted strategy skipped the re-seeded bars and ends exactly where a clean run does
+    assert sup.snapshot() == clean.snapshot()
+    assert all(row["trades"] > 0 for row in sup.snapshot())
+
+
+def test_group_gives_up_after_max_restarts(bars, capsys):
+    def factory(ticker, interval):
+        return (CrashingFeed if ticker == "AAA" else ReplayFeed)(bars[ticker], interval, speed=math.inf)
+
+    sup = PaperSupervisor(feed_factory=factory, quiet=True, max_restarts=2, restart_seconds=0)
+    for ticker in bars:
+        sup.add(ticker, "1m", fast=10, slow=50)
+    asyncio.run(sup.run())
+    assert sup.restarts == 2
+    assert "giving up" in capsys.readouterr().out
+    other = next(row for row in sup.snapshot() if row["ticker"] == "BBB")
+    assert other["last_ts"] == str(bars["BBB"].index[-1])
@@ -0,0 +1,37 @@
+import pytest
+
+import moving_average_crossovers as mac
+
+PARAMS = dict(fast=20, slow=100, stop_loss_pct=0.05, take_profit_pct=0.10, fee_bps=5.0)
+
+
+def _sweep(bars, **grid):
+    return mac.run_sweep(bars, "1m", grid.get("fasts", [PARAMS["fast"]]), grid.get("slows", [PARAMS["slow"]]),
+                         [PARAMS["stop_loss_pct"]], [PARAMS["take_profit_pct"]], [PARAMS["fee_bps"]],
+                         allow_short=grid.get("allow_short", False), workers=2)
+
+
+def test_sweep_row_equals_summarize(trending_bars):
+    row = _sweep(trending_bars).iloc[0]
+    bt = mac.CrossoverBacktester(**PARAMS, engine="numpy")
+    df_eq, _ = bt.run(trending_bars)
+    shown = bt.summarize(df_eq, "1m")
+    assert mac.CrossoverBacktester.format_metrics(dict(row)) == {
+        k: v for k, v in shown.items() if k not in ("Profit factor", "Avg holding", "Exposure")}
+    # a long position takes most of the equity, so the raw column would read as a ~99% drawdown
+    assert row["max_drawdown"] > -0.5
+
+
+@pytest.mark.parametrize("allow_short", [False, True])
+def test_every_sweep_row_reproduces_a_backtest(cycling_bars, allow_short):
+    table = _sweep(cycling_bars, fasts=[10, 20, 30], slows=[60, 100], allow_short=allow_short)
+    assert len(table) == 6
+    for _, row in table.iterrows():
+        bt = mac.CrossoverBacktester(fast=int(row["fast"]), slow=int(row["slow"]), allow_short=allow_short,
+                                     stop_loss_pct=row["stop_loss_pct"], take_profit_pct=row["take_profit_pct"],
+                                     fee_bps=row["fee_bps"], engine="numpy")
+        df_eq, _ = bt.run(cycling_bars)
+        single = bt.metrics(df_eq, "1m")
+        assert row["trades"] == single["trades"]
+        for key in ("total_return", "cagr", "sharpe", "max_drawdown", "win_rate"):
+            assert row[key] == pytest.approx(single[key], rel=1e-9, abs=1e-12), key
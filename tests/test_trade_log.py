@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import moving_average_crossovers as mac
+
+
+@pytest.fixture
+def run(cycling_bars):
+    bars = cycling_bars.tz_localize("UTC")
+    bt = mac.CrossoverBacktester(fast=20, slow=100, allow_short=True, engine="numpy")
+    bt.run(bars)
+    return bars, bt.trades
+
+
+def test_stats_match_the_trades_frame(run):
+    bars, trades = run
+    frame = trades.to_frame()
+    stats = trades.stats(len(bars))
+
+    wins, losses = frame.pnl[frame.pnl > 0].sum(), -frame.pnl[frame.pnl < 0].sum()
+    assert wins > 0 and losses > 0
+    assert stats["profit_factor"] == pytest.approx(wins / losses)
+    held = (frame.exit_time - frame.entry_time).dt.total_seconds()
+    assert stats["avg_holding_seconds"] == pytest.approx(held.mean())
+    held_bars = bars.index.get_indexer(frame.exit_time) - bars.index.get_indexer(frame.entry_time)
+    assert stats["exposure"] == pytest.approx(held_bars.sum() / len(bars))
+
+
+def test_frame_round_trips_through_records_and_csv(run, tmp_path):
+    _, trades = run
+    frame = trades.to_frame()
+    assert set(frame.side) == {"long", "short"}
+    assert frame.entry_time.dt.tz is not None
+    assert [t.pnl for t in trades] == frame.pnl.tolist()
+    assert trades[-1].exit_time == frame.exit_time.iloc[-1]
+
+    trades.to_csv(tmp_path / "trades.csv")
+    back = pd.read_csv(tmp_path / "trades.csv", parse_dates=["entry_time", "exit_time"])
+    pd.testing.assert_frame_equal(back, frame, check_dtype=False)
+
+    copy = mac.TradeLog.from_array(trades.data.copy(), tz=trades.tz)
+    pd.testing.assert_frame_equal(copy.to_frame(), frame)
+
+
+def test_log_grows_past_its_capacity():
+    log = mac.TradeLog(capacity=2)
+    t0 = pd.Timestamp("2024-01-01")
+    for i in range(5):
+        log.append(t0 + pd.Timedelta(hours=i), t0 + pd.Timedelta(hours=i + 1), "long" if i % 2 else "short",
+                   100.0, 101.0, 1.0, 1.0 - i, 0.01, i, i + 1)
+    assert len(log) == 5
+    np.testing.assert_array_equal(log.column("pnl"), [1.0, 0.0, -1.0, -2.0, -3.0])
+    stats = log.stats(10)
+    assert stats["profit_factor"] == pytest.approx(1 / 6)
+    assert stats["avg_holding_seconds"] == 3600
+    assert stats["exposure"] == pytest.approx(0.5)
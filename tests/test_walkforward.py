@@ -0,0 +1,27 @@
+import numpy as np
+
+import moving_average_crossovers as mac
+
+
+def test_fold_ending_long_is_chained_at_marked_value(trending_bars):
+    table, stitched, overall = mac.run_walkforward(
+        trending_bars, "1d", is_bars=1000, oos_bars=500, fasts=[5, 10], slows=[30, 50],
+        stop_losses=[0.5], take_profits=[5.0], fee_bps_list=[5.0], workers=2)
+    # a fold with no closed trade but a nonzero return ended while holding a long
+    assert ((table["oos_trades"] == 0) & (table["oos_total_return"] != 0)).any()
+    equity = stitched["equity"].to_numpy()
+    assert equity.min() > 0.5 * equity[0]
+    assert overall["max_drawdown"] > -0.5
+    assert overall["total_return"] > 0
+
+
+def test_marked_equity_values_open_long_at_last_close(trending_bars):
+    bt = mac.CrossoverBacktester(fast=10, slow=50, stop_loss_pct=0.5, take_profit_pct=5.0, engine="numpy")
+    df = trending_bars.iloc[:2000]
+    df_eq, _ = bt.run(df)
+    assert bt.open_trade is not None and bt.open_trade[0] > 0
+    side, entry_bar, entry_price, qty = bt.open_trade
+    marked = bt.marked_equity(df_eq)
+    # realized cash after paying for the position, plus the position at the last close
+    cash = df_eq["equity"].iloc[-1] - (df["close"].iloc[-1] - entry_price) * qty
+    assert np.isclose(marked[-1], cash + df["close"].iloc[-1] * qty)